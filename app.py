@@ -1,96 +1,167 @@
 # app.py - BULLETPROOF Lab Inventory Management System
 import streamlit as st
-import qrcode
-import io
-import json
 from datetime import datetime
 import pandas as pd
-import base64
-
-# Initialize session state for inventory data
-if 'inventory' not in st.session_state:
-    st.session_state.inventory = {
-        'storages': {},  # No pre-defined storages - user will create them
-        'categories': ['Chemical', 'Glassware', 'Instrument', 'Equipment', 'Consumable', 'Tool', 'Electronic', 'Safety'],
-        'status_options': ['Free', 'Occupied', 'Ordered', 'Maintenance', 'Broken'],
-        'storage_types': ['drawer', 'cupboard', 'almirah', 'shelf', 'cabinet', 'rack', 'fridge', 'freezer']
-    }
+import html
+import io
+import os
+from collections import Counter
+
+from inventory import (CATEGORIES, STATUS_OPTIONS, STORAGE_TYPES, ConflictError, InventoryAnalytics,
+                       InventoryStats, InventoryStore, ItemIndex, QRCache, QRStaticFiles, SearchIndex, storage_url)
+from inventory.expiry import ExpiryIndex, parse_expiry
+from inventory.facets import FACETS, FacetIndex
+from inventory.eventlog import Snapshotter
+from inventory.export import EXPORT_FORMATS, export_filename, export_mime, write_export
+from inventory.quantity import StockTotals, format_quantity, parse_quantity, parse_quantity_series
+from inventory.profiling import Profiler
+from inventory.scan import ScanSummaries
+from inventory.importer import IMPORT_FIELDS, REQUIRED_FIELDS, commit_import, guess_mapping, prepare_import, read_table
+from inventory.labels import LABEL_LAYOUTS, label_sheet_bytes
+
+@st.cache_resource(show_spinner=False)
+def get_store():
+    """Shared inventory store for every session in this process"""
+    return InventoryStore(os.environ.get("INVENTORY_DB", "lab_inventory.db"))
+
+@st.cache_resource(show_spinner=False)
+def get_qr_cache():
+    """Shared QR PNG cache, persisted under QR_CACHE_DIR"""
+    return QRCache(os.environ.get("QR_CACHE_DIR", ".qr_cache"))
+
+@st.cache_resource(show_spinner=False)
+def get_qr_files():
+    """QR images published under ./static, or None when static serving is off"""
+    if not st.get_option("server.enableStaticServing"):
+        return None
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    return QRStaticFiles(get_qr_cache(), os.path.join(app_dir, "static", "qr"))
+
+@st.cache_resource(show_spinner=False)
+def get_item_index():
+    """Shared item ID -> item lookup, kept current by the store"""
+    return get_store().subscribe(ItemIndex())
+
+@st.cache_resource(show_spinner=False)
+def get_search_index():
+    """Shared item search index, kept current by the store"""
+    return get_store().subscribe(SearchIndex(get_item_index()))
+
+@st.cache_resource(show_spinner=False)
+def get_inventory_stats():
+    """Shared dashboard counters, kept current by the store"""
+    return get_store().subscribe(InventoryStats())
+
+@st.cache_resource(show_spinner=False)
+def get_inventory_analytics():
+    """Shared analytics snapshot, invalidated by the store on every change"""
+    return get_store().subscribe(InventoryAnalytics())
+
+@st.cache_resource(show_spinner=False)
+def get_expiry_index():
+    """Shared items-by-expiry index, kept current by the store"""
+    return get_store().subscribe(ExpiryIndex(get_item_index()))
+
+@st.cache_resource(show_spinner=False)
+def get_stock_totals():
+    """Shared per-item-name stock totals, kept current by the store"""
+    return get_store().subscribe(StockTotals())
+
+@st.cache_resource(show_spinner=False)
+def get_snapshotter():
+    """Periodic event-log snapshots under INVENTORY_SNAPSHOT_DIR"""
+    return get_store().subscribe(Snapshotter(os.environ.get("INVENTORY_SNAPSHOT_DIR", "snapshots"),
+                                             every=int(os.environ.get("INVENTORY_SNAPSHOT_EVERY", "1000"))))
+
+@st.cache_resource(show_spinner=False)
+def get_facet_index():
+    """Shared facet bitmaps for item filters, kept current by the store"""
+    return get_store().subscribe(FacetIndex())
+
+@st.cache_resource(show_spinner=False)
+def get_scan_summaries():
+    """Shared read-only pages for scanned storages, dropped by the store on change"""
+    return get_store().subscribe(ScanSummaries())
+
+@st.cache_resource(show_spinner=False)
+def get_profiler():
+    """Shared rolling timings for views and hot helpers"""
+    return Profiler(window=int(os.environ.get("INVENTORY_PROFILE_WINDOW", "200")))
+
+store = get_store()
+qr_cache = get_qr_cache()
+qr_files = get_qr_files()
+item_index = get_item_index()
+search_index = get_search_index()
+inventory_stats = get_inventory_stats()
+inventory_analytics = get_inventory_analytics()
+expiry_index = get_expiry_index()
+stock_totals = get_stock_totals()
+facet_index = get_facet_index()
+scan_summaries = get_scan_summaries()
+profiler = get_profiler()
+get_snapshotter()
+
+# Pick up writes made by other processes (CLI jobs, other app workers)
+store.sync()
 
 # Initialize form states
 if 'form_submitted' not in st.session_state:
     st.session_state.form_submitted = False
 if 'current_form_id' not in st.session_state:
     st.session_state.current_form_id = None
-if 'qr_cache' not in st.session_state:
-    st.session_state.qr_cache = {}
+# Items picked for bulk actions: item ID -> version when picked
+if 'bulk_selection' not in st.session_state:
+    st.session_state.bulk_selection = {}
 
-def generate_qr_code_safe(url):
+# Render parameters shared by displayed and downloaded QR codes
+# version=None: the smallest symbol that fits each URL
+QR_RENDER = {'version': None, 'error_correction': 'M', 'box_size': 10, 'border': 4}
+
+@profiler.instrument()
+def generate_qr_code_safe(url, fmt="png"):
     """Generate QR code safely with caching"""
     try:
-        # Check cache first
-        if url in st.session_state.qr_cache:
-            return st.session_state.qr_cache[url]
-        
-        # Generate new QR code
-        qr = qrcode.QRCode(
-            version=8,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(url)
-        qr.make(fit=True)
-        qr_img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to bytes
-        buf = io.BytesIO()
-        qr_img.save(buf, format="PNG")
-        buf.seek(0)
-        qr_bytes = buf.getvalue()
-        
-        # Cache the result
-        st.session_state.qr_cache[url] = qr_bytes
-        return qr_bytes
+        # Shared across sessions and restarts, keyed by URL + render parameters
+        return qr_cache.get(url, fmt=fmt, **QR_RENDER)
         
     except Exception as e:
         st.error(f"QR generation failed: {str(e)}")
         return None
 
-def get_base64_encoded_image(qr_bytes):
-    """Convert QR bytes to base64 for display"""
-    try:
-        if qr_bytes:
-            return base64.b64encode(qr_bytes).decode()
-        return None
-    except:
-        return None
-
 def get_app_url():
     """Get the current app URL - CRITICAL: UPDATE THIS WITH YOUR ACTUAL URL"""
     # ⚠️ ⚠️ ⚠️ REPLACE THIS WITH YOUR ACTUAL STREAMLIT APP URL ⚠️ ⚠️ ⚠️
-    return "https://lab-inventory-system-wgghkexsaoemscwwqxxfrj.streamlit.app/"
+    # APP_URL overrides it, and is also what the command line uses for QR codes
+    return os.environ.get("APP_URL", "https://lab-inventory-system-wgghkexsaoemscwwqxxfrj.streamlit.app/")
 
 def reset_form_state():
     """Reset form submission state"""
     st.session_state.form_submitted = False
     st.session_state.current_form_id = None
 
-def display_qr_code(qr_bytes, caption="QR Code", width=150):
-    """Safely display QR code"""
+@profiler.instrument()
+def display_qr_code(url, caption="QR Code", width=150):
+    """Safely display the QR code for url as a cacheable image reference"""
     try:
-        if qr_bytes:
-            # Convert to base64 for reliable display
-            img_str = get_base64_encoded_image(qr_bytes)
-            if img_str:
-                st.markdown(f'<img src="data:image/png;base64,{img_str}" width="{width}" alt="{caption}">', 
-                           unsafe_allow_html=True)
-                st.caption(caption)
-                return True
-        return False
+        if qr_files is not None:
+            # Browsers fetch each content-hashed image once; reruns only resend the URL
+            src = qr_files.url(url, **QR_RENDER)
+            st.markdown(f'<img src="{src}" width="{width}" alt="{html.escape(caption)}">',
+                        unsafe_allow_html=True)
+        else:
+            qr_bytes = generate_qr_code_safe(url)
+            if not qr_bytes:
+                return False
+            # Served from Streamlit's media endpoint rather than inlined in the page
+            st.image(qr_bytes, width=width)
+        st.caption(caption)
+        return True
     except Exception as e:
         st.error(f"QR display error: {str(e)}")
         return False
 
+@profiler.instrument()
 def main_dashboard():
     """Central dashboard - shows all storages"""
     st.set_page_config(
@@ -108,8 +179,9 @@ def main_dashboard():
     app_url = get_app_url()
     
     # Header with quick stats
-    total_storages = len(st.session_state.inventory['storages'])
-    total_items = sum(len(storage['items']) for storage in st.session_state.inventory['storages'].values())
+    summary = inventory_stats.summary()
+    total_storages = summary['total_storages']
+    total_items = summary['total_items']
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -118,18 +190,16 @@ def main_dashboard():
     with col2:
         st.metric("📦 Total Items", total_items)
     with col3:
-        occupied_count = sum(1 for storage in st.session_state.inventory['storages'].values() 
-                           for item in storage['items'] if item['status'] == 'Occupied')
+        occupied_count = summary['status'].get('Occupied', 0)
         st.metric("🔴 Occupied Items", occupied_count)
     with col4:
         # Generate and display central QR code
-        central_qr_data = generate_qr_code_safe(app_url)
-        display_qr_code(central_qr_data, "Central QR", 100)
+        display_qr_code(app_url, "Central QR", 100)
     
     st.markdown("---")
     
     # Main content
-    if not st.session_state.inventory['storages']:
+    if total_storages == 0:
         st.info("🏗️ No storages created yet. Start by adding your first storage!")
         col1, col2, col3 = st.columns([1,2,1])
         with col2:
@@ -140,10 +210,18 @@ def main_dashboard():
         col_left, col_right = st.columns([3, 1])
         
         with col_left:
+            with st.expander("🧮 Filter Items"):
+                item_filter_panel()
+            
             st.subheader("📊 All Storage Units")
             
-            # Display all storages
-            for storage_id, storage in st.session_state.inventory['storages'].items():
+            # Only the current page is read, rendered and sent to the browser
+            storages, matching_storages, page, page_count = storage_list_controls()
+            if not storages:
+                st.info("No storages match these filters.")
+            
+            previews = store.preview_items(list(storages), limit=5)
+            for storage_id, storage in storages.items():
                 with st.container():
                     # Storage header
                     col_a, col_b, col_c = st.columns([3, 1, 1])
@@ -153,16 +231,16 @@ def main_dashboard():
                         icon = get_storage_icon(storage['type'])
                         st.write(f"### {icon} {storage['name']}")
                         st.write(f"**Location:** {storage['location']} | **Type:** {storage['type'].title()}")
-                        st.write(f"**Items:** {len(storage['items'])} | **Last Updated:** {storage['last_updated']}")
+                        st.write(f"**Items:** {storage['item_count']} | **Last Updated:** {storage['last_updated']}")
                         if storage.get('description'):
                             st.write(f"*{storage['description']}*")
                     
                     with col_b:
                         # Storage QR code
-                        storage_url = f"{app_url}?storage={storage_id}"
-                        qr_data = generate_qr_code_safe(storage_url)
-                        if display_qr_code(qr_data, f"QR for {storage['name']}", 120):
+                        qr_url = storage_url(app_url, storage_id)
+                        if display_qr_code(qr_url, f"QR for {storage['name']}", 120):
                             # Download button
+                            qr_data = generate_qr_code_safe(qr_url)
                             if qr_data:
                                 st.download_button(
                                     f"📥 Download QR",
@@ -186,15 +264,17 @@ def main_dashboard():
                             st.rerun()
                     
                     # Quick items preview
-                    if storage['items']:
-                        with st.expander(f"📦 Items Preview ({len(storage['items'])} items)"):
-                            for item in storage['items'][:5]:  # Show first 5 items
+                    if storage['item_count']:
+                        with st.expander(f"📦 Items Preview ({storage['item_count']} items)"):
+                            for item in previews[storage_id]:  # Show first 5 items
                                 status_color = "🟢" if item['status'] == 'Free' else "🔴" if item['status'] == 'Occupied' else "🟡"
                                 st.write(f"{status_color} {item['name']} - {item['quantity']} ({item['status']})")
-                            if len(storage['items']) > 5:
-                                st.write(f"... and {len(storage['items']) - 5} more items")
+                            if storage['item_count'] > 5:
+                                st.write(f"... and {storage['item_count'] - 5} more items")
                     
                     st.markdown("---")
+            
+            storage_page_navigation(page, page_count, matching_storages)
         
         with col_right:
             st.subheader("🎯 Quick Actions")
@@ -216,53 +296,336 @@ def main_dashboard():
                 reset_form_state()
                 st.rerun()
             
+            st.button("📈 Analytics", use_container_width=True, on_click=show_analytics, args=(True,))
+            
             # Export data
-            if st.button("📤 Export Data", use_container_width=True):
-                export_inventory_data()
+            with st.expander("📤 Export Data"):
+                export_format = st.selectbox("Format", list(EXPORT_FORMATS), key="export_format")
+                export_gzip = st.checkbox("Compress (gzip)", key="export_gzip")
+                export_inventory_data(export_format, export_gzip)
+            
+            # Printable label sheets for every storage
+            with st.expander("🏷️ Print QR Labels"):
+                layout_titles = {spec.title: key for key, spec in LABEL_LAYOUTS.items()}
+                label_layout = layout_titles[st.selectbox("Sheet", list(layout_titles), key="label_layout")]
+                label_format = st.radio("Format", ["pdf", "zip"], horizontal=True, key="label_format")
+                if st.button("🖨️ Generate Labels", use_container_width=True):
+                    export_label_sheets(store.list_storages(), app_url, label_format, label_layout)
             
             st.markdown("---")
             st.subheader("🔍 Search Items")
-            search_term = st.text_input("Search across all storages", key="main_search")
+            search_term = st.text_input("Search across all storages", key="main_search",
+                                        placeholder="Name, notes, storage, location...")
             if search_term:
-                search_results = search_items(search_term)
+                search_results, total_results = search_items(search_term, limit=SEARCH_RESULTS_SHOWN)
                 if search_results:
                     st.write("**Search Results:**")
-                    for result in search_results[:3]:  # Show first 3 results
-                        status_icon = "🟢" if result['item']['status'] == 'Free' else "🔴" if result['item']['status'] == 'Occupied' else "🟡"
-                        st.write(f"{status_icon} **{result['item']['name']}** in {result['storage_name']}")
-                    if len(search_results) > 3:
-                        st.write(f"... and {len(search_results) - 3} more results")
+                    for result in search_results:
+                        item = result['item']
+                        selection_checkbox(item, f"{get_status_icon(item['status'])} **{item['name']}** "
+                                                 f"({item['quantity']}) in {result['storage_name']}")
+                    if total_results > SEARCH_RESULTS_SHOWN:
+                        st.write(f"... and {total_results - SEARCH_RESULTS_SHOWN} more results")
+                    st.caption("Best matches first; close spellings are included.")
                 else:
                     st.info("No items found")
             
+            bulk_actions_panel("dashboard")
+            
+            st.markdown("---")
+            expiry_panel()
+            
+            st.markdown("---")
+            low_stock_panel()
+            
             st.markdown("---")
             st.subheader("📈 Quick Stats")
             st.write(f"**Total Storages:** {total_storages}")
             st.write(f"**Total Items:** {total_items}")
             
             # Status distribution
-            status_count = {'Free': 0, 'Occupied': 0, 'Ordered': 0, 'Maintenance': 0, 'Broken': 0}
-            for storage in st.session_state.inventory['storages'].values():
-                for item in storage['items']:
-                    status_count[item['status']] = status_count.get(item['status'], 0) + 1
-            
             st.write("**Items by Status:**")
-            for status, count in status_count.items():
+            for status in STATUS_OPTIONS:
+                count = summary['status'].get(status, 0)
                 if count > 0:
                     icon = "🟢" if status == 'Free' else "🔴" if status == 'Occupied' else "🟡"
                     st.write(f"{icon} {status}: {count}")
+            
+            qr_stats = qr_cache.stats()
+            st.caption(f"QR cache: {qr_stats['hits'] + qr_stats['disk_hits']} hits / "
+                       f"{qr_stats['misses']} misses ({qr_stats['hit_rate']:.0%})")
+
+@profiler.instrument()
+def expiry_panel():
+    """Dashboard panel of expired and soon-to-expire items"""
+    st.subheader("⏳ Expiring Soon")
+    days = st.number_input("Within days", min_value=1, max_value=3650, value=30, step=1, key="expiry_days")
+    today = datetime.now().date()
+    expired = expiry_index.expired(today)
+    expiring = expiry_index.expiring_within(int(days), today)
+    
+    if not expired and not expiring:
+        st.info("Nothing expires in this window")
+        return
+    
+    storage_names = store.storage_names()
+    if expired:
+        st.write(f"⚠️ **{len(expired)} expired**")
+    st.write(f"**{len(expiring)} expiring within {int(days)} days:**")
+    for entry in expiring[:5]:
+        st.write(f"🧪 **{entry['item']['name']}** in {storage_names.get(entry['storage_id'], entry['storage_id'])} "
+                 f"— {entry['expiry'].isoformat()}")
+    if len(expiring) > 5:
+        st.write(f"... and {len(expiring) - 5} more")
+    
+    st.download_button(
+        "📥 Download Expiry Report (CSV)",
+        expiry_report_csv(expired + expiring, storage_names, today),
+        f"expiry_report_{today.strftime('%Y%m%d')}.csv",
+        "text/csv",
+        use_container_width=True
+    )
+
+def expiry_report_csv(entries, storage_names, today):
+    """CSV of expiry entries, soonest first, with days remaining"""
+    report = pd.DataFrame([{
+        'expiry': entry['expiry'].isoformat(),
+        'days_left': (entry['expiry'] - today).days,
+        'item_id': entry['item']['id'],
+        'name': entry['item']['name'],
+        'quantity': entry['item']['quantity'],
+        'category': entry['item']['category'],
+        'status': entry['item']['status'],
+        'storage_id': entry['storage_id'],
+        'storage_name': storage_names.get(entry['storage_id'], entry['storage_id']),
+    } for entry in entries])
+    return report.to_csv(index=False).encode("utf-8")
+
+@profiler.instrument()
+def low_stock_panel():
+    """Dashboard panel of item names whose total stock is below its threshold"""
+    st.subheader("📉 Low Stock")
+    thresholds = store.stock_thresholds()
+    low = stock_totals.low_stock(thresholds)
+    if low:
+        for entry in low:
+            st.write(f"🔻 **{entry['name']}**: {format_quantity(entry['total'], entry['unit'])} "
+                     f"(min {format_quantity(entry['threshold'], entry['unit'])})")
+    elif thresholds:
+        st.info("All tracked items are above their thresholds")
+    else:
+        st.caption("No thresholds set yet")
+    
+    with st.expander("⚙️ Stock Thresholds"):
+        names = [entry['name'] for entry in stock_totals.totals()]
+        if not names:
+            st.caption("Add items to set thresholds")
+            return
+        st.selectbox("Item", names, key="threshold_name")
+        st.text_input("Minimum total", placeholder="e.g., 1 L, 500g, 10 pieces (blank removes)", key="threshold_quantity")
+        st.button("💾 Save Threshold", use_container_width=True, on_click=save_stock_threshold)
+        for name, quantity in thresholds.items():
+            st.caption(f"{name}: {quantity}")
+
+def save_stock_threshold():
+    """Store the threshold entered in the Stock Thresholds expander"""
+    name = st.session_state.threshold_name
+    quantity = st.session_state.threshold_quantity.strip()
+    if quantity and parse_quantity(quantity) is None:
+        st.error("Threshold needs a number and a known unit, e.g. 500 ml")
+        return
+    store.set_stock_threshold(name, quantity)
+    st.session_state.threshold_quantity = ""
+    st.success(f"✅ Threshold for '{name}' saved!")
+
+STORAGE_SORT_LABELS = {
+    "Created": "created",
+    "Name": "name",
+    "Location": "location",
+    "Type": "type",
+    "Recently updated": "last_updated",
+    "Most items": "items",
+}
+
+@profiler.instrument()
+def storage_list_controls():
+    """Filter/sort controls for the dashboard list; returns the current page of storages"""
+    col_type, col_location, col_sort, col_size = st.columns(4)
+    with col_type:
+        type_filter = st.selectbox("Type", ["All types"] + STORAGE_TYPES, key="list_type")
+    with col_location:
+        location_filter = st.selectbox("Location", ["All locations"] + store.locations(), key="list_location")
+    with col_sort:
+        sort_label = st.selectbox("Sort by", list(STORAGE_SORT_LABELS), key="list_sort")
+    with col_size:
+        page_size = st.selectbox("Per page", [10, 20, 50], key="list_page_size")
+    
+    # Start from the first page whenever the filters change
+    list_filters = (type_filter, location_filter, sort_label, page_size)
+    if st.session_state.get('list_filters') != list_filters:
+        st.session_state.list_filters = list_filters
+        st.session_state.dashboard_page = 0
+    
+    page = st.session_state.get('dashboard_page', 0)
+    query = dict(
+        sort=STORAGE_SORT_LABELS[sort_label],
+        storage_type=None if type_filter == "All types" else type_filter,
+        location=None if location_filter == "All locations" else location_filter,
+    )
+    storages, matching = store.page_storages(page * page_size, page_size, **query)
+    page_count = max(1, -(-matching // page_size))
+    if page >= page_count:
+        page = st.session_state.dashboard_page = page_count - 1
+        storages, matching = store.page_storages(page * page_size, page_size, **query)
+    return storages, matching, page, page_count
+
+STORAGE_ITEM_FACETS = ('status', 'category')
+FACET_LABELS = {'category': "Category", 'status': "Status", 'type': "Storage Type", 'location': "Location"}
+FILTER_RESULTS_SHOWN = 200
+
+def facet_selectors(counts, key_prefix, facets=FACETS):
+    """One multiselect per facet with live counts underneath; returns the selections"""
+    known = {'category': CATEGORIES, 'status': STATUS_OPTIONS, 'type': STORAGE_TYPES}
+    columns = st.columns(len(facets))
+    selections = {}
+    for column, facet in zip(columns, facets):
+        key = f"{key_prefix}_{facet}"
+        # Counts stay out of the option labels so the widget keeps its selection as they change
+        options = list(dict.fromkeys([*known.get(facet, []), *facet_index.values(facet),
+                                      *st.session_state.get(key, [])]))
+        with column:
+            selections[facet] = st.multiselect(FACET_LABELS[facet], options, key=key)
+            facet_counts = counts.get(facet, {})
+            st.caption(" · ".join(f"{value} {facet_counts[value]}" for value in options if value in facet_counts)
+                       or "No items")
+    return selections
+
+@profiler.instrument()
+def item_filter_panel():
+    """Faceted item filter across all storages"""
+    selections = {facet: st.session_state.get(f"item_filter_{facet}", []) for facet in FACETS}
+    selections = facet_selectors(facet_index.counts(selections), "item_filter")
+    if not any(selections.values()):
+        st.caption(f"Pick values above to list matching items ({len(facet_index)} items in total).")
+        return
+    
+    matches = facet_index.filter(selections)
+    total = bin(matches).count("1")
+    item_ids = facet_index.ids(matches, limit=FILTER_RESULTS_SHOWN)
+    storage_names = store.storage_names()
+    rows = []
+    for item_id in item_ids:
+        found = item_index.get(item_id)
+        if found is None:
+            continue
+        storage_id, item = found
+        rows.append({'Item': item['name'], 'Quantity': item['quantity'], 'Category': item['category'],
+                     'Status': f"{get_status_icon(item['status'])} {item['status']}",
+                     'Storage': storage_names.get(storage_id, storage_id), 'Expiry': item.get('expiry', '')})
+    st.write(f"**{total} matching items**" + (f" (first {FILTER_RESULTS_SHOWN} shown)" if total > len(rows) else ""))
+    if rows:
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        st.button(f"☑️ Select all {total} for bulk actions", key="item_filter_select",
+                  on_click=select_filtered, args=(selections,))
+
+def set_dashboard_page(page):
+    """Button callback: jump to a page of the dashboard list"""
+    st.session_state.dashboard_page = page
+
+def storage_page_navigation(page, page_count, matching_storages):
+    """Previous/next buttons below the dashboard list"""
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button("⬅️ Previous", disabled=page == 0, use_container_width=True, key="page_prev",
+                  on_click=set_dashboard_page, args=(page - 1,))
+    with col_info:
+        st.caption(f"Page {page + 1} of {page_count} · {matching_storages} storages")
+    with col_next:
+        st.button("Next ➡️", disabled=page >= page_count - 1, use_container_width=True, key="page_next",
+                  on_click=set_dashboard_page, args=(page + 1,))
+
+def show_analytics(show):
+    """Open or close the analytics page"""
+    st.session_state.show_analytics = show
+
+def chart_frame(df):
+    """Plain string labels so categorical/period axes chart cleanly"""
+    df = df.copy()
+    df.index = df.index.astype(str)
+    df.columns = [str(column) for column in df.columns]
+    return df
+
+@profiler.instrument()
+def analytics_view():
+    """Inventory reports computed from the shared columnar snapshot"""
+    st.set_page_config(page_title="Inventory Analytics", page_icon="📈", layout="wide")
+    
+    st.title("📈 Inventory Analytics")
+    st.button("🏠 Back to Central", on_click=show_analytics, args=(False,))
+    
+    items = inventory_analytics.frame()
+    storages = inventory_analytics.storages()
+    if items.empty:
+        st.info("📭 No items yet. Analytics appear once storages have items.")
+        return
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Items", len(items))
+    with col2:
+        st.metric("Storages", len(storages))
+    with col3:
+        st.metric("Locations", storages['location'].nunique())
+    with col4:
+        st.metric("With Expiry", int(items['expiry'].notna().sum()))
+    
+    tab_location, tab_type, tab_density, tab_expiry, tab_stock = st.tabs(
+        ["📍 Status by Location", "🗄️ Category by Type", "📦 Density", "⏳ Expiry", "⚖️ Stock Totals"])
+    
+    with tab_location:
+        status_by_location = inventory_analytics.status_by_location()
+        st.bar_chart(chart_frame(status_by_location))
+        st.dataframe(status_by_location, use_container_width=True)
+    
+    with tab_type:
+        category_by_type = inventory_analytics.category_by_type()
+        st.bar_chart(chart_frame(category_by_type))
+        st.dataframe(category_by_type, use_container_width=True)
+    
+    with tab_density:
+        location_density = inventory_analytics.location_density()
+        st.subheader("Items per Location")
+        st.bar_chart(chart_frame(location_density[['items']]))
+        st.dataframe(location_density, use_container_width=True)
+        st.subheader("Items per Storage")
+        st.dataframe(inventory_analytics.storage_density(), use_container_width=True)
+    
+    with tab_expiry:
+        expiry_by_month = inventory_analytics.expiry_by_month()
+        if expiry_by_month.empty:
+            st.info("No items have a valid expiry date.")
+        else:
+            st.bar_chart(chart_frame(expiry_by_month.to_frame()))
+    
+    with tab_stock:
+        totals = pd.DataFrame([{
+            'name': entry['name'],
+            'total': ", ".join(format_quantity(value, unit) for unit, value in sorted(entry['totals'].items())),
+            'unreadable quantities': entry['unparsed'],
+        } for entry in stock_totals.totals()])
+        st.dataframe(totals, hide_index=True, use_container_width=True)
 
+@profiler.instrument()
 def storage_view(storage_id):
     """View for individual storage"""
-    if storage_id not in st.session_state.inventory['storages']:
+    storage = store.get_storage(storage_id)
+    if storage is None:
         st.error("Storage not found!")
         st.session_state.current_storage = None
         reset_form_state()
         st.rerun()
         return
     
-    storage = st.session_state.inventory['storages'][storage_id]
-    
     st.set_page_config(
         page_title=f"{storage['name']}",
         page_icon="📦",
@@ -294,10 +657,10 @@ def storage_view(storage_id):
         app_url = get_app_url()
         
         # Current storage QR
-        current_url = f"{app_url}?storage={storage_id}"
-        current_qr = generate_qr_code_safe(current_url)
+        current_url = storage_url(app_url, storage_id)
         
-        if display_qr_code(current_qr, f"QR for {storage['name']}", 150):
+        if display_qr_code(current_url, f"QR for {storage['name']}", 150):
+            current_qr = generate_qr_code_safe(current_url)
             if current_qr:
                 st.download_button(
                     "📥 Download This QR",
@@ -306,16 +669,28 @@ def storage_view(storage_id):
                     "image/png",
                     use_container_width=True
                 )
+            current_svg = generate_qr_code_safe(current_url, "svg")
+            if current_svg:
+                st.download_button(
+                    "📐 Download as SVG",
+                    current_svg,
+                    f"qr_{storage_id}.svg",
+                    "image/svg+xml",
+                    use_container_width=True
+                )
         
         # Navigation and actions
         st.markdown("---")
         if st.button("🏠 Back to Central", use_container_width=True):
             st.session_state.current_storage = None
+            st.session_state.manage_storage = None
             reset_form_state()
             st.rerun()
         
         if st.button("✏️ Edit Storage", use_container_width=True):
             st.session_state.editing_storage = storage_id
+            # Edits are compared against the version shown here when saved
+            st.session_state.editing_storage_base = storage_edit_base(storage_id, storage)
             reset_form_state()
             st.rerun()
         
@@ -332,9 +707,32 @@ def storage_view(storage_id):
     with col_left:
         st.subheader("📋 Items Management")
         
+        items = storage['items']
+        if items:
+            selection_keys = {facet: f"storage_filter_{storage_id}_{facet}" for facet in STORAGE_ITEM_FACETS}
+            selections = {facet: st.session_state.get(key, []) for facet, key in selection_keys.items()}
+            selections = facet_selectors(facet_index.counts(selections, storage_id),
+                                         f"storage_filter_{storage_id}", STORAGE_ITEM_FACETS)
+            if any(selections.values()):
+                visible = set(facet_index.ids(facet_index.filter(selections, storage_id)))
+                items = [item for item in items if item['id'] in visible]
+                st.caption(f"Showing {len(items)} of {len(storage['items'])} items")
+        
         if storage['items']:
+            # Large storages open as one grid instead of a widget set per item
+            view = st.radio("View", ITEM_VIEWS, horizontal=True, key=f"item_view_{storage_id}",
+                            index=ITEM_VIEWS.index("🧮 Grid") if len(storage['items']) > GRID_VIEW_ITEMS else 0)
+            if view == "🧮 Grid":
+                item_grid(storage_id, items)
+            elif view == "☑️ Select":
+                st.button("Select all shown", key=f"select_all_{storage_id}",
+                          on_click=select_items, args=([item['id'] for item in items],))
+                bulk_actions_panel(f"storage_{storage_id}")
+                for item in items:
+                    selection_checkbox(item, f"{get_status_icon(item['status'])} {item['name']} - {item['quantity']}")
+            
             # Display items with status
-            for i, item in enumerate(storage['items']):
+            for item in (items if view == "📋 List" else []):
                 with st.expander(f"{get_status_icon(item['status'])} {item['name']} - {item['quantity']}", expanded=False):
                     col_a, col_b, col_c = st.columns([2, 1, 1])
                     
@@ -342,20 +740,21 @@ def storage_view(storage_id):
                         st.write(f"**ID:** {item['id']}")
                         st.write(f"**Category:** {item.get('category', 'Not specified')}")
                         if item.get('expiry'):
-                            st.write(f"**Expiry:** {item['expiry']}")
+                            st.write(f"**Expiry:** {item['expiry']}{expiry_flag(item['expiry'])}")
                         st.write(f"**Status:** {item['status']}")
                         if item.get('notes'):
                             st.write(f"**Notes:** {item['notes']}")
                     
                     with col_b:
-                        if st.button(f"✏️ Edit", key=f"edit_{storage_id}_{i}", use_container_width=True):
-                            st.session_state.editing_item = (storage_id, i)
+                        if st.button(f"✏️ Edit", key=f"edit_{item['id']}", use_container_width=True):
+                            st.session_state.editing_item = item['id']
+                            st.session_state.editing_item_base = dict(item)
                             reset_form_state()
                             st.rerun()
                     
                     with col_c:
-                        if st.button(f"🗑️ Delete", key=f"delete_{storage_id}_{i}", use_container_width=True):
-                            delete_item(storage_id, i)
+                        if st.button(f"🗑️ Delete", key=f"delete_{item['id']}", use_container_width=True):
+                            delete_item(item['id'], item['version'])
                             reset_form_state()
                             st.rerun()
         else:
@@ -376,8 +775,8 @@ def storage_view(storage_id):
                                    value="" if not form_just_submitted else "")
             new_quantity = st.text_input("Quantity*", placeholder="e.g., 500g, 10 pieces", 
                                        value="" if not form_just_submitted else "")
-            new_category = st.selectbox("Category", st.session_state.inventory['categories'])
-            new_status = st.selectbox("Status*", st.session_state.inventory['status_options'])
+            new_category = st.selectbox("Category", CATEGORIES)
+            new_status = st.selectbox("Status*", STATUS_OPTIONS)
             new_expiry = st.text_input("Expiry Date (optional)", placeholder="YYYY-MM-DD",
                                      value="" if not form_just_submitted else "")
             new_notes = st.text_area("Notes (optional)", placeholder="Additional notes",
@@ -386,7 +785,10 @@ def storage_view(storage_id):
             submitted = st.form_submit_button("➕ Add Item to Storage", type="primary", use_container_width=True)
             
             if submitted:
-                if new_name and new_quantity and new_status:
+                expiry_error = expiry_problem(new_expiry)
+                if expiry_error:
+                    st.error(expiry_error)
+                elif new_name and new_quantity and new_status:
                     # Set form state to prevent continuous adding
                     st.session_state.form_submitted = True
                     st.session_state.current_form_id = form_key
@@ -396,19 +798,290 @@ def storage_view(storage_id):
                 else:
                     st.error("Please fill in all required fields (Name, Quantity, Status)")
         
+        with st.expander("📥 Bulk Import (CSV/Excel)"):
+            bulk_import_panel(storage_id)
+        
         st.markdown("---")
         st.subheader("📊 Storage Stats")
         
         # Status distribution for this storage
-        status_count = {'Free': 0, 'Occupied': 0, 'Ordered': 0, 'Maintenance': 0, 'Broken': 0}
-        for item in storage['items']:
-            status_count[item['status']] += 1
+        storage_stats = inventory_stats.storage(storage_id) or {'status': {}}
         
         st.write("**Items by Status:**")
-        for status, count in status_count.items():
+        for status in STATUS_OPTIONS:
+            count = storage_stats['status'].get(status, 0)
             if count > 0:
                 st.write(f"{get_status_icon(status)} {status}: {count}")
 
+@profiler.instrument()
+def scan_view(storage_id):
+    """Read-only storage page for QR scans; edit controls load on request"""
+    page = scan_summaries.get(store, storage_id, render_scan_page)
+    if page is None:
+        st.error("Storage not found!")
+        return
+    
+    st.set_page_config(page_title=page['title'], page_icon="📦")
+    st.markdown(page['body'])
+    st.button("✏️ Manage Items", type="primary", use_container_width=True,
+              on_click=manage_storage, args=(storage_id,))
+
+def render_scan_page(storage_id, storage, today):
+    """Markdown for the scan page of one storage, built once per change"""
+    lines = [
+        f"# {get_storage_icon(storage['type'])} {storage['name']}",
+        f"**Type:** {storage['type'].title()} | **Location:** {storage['location']}",
+    ]
+    if storage.get('description'):
+        lines.append(f"**Description:** {storage['description']}")
+    lines.append(f"**Last Updated:** {storage['last_updated']} | **Total Items:** {len(storage['items'])}")
+    
+    if not storage['items']:
+        lines.append("📭 No items in this storage yet.")
+        return {'title': storage['name'], 'body': "\n\n".join(lines)}
+    
+    status_counts = Counter(item['status'] for item in storage['items'])
+    lines.append(" · ".join(f"{get_status_icon(status)} {status}: {status_counts[status]}"
+                            for status in STATUS_OPTIONS if status_counts[status]))
+    rows = ["| | Item | Quantity | Category | Expiry |", "|---|---|---|---|---|"]
+    for item in storage['items']:
+        expiry = f"{item['expiry']}{expiry_flag(item['expiry'], today)}" if item.get('expiry') else ""
+        cells = [get_status_icon(item['status']), item['name'], item['quantity'], item.get('category', ''), expiry]
+        rows.append("| " + " | ".join(str(cell).replace("|", "\\|").replace("\n", " ") for cell in cells) + " |")
+    lines.append("\n".join(rows))
+    return {'title': storage['name'], 'body': "\n\n".join(lines)}
+
+def manage_storage(storage_id):
+    """Switch a scanned storage page to the full editor"""
+    st.session_state.manage_storage = storage_id
+
+ITEM_VIEWS = ["📋 List", "🧮 Grid", "☑️ Select"]
+# Storages with more items than this open in the grid view
+GRID_VIEW_ITEMS = 50
+
+@profiler.instrument()
+def item_grid(storage_id, items):
+    """Items as one editable table; saving applies only the rows that changed"""
+    key = f"item_grid_{storage_id}"
+    # Rows are matched back to items by position when saving
+    st.session_state[f"{key}_base"] = [(item['id'], item['version']) for item in items]
+    frame = pd.DataFrame(items, columns=('id',) + ITEM_EDIT_FIELDS)
+    st.data_editor(
+        frame,
+        key=key,
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        disabled=('id',),
+        column_config={
+            'id': st.column_config.TextColumn("ID"),
+            'name': st.column_config.TextColumn("Name", required=True),
+            'quantity': st.column_config.TextColumn("Quantity", required=True),
+            'category': st.column_config.SelectboxColumn("Category", options=CATEGORIES, default=CATEGORIES[0]),
+            'status': st.column_config.SelectboxColumn("Status", options=STATUS_OPTIONS, default=STATUS_OPTIONS[0]),
+            'expiry': st.column_config.TextColumn("Expiry", help="YYYY-MM-DD"),
+            'notes': st.column_config.TextColumn("Notes"),
+        },
+    )
+    st.button("💾 Save changes", key=f"{key}_save", type="primary", on_click=save_item_grid, args=(storage_id,))
+
+def save_item_grid(storage_id):
+    """Button callback: apply the grid's edited, added and deleted rows"""
+    key = f"item_grid_{storage_id}"
+    changes = st.session_state.get(key)
+    base = st.session_state.get(f"{key}_base", [])
+    if not changes or not any(changes.values()):
+        st.info("No changes to save")
+        return
+    
+    problems = []
+    updated = 0
+    for position, edits in changes['edited_rows'].items():
+        if int(position) in changes['deleted_rows']:
+            continue
+        item_id, version = base[int(position)]
+        found = item_index.get(item_id)
+        if found is None:
+            problems.append(f"{item_id} was deleted by someone else")
+            continue
+        current = found[1]
+        item = {field: current[field] for field in ITEM_EDIT_FIELDS}
+        item.update({field: "" if value is None else value for field, value in edits.items()})
+        if all(item[field] == current[field] for field in ITEM_EDIT_FIELDS):
+            continue
+        try:
+            store.update_item(item_id, *(item[field] for field in ITEM_EDIT_FIELDS), expected_version=version)
+            updated += 1
+        except ConflictError:
+            problems.append(f"'{current['name']}' was changed by someone else; reload and edit it again")
+        except ValueError as e:
+            problems.append(f"{item_id}: {e}")
+    
+    new_rows = []
+    for row in changes['added_rows']:
+        row = {field: "" if row.get(field) is None else row[field] for field in ITEM_EDIT_FIELDS}
+        if not row['name'] or not row['quantity']:
+            problems.append("New rows need a name and a quantity")
+            continue
+        row['category'] = row['category'] or CATEGORIES[0]
+        row['status'] = row['status'] or STATUS_OPTIONS[0]
+        new_rows.append(dict(row, storage_id=storage_id))
+    try:
+        added = len(store.add_items(new_rows))
+    except ValueError as e:
+        added = 0
+        problems.append(f"New rows not added: {e}")
+    
+    removed = {base[position][0]: base[position][1] for position in changes['deleted_rows']}
+    try:
+        deleted = len(store.delete_items(removed, expected_versions=removed))
+    except (ConflictError, KeyError):
+        deleted = 0
+        problems.append("Deleted rows were changed by someone else; nothing was deleted")
+    
+    # The next run starts from the saved data
+    del st.session_state[key]
+    st.success(f"✅ {updated} updated, {added} added, {deleted} deleted")
+    for problem in problems:
+        st.warning(f"⚠️ {problem}")
+
+# Bulk actions: label -> item field they set (None deletes)
+BULK_ACTIONS = {"📦 Move": 'storage_id', "🏷️ Status": 'status', "🗂️ Category": 'category', "🗑️ Delete": None}
+
+def selection_checkbox(item, label):
+    """Checkbox adding an item to the bulk selection.
+
+    Its value is part of the widget identity, so boxes follow the selection
+    when it changes elsewhere (select all, clear, another page).
+    """
+    st.checkbox(label, value=item['id'] in st.session_state.bulk_selection, key=f"select_{item['id']}",
+                on_change=toggle_selection, args=(item['id'], item['version']))
+
+def toggle_selection(item_id, version):
+    """Checkbox callback: add or drop one item"""
+    if st.session_state[f"select_{item_id}"]:
+        st.session_state.bulk_selection[item_id] = version
+    else:
+        st.session_state.bulk_selection.pop(item_id, None)
+
+def select_items(item_ids):
+    """Button callback: add many items to the selection"""
+    for item_id in item_ids:
+        found = item_index.get(item_id)
+        if found is not None:
+            st.session_state.bulk_selection[item_id] = found[1]['version']
+
+def select_filtered(selections):
+    """Button callback: add every item matching the dashboard filters"""
+    select_items(facet_index.ids(facet_index.filter(selections)))
+
+def clear_selection():
+    """Empty the selection"""
+    st.session_state.bulk_selection = {}
+
+@profiler.instrument()
+def bulk_actions_panel(key_prefix):
+    """One form applying an action to every selected item; shown while items are selected"""
+    selected = len(st.session_state.bulk_selection)
+    if not selected:
+        return
+    
+    st.write(f"**☑️ {selected} items selected**")
+    with st.form(f"{key_prefix}_bulk"):
+        st.radio("Action", list(BULK_ACTIONS), horizontal=True, key=f"{key_prefix}_bulk_action")
+        st.selectbox("Move to", list(move_targets()), key=f"{key_prefix}_bulk_storage_id")
+        st.selectbox("New status", STATUS_OPTIONS, key=f"{key_prefix}_bulk_status")
+        st.selectbox("New category", CATEGORIES, key=f"{key_prefix}_bulk_category")
+        st.checkbox("Yes, delete the selected items", key=f"{key_prefix}_bulk_confirm")
+        st.form_submit_button("Apply to selected", type="primary", use_container_width=True,
+                              on_click=apply_bulk_action, args=(key_prefix,))
+    st.button("✖️ Clear selection", key=f"{key_prefix}_bulk_clear", on_click=clear_selection)
+
+def move_targets():
+    """{label: storage ID} for the move selectbox; the ID tells same-named storages apart"""
+    return {f"{name} ({storage_id})": storage_id for storage_id, name in store.storage_names().items()}
+
+def apply_bulk_action(key_prefix):
+    """Form callback: run the chosen action on the whole selection in one transaction"""
+    state = st.session_state
+    selection = state.bulk_selection
+    action = state[f"{key_prefix}_bulk_action"]
+    field = BULK_ACTIONS[action]
+    try:
+        if field is None:
+            if not state[f"{key_prefix}_bulk_confirm"]:
+                st.warning("Tick the confirmation box to delete the selected items.")
+                return
+            changed = store.delete_items(selection, expected_versions=selection)
+        else:
+            value = state[f"{key_prefix}_bulk_{field}"]
+            if field == 'storage_id':
+                value = move_targets().get(value, value)
+            changed = store.update_items(selection, expected_versions=selection, **{field: value})
+    except ConflictError as e:
+        # Nothing was written; re-applying goes ahead with the current version
+        selection[e.record_id] = e.current['version']
+        st.warning(f"⚠️ '{e.current['name']}' was changed by someone else after you selected it. "
+                   "Nothing was changed; check it and apply again.")
+        return
+    except KeyError as e:
+        selection.pop(e.args[0], None)
+        st.warning("⚠️ A selected item or the target storage was deleted by someone else. Nothing was changed.")
+        return
+    clear_selection()
+    done = "deleted" if field is None else "moved" if field == 'storage_id' else "updated"
+    st.success(f"✅ {len(changed)} items {done}")
+
+@profiler.instrument()
+def bulk_import_panel(storage_id):
+    """Upload a spreadsheet, check it in one pass and import the valid rows"""
+    upload_key = f"import_file_{storage_id}_{st.session_state.get('import_round', 0)}"
+    uploaded = st.file_uploader("CSV or Excel file", type=["csv", "xlsx"], key=upload_key)
+    if uploaded is None:
+        st.caption("Columns: " + ", ".join(IMPORT_FIELDS) + " (name and quantity required)")
+        return
+    
+    try:
+        df = read_table(uploaded.getvalue(), uploaded.name)
+    except Exception as e:
+        st.error(f"❌ Could not read file: {e}")
+        return
+    
+    none_label = "— none —"
+    columns = [none_label] + [str(column) for column in df.columns]
+    guessed = guess_mapping(df.columns)
+    mapping = {}
+    for field in IMPORT_FIELDS:
+        default = str(guessed[field]) if guessed[field] is not None else none_label
+        label = f"{field.title()}{'*' if field in REQUIRED_FIELDS else ''} column"
+        choice = st.selectbox(label, columns, index=columns.index(default), key=f"{upload_key}_{field}")
+        mapping[field] = df.columns[columns.index(choice) - 1] if choice != none_label else None
+    
+    default_category = st.selectbox("Category when blank", CATEGORIES, key=f"{upload_key}_category")
+    default_status = st.selectbox("Status when blank", STATUS_OPTIONS, key=f"{upload_key}_status")
+    
+    report = prepare_import(df, mapping, storage_id, default_category, default_status)
+    valid = len(report.rows)
+    st.write(f"✅ {valid} valid · ❌ {report.total - valid} invalid of {report.total} rows")
+    if len(report.errors):
+        st.dataframe(report.errors, hide_index=True, use_container_width=True)
+    if valid:
+        quantities = parse_quantity_series(report.rows['quantity'])
+        unreadable = int(quantities['unit'].isna().sum())
+        if unreadable:
+            st.warning(f"⚠️ {unreadable} quantities have no recognised unit and won't count towards stock totals")
+        preview = report.rows.drop(columns="storage_id").assign(unit=quantities['unit'])
+        st.dataframe(preview.head(20), hide_index=True, use_container_width=True)
+        st.button(f"📥 Import {valid} items", type="primary", use_container_width=True,
+                  key=f"{upload_key}_import", on_click=import_items, args=(report,))
+
+def import_items(report):
+    """Commit a checked import and reset the uploader"""
+    item_ids = commit_import(store, report)
+    st.session_state.import_round = st.session_state.get('import_round', 0) + 1
+    st.success(f"✅ Imported {len(item_ids)} items!")
+
+@profiler.instrument()
 def add_storage_view():
     """View for adding new storage"""
     st.set_page_config(page_title="Add Storage", page_icon="➕")
@@ -422,7 +1095,7 @@ def add_storage_view():
     with st.form(form_key, clear_on_submit=True):
         name = st.text_input("Storage Name*", placeholder="e.g., Drawer A1 - Chemicals",
                            value="" if not form_just_submitted else "")
-        storage_type = st.selectbox("Storage Type*", st.session_state.inventory['storage_types'])
+        storage_type = st.selectbox("Storage Type*", STORAGE_TYPES)
         location = st.text_input("Location*", placeholder="e.g., Lab Room 101",
                                value="" if not form_just_submitted else "")
         description = st.text_area("Description (optional)", placeholder="Additional details about this storage",
@@ -452,19 +1125,45 @@ def add_storage_view():
             else:
                 st.error("Please fill in all required fields (Name, Type, Location)")
 
+@profiler.instrument()
 def edit_storage_view(storage_id):
     """View for editing a storage"""
-    storage = st.session_state.inventory['storages'][storage_id]
+    storage = store.get_storage(storage_id)
+    if storage is None:
+        st.error("Storage not found!")
+        close_storage_editor()
+        reset_form_state()
+        st.rerun()
+        return
+    
+    base = st.session_state.get('editing_storage_base')
+    if base is None or base.get('id') != storage_id:
+        base = st.session_state.editing_storage_base = storage_edit_base(storage_id, storage)
     
     st.set_page_config(page_title="Edit Storage", page_icon="✏️")
-    st.title(f"✏️ Edit Storage: {storage['name']}")
+    st.title(f"✏️ Edit Storage: {base['name']}")
+    
+    conflict = st.session_state.get('storage_conflict')
+    if conflict:
+        show_conflict(conflict['mine'], conflict['current'], STORAGE_EDIT_FIELDS, "storage")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("💾 Keep My Changes", type="primary", use_container_width=True,
+                      on_click=keep_my_storage_edit, args=(storage_id,))
+        with col2:
+            st.button("🔄 Use Their Version", use_container_width=True,
+                      on_click=discard_my_storage_edit, args=(storage_id,))
+        return
+    if storage['version'] != base['version']:
+        st.warning("⚠️ Someone else has saved changes to this storage since you opened it. "
+                   "Saving will show both versions so you can choose.")
     
     with st.form("edit_storage_form"):
-        name = st.text_input("Storage Name*", value=storage['name'])
-        storage_type = st.selectbox("Storage Type*", st.session_state.inventory['storage_types'], 
-                                   index=st.session_state.inventory['storage_types'].index(storage['type']))
-        location = st.text_input("Location*", value=storage['location'])
-        description = st.text_area("Description", value=storage.get('description', ''))
+        name = st.text_input("Storage Name*", value=base['name'])
+        storage_type = st.selectbox("Storage Type*", STORAGE_TYPES, 
+                                   index=STORAGE_TYPES.index(base['type']))
+        location = st.text_input("Location*", value=base['location'])
+        description = st.text_area("Description", value=base.get('description', ''))
         
         col1, col2 = st.columns(2)
         with col1:
@@ -473,37 +1172,64 @@ def edit_storage_view(storage_id):
             cancel = st.form_submit_button("❌ Cancel", use_container_width=True)
         
         if cancel:
-            st.session_state.editing_storage = None
+            close_storage_editor()
             reset_form_state()
             st.rerun()
             
         if submit:
             if name and location and storage_type:
-                update_storage(storage_id, name, storage_type, location, description)
-                st.session_state.editing_storage = None
+                if update_storage(storage_id, name, storage_type, location, description, base['version']):
+                    close_storage_editor()
                 reset_form_state()
                 st.rerun()
             else:
                 st.error("Please fill in all required fields")
 
-def edit_item_view(storage_id, item_index):
+@profiler.instrument()
+def edit_item_view(item_id):
     """View for editing an item"""
-    item = st.session_state.inventory['storages'][storage_id]['items'][item_index]
-    storage_name = st.session_state.inventory['storages'][storage_id]['name']
+    found = item_index.get(item_id)
+    if found is None:
+        st.error("Item not found!")
+        close_item_editor()
+        reset_form_state()
+        st.rerun()
+        return
+    
+    storage_id, item = found
+    storage_name = store.get_storage(storage_id)['name']
+    base = st.session_state.get('editing_item_base')
+    if base is None or base.get('id') != item_id:
+        base = st.session_state.editing_item_base = dict(item)
     
     st.set_page_config(page_title="Edit Item", page_icon="✏️")
     st.title(f"✏️ Edit Item - {storage_name}")
     
+    conflict = st.session_state.get('item_conflict')
+    if conflict:
+        show_conflict(conflict['mine'], conflict['current'], ITEM_EDIT_FIELDS, "item")
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("💾 Keep My Changes", type="primary", use_container_width=True,
+                      on_click=keep_my_item_edit, args=(item_id,))
+        with col2:
+            st.button("🔄 Use Their Version", use_container_width=True, on_click=discard_my_item_edit)
+        return
+    if item['version'] != base['version']:
+        st.warning("⚠️ Someone else has saved changes to this item since you opened it. "
+                   "Saving will show both versions so you can choose.")
+    
+    # The form shows the item as it was when editing started, so widgets stay stable
     with st.form("edit_item_form"):
-        name = st.text_input("Item Name*", value=item['name'])
-        quantity = st.text_input("Quantity*", value=item['quantity'])
-        category = st.selectbox("Category", st.session_state.inventory['categories'], 
-                               index=st.session_state.inventory['categories'].index(item['category']) 
-                               if item['category'] in st.session_state.inventory['categories'] else 0)
-        status = st.selectbox("Status*", st.session_state.inventory['status_options'],
-                             index=st.session_state.inventory['status_options'].index(item['status']))
-        expiry = st.text_input("Expiry Date", value=item.get('expiry', ''))
-        notes = st.text_area("Notes", value=item.get('notes', ''))
+        name = st.text_input("Item Name*", value=base['name'])
+        quantity = st.text_input("Quantity*", value=base['quantity'])
+        category = st.selectbox("Category", CATEGORIES, 
+                               index=CATEGORIES.index(base['category']) 
+                               if base['category'] in CATEGORIES else 0)
+        status = st.selectbox("Status*", STATUS_OPTIONS,
+                             index=STATUS_OPTIONS.index(base['status']))
+        expiry = st.text_input("Expiry Date", value=base.get('expiry', ''), placeholder="YYYY-MM-DD")
+        notes = st.text_area("Notes", value=base.get('notes', ''))
         
         col1, col2 = st.columns(2)
         with col1:
@@ -512,23 +1238,91 @@ def edit_item_view(storage_id, item_index):
             cancel = st.form_submit_button("❌ Cancel", use_container_width=True)
         
         if cancel:
-            st.session_state.editing_item = None
+            close_item_editor()
             reset_form_state()
             st.rerun()
             
         if submit:
-            if name and quantity and status:
-                update_item(storage_id, item_index, name, quantity, category, status, expiry, notes)
-                st.session_state.editing_item = None
+            expiry_error = expiry_problem(expiry)
+            if expiry_error:
+                st.error(expiry_error)
+            elif name and quantity and status:
+                if update_item(item_id, name, quantity, category, status, expiry, notes, base['version']):
+                    close_item_editor()
                 reset_form_state()
                 st.rerun()
             else:
                 st.error("Please fill in all required fields")
 
+ITEM_EDIT_FIELDS = ('name', 'quantity', 'category', 'status', 'expiry', 'notes')
+STORAGE_EDIT_FIELDS = ('name', 'type', 'location', 'description')
+
+def show_conflict(mine, current, fields, kind):
+    """Side-by-side view of a rejected edit and the version saved in the meantime"""
+    st.error(f"⚠️ Someone else saved this {kind} while you were editing. Your changes were not saved yet.")
+    rows = [{'Field': field.title(), 'Your Changes': mine[field], 'Saved Version': current[field]}
+            for field in fields if mine[field] != current[field]]
+    if rows:
+        st.table(pd.DataFrame(rows).set_index('Field'))
+    else:
+        st.info("Both versions have the same values.")
+
+def close_item_editor():
+    """Leave the item editor and forget its edit state"""
+    st.session_state.editing_item = None
+    st.session_state.editing_item_base = None
+    st.session_state.item_conflict = None
+
+def close_storage_editor():
+    """Leave the storage editor and forget its edit state"""
+    st.session_state.editing_storage = None
+    st.session_state.editing_storage_base = None
+    st.session_state.storage_conflict = None
+
+def keep_my_item_edit(item_id):
+    """Save the conflicting edit over the version it clashed with"""
+    conflict = st.session_state.item_conflict
+    mine = conflict['mine']
+    if update_item(item_id, mine['name'], mine['quantity'], mine['category'], mine['status'],
+                   mine['expiry'], mine['notes'], conflict['current']['version']):
+        close_item_editor()
+
+def discard_my_item_edit():
+    """Drop the conflicting edit and continue from the saved version"""
+    st.session_state.editing_item_base = dict(st.session_state.item_conflict['current'])
+    st.session_state.item_conflict = None
+
+def keep_my_storage_edit(storage_id):
+    """Save the conflicting edit over the version it clashed with"""
+    conflict = st.session_state.storage_conflict
+    mine = conflict['mine']
+    if update_storage(storage_id, mine['name'], mine['type'], mine['location'], mine['description'],
+                      conflict['current']['version']):
+        close_storage_editor()
+
+def discard_my_storage_edit(storage_id):
+    """Drop the conflicting edit and continue from the saved version"""
+    current = st.session_state.storage_conflict['current']
+    st.session_state.editing_storage_base = storage_edit_base(storage_id, current)
+    st.session_state.storage_conflict = None
+
+def storage_edit_base(storage_id, storage):
+    """Storage fields and version an edit starts from"""
+    base = {k: v for k, v in storage.items() if k != 'items'}
+    base['id'] = storage_id
+    return base
+
+@profiler.instrument()
 def delete_confirmation_view():
     """View for confirming storage deletion"""
     storage_id = st.session_state.storage_to_delete
-    storage = st.session_state.inventory['storages'][storage_id]
+    storage = store.get_storage(storage_id)
+    if storage is None:
+        st.error("Storage not found!")
+        st.session_state.storage_to_delete = None
+        reset_form_state()
+        st.rerun()
+        return
     
     st.set_page_config(page_title="Confirm Delete", page_icon="🗑️")
     st.title("🗑️ Confirm Storage Deletion")
@@ -553,77 +1347,85 @@ def delete_confirmation_view():
             st.rerun()
 
 # Core CRUD Operations
+def expiry_problem(expiry):
+    """Validation message for an expiry field, or None if it is blank or a date"""
+    try:
+        parse_expiry(expiry)
+    except ValueError:
+        return "Expiry must be a date such as 2025-12-31 (also accepted: 31/12/2025, 12/2025, Dec 2025)"
+    return None
+
 def add_new_storage(name, storage_type, location, description=""):
     """Add a new storage to inventory"""
-    storage_id = f"{storage_type}_{name.lower().replace(' ', '_').replace('-', '_')}_{datetime.now().strftime('%H%M%S')}"
-    
-    st.session_state.inventory['storages'][storage_id] = {
-        'name': name,
-        'type': storage_type,
-        'location': location,
-        'description': description,
-        'items': [],
-        'last_updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    }
+    store.add_storage(name, storage_type, location, description)
     st.success(f"✅ Storage '{name}' added successfully!")
 
-def update_storage(storage_id, name, storage_type, location, description=""):
-    """Update storage details"""
-    st.session_state.inventory['storages'][storage_id].update({
-        'name': name,
-        'type': storage_type,
-        'location': location,
-        'description': description,
-        'last_updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    })
+def update_storage(storage_id, name, storage_type, location, description="", expected_version=None):
+    """Update storage details; returns False if someone else saved first"""
+    try:
+        store.update_storage(storage_id, name, storage_type, location, description, expected_version)
+    except KeyError:
+        st.error("Storage not found!")
+        return True
+    except ConflictError as e:
+        st.session_state.storage_conflict = {
+            'mine': {'name': name, 'type': storage_type, 'location': location, 'description': description},
+            'current': e.current,
+        }
+        return False
     st.success(f"✅ Storage '{name}' updated successfully!")
+    return True
 
 def delete_storage(storage_id):
     """Delete a storage and all its items"""
-    storage_name = st.session_state.inventory['storages'][storage_id]['name']
-    del st.session_state.inventory['storages'][storage_id]
+    storage_name = store.delete_storage(storage_id)
     st.session_state.current_storage = None
     st.success(f"✅ Storage '{storage_name}' deleted successfully!")
 
 def add_item_to_storage(storage_id, name, quantity, category, status, expiry="", notes=""):
     """Add an item to a storage"""
-    item_id = f"item_{len(st.session_state.inventory['storages'][storage_id]['items']) + 1:03d}"
-    
-    st.session_state.inventory['storages'][storage_id]['items'].append({
-        'id': item_id,
-        'name': name,
-        'quantity': quantity,
-        'category': category,
-        'status': status,
-        'expiry': expiry,
-        'notes': notes
-    })
-    
-    st.session_state.inventory['storages'][storage_id]['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    store.add_item(storage_id, name, quantity, category, status, expiry, notes)
     st.success(f"✅ Item '{name}' added successfully!")
 
-def update_item(storage_id, item_index, name, quantity, category, status, expiry="", notes=""):
-    """Update an item"""
-    st.session_state.inventory['storages'][storage_id]['items'][item_index].update({
-        'name': name,
-        'quantity': quantity,
-        'category': category,
-        'status': status,
-        'expiry': expiry,
-        'notes': notes
-    })
-    
-    st.session_state.inventory['storages'][storage_id]['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def update_item(item_id, name, quantity, category, status, expiry="", notes="", expected_version=None):
+    """Update an item; returns False if someone else saved first"""
+    try:
+        store.update_item(item_id, name, quantity, category, status, expiry, notes, expected_version)
+    except ConflictError as e:
+        st.session_state.item_conflict = {
+            'mine': {'name': name, 'quantity': quantity, 'category': category, 'status': status,
+                     'expiry': expiry, 'notes': notes},
+            'current': e.current,
+        }
+        return False
     st.success(f"✅ Item '{name}' updated successfully!")
+    return True
 
-def delete_item(storage_id, item_index):
-    """Delete an item from storage"""
-    item_name = st.session_state.inventory['storages'][storage_id]['items'][item_index]['name']
-    del st.session_state.inventory['storages'][storage_id]['items'][item_index]
-    st.session_state.inventory['storages'][storage_id]['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def delete_item(item_id, expected_version=None):
+    """Delete an item from storage unless it changed since it was shown"""
+    try:
+        item_name = store.delete_item(item_id, expected_version)
+    except ConflictError as e:
+        st.warning(f"⚠️ '{e.current['name']}' was changed by someone else just now. Check it and delete again.")
+        return
     st.success(f"✅ Item '{item_name}' deleted successfully!")
 
 # Utility Functions
+def expiry_flag(expiry, today=None):
+    """Warning suffix for expired or nearly expired items"""
+    try:
+        expires = parse_expiry(expiry)
+    except ValueError:
+        return ""
+    if expires is None:
+        return ""
+    days_left = (expires - (today or datetime.now().date())).days
+    if days_left < 0:
+        return " ⚠️ expired"
+    if days_left <= 30:
+        return f" ⏳ {days_left} days left"
+    return ""
+
 def get_storage_icon(storage_type):
     """Get icon for storage type"""
     icons = {
@@ -644,38 +1446,89 @@ def get_status_icon(status):
     }
     return icons.get(status, '⚪')
 
-def search_items(search_term):
-    """Search items across all storages"""
-    results = []
-    search_term = search_term.lower()
-    
-    for storage_id, storage in st.session_state.inventory['storages'].items():
-        for item in storage['items']:
-            if (search_term in item['name'].lower() or 
-                search_term in item.get('category', '').lower() or
-                search_term in str(item.get('id', '')).lower()):
-                results.append({
-                    'storage_id': storage_id,
-                    'storage_name': storage['name'],
-                    'item': item
-                })
-    
-    return results
+SEARCH_RESULTS_SHOWN = 5
 
-def export_inventory_data():
-    """Export inventory data as JSON"""
-    inventory_json = json.dumps(st.session_state.inventory, indent=2, ensure_ascii=False)
+@profiler.instrument()
+def search_items(search_term, limit=None):
+    """Ranked, typo-tolerant search across items and storages, returning (results, total matches)"""
+    return search_index.search(search_term, limit)
+
+@profiler.instrument()
+def build_export(fmt="json", compress=False):
+    """Whole-inventory export as bytes, written from the store in chunks"""
+    buf = io.BytesIO()
+    write_export(store, buf, fmt, compress)
+    return buf.getvalue()
+
+@st.cache_resource(max_entries=2, show_spinner="Preparing export...")
+def cached_export(generation, fmt, compress):
+    """Export bytes for one store generation, reused until the inventory changes"""
+    return build_export(fmt, compress)
+
+def export_inventory_data(fmt="json", compress=False):
+    """One-click download of the inventory export"""
+    st.download_button(
+        f"📥 Download Inventory Data ({fmt.upper()})",
+        cached_export(store.generation, fmt, compress),
+        export_filename(fmt, compress),
+        export_mime(fmt, compress),
+        use_container_width=True
+    )
+    # Streamlit needs the whole payload up front; the CLI streams to disk instead
+    st.caption("The download is held in memory; for very large inventories use `python -m inventory export`.")
+
+@profiler.instrument()
+def export_label_sheets(storages, app_url, fmt="pdf", layout="a4"):
+    """Render label sheets for all storages and offer them for download"""
+    with st.spinner(f"Rendering {len(storages)} labels..."):
+        data = label_sheet_bytes(storages, app_url, fmt, layout)
     
     st.download_button(
-        "📥 Download Inventory Data (JSON)",
-        inventory_json,
-        f"lab_inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-        "application/json",
+        f"📥 Download Labels ({fmt.upper()})",
+        data,
+        f"lab_labels_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}",
+        "application/pdf" if fmt == "pdf" else "application/zip",
         use_container_width=True
     )
 
+# Debug instrumentation
+def debug_enabled():
+    """The debug panel is hidden unless INVENTORY_DEBUG is set or the URL has ?debug=1"""
+    if os.environ.get("INVENTORY_DEBUG", "") not in ("", "0"):
+        return True
+    return st.experimental_get_query_params().get('debug', ['0'])[0] not in ("", "0")
+
+def debug_panel():
+    """Rolling timings, cache hit rates and an optional cProfile capture"""
+    with st.expander("🛠️ Debug: Performance"):
+        timings = profiler.report()
+        if timings:
+            st.dataframe(pd.DataFrame(timings).round(2), hide_index=True, use_container_width=True)
+        
+        qr_stats = qr_cache.stats()
+        st.write(f"**QR cache:** {qr_stats['hit_rate']:.0%} hit rate "
+                 f"({qr_stats['hits']} memory, {qr_stats['disk_hits']} disk, {qr_stats['misses']} misses, "
+                 f"{qr_stats['evictions']} evictions)")
+        st.write(f"**Analytics snapshot builds:** {inventory_analytics.builds} · "
+                 f"**Indexed items:** {len(item_index)} · **Store generation:** {store.generation}")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.button("🔬 Profile next rerun", use_container_width=True, on_click=profiler.capture_next_rerun)
+        with col2:
+            st.button("🧹 Reset timings", use_container_width=True, on_click=profiler.reset)
+        if profiler.last_capture:
+            st.code(profiler.last_capture, language=None)
+
 # Main routing logic
 def main():
+    with profiler.rerun():
+        route()
+    if debug_enabled():
+        debug_panel()
+
+def route():
+    """Render the view selected by session state and query parameters"""
     try:
         # Handle delete confirmation
         if hasattr(st.session_state, 'storage_to_delete') and st.session_state.storage_to_delete:
@@ -692,16 +1545,25 @@ def main():
             return
             
         if hasattr(st.session_state, 'editing_item') and st.session_state.editing_item:
-            storage_id, item_index = st.session_state.editing_item
-            edit_item_view(storage_id, item_index)
+            edit_item_view(st.session_state.editing_item)
+            return
+        
+        if st.session_state.get('show_analytics'):
+            analytics_view()
             return
         
         # Check query parameters for storage view
         query_params = st.experimental_get_query_params()
         if 'storage' in query_params:
-            storage_id = query_params['storage'][0]
-            if storage_id in st.session_state.inventory['storages']:
-                storage_view(storage_id)
+            storage_id = store.resolve_storage_id(query_params['storage'][0])
+            if storage_id is not None:
+                if storage_id != query_params['storage'][0]:
+                    # Legacy ID from an old QR label: show the short code in the address bar
+                    st.experimental_set_query_params(**{**query_params, 'storage': storage_id})
+                if st.session_state.get('manage_storage') == storage_id:
+                    storage_view(storage_id)
+                else:
+                    scan_view(storage_id)
                 return
         
         # Check session state for storage view
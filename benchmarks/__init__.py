@@ -0,0 +1,3 @@
+# benchmarks - Synthetic inventories and timings for the Lab Inventory app
+#
+# Run with: python -m benchmarks.run --storages 200 --items 50 -o results.json
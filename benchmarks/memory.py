@@ -0,0 +1,121 @@
+# benchmarks/memory.py - Per-item memory of the item index and every other app index on a synthetic inventory
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic import generate_inventory
+
+
+def measure(build):
+    """Return (bytes still allocated once build() returns, its result)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def dict_layout(store):
+    """The item index as it was before ItemRecord: a dict per item behind a (pk, storage_id, item) tuple"""
+    items, by_storage = {}, {}
+    for pk, storage_id, item in store.iter_item_records():
+        items[item['id']] = (pk, storage_id, item)
+        by_storage.setdefault(storage_id, {})[item['id']] = item
+    return items, by_storage
+
+
+def record_layout(store):
+    """The current ItemIndex"""
+    from inventory.items import ItemIndex
+
+    index = ItemIndex()
+    index.rebuild(store)
+    return index
+
+
+def app_listeners():
+    """(name, factory) for every index the app subscribes, in app.py's order; factories get the item index"""
+    from inventory.analytics import InventoryAnalytics
+    from inventory.expiry import ExpiryIndex
+    from inventory.facets import FacetIndex
+    from inventory.quantity import StockTotals
+    from inventory.search import SearchIndex
+    from inventory.stats import InventoryStats
+
+    return [
+        ('search', SearchIndex),
+        ('stats', lambda items: InventoryStats()),
+        ('analytics', lambda items: InventoryAnalytics()),  # its frame is built on first use
+        ('expiry', ExpiryIndex),
+        ('stock', lambda items: StockTotals()),
+        ('facets', lambda items: FacetIndex()),
+    ]
+
+
+def measure_listeners(store):
+    """{name: bytes} for the item index and every other app index built on top of it"""
+    items_size, items = measure(lambda: record_layout(store))
+    sizes = {'items': items_size}
+    kept = [items]
+    for name, factory in app_listeners():
+        def build():
+            listener = factory(items)
+            listener.rebuild(store)
+            if hasattr(listener, 'frame'):
+                listener.frame()
+            return listener
+        sizes[name], listener = measure(build)
+        kept.append(listener)
+    return sizes
+
+
+def main(argv=None):
+    """Command-line entry point: python -m benchmarks.memory"""
+    parser = argparse.ArgumentParser(description="Per-item memory of the item index layouts and every app index")
+    parser.add_argument("--storages", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=100, help="items per storage")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    from inventory.store import InventoryStore
+
+    with tempfile.TemporaryDirectory(prefix="inventory_mem_") as workdir:
+        store = InventoryStore(os.path.join(workdir, "bench.db"))
+        generate_inventory(store, args.storages, args.items, args.seed)
+        total = args.storages * args.items
+        print(f"{total} items in {args.storages} storages", file=sys.stderr)
+
+        sizes = {}
+        for name, build in (('dicts', dict_layout), ('records', record_layout)):
+            size, layout = measure(lambda: build(store))
+            sizes[name] = size
+            del layout
+        listener_sizes = measure_listeners(store)
+        store.close()
+
+    print("item index")
+    print(f"{'layout':10} {'total':>10} {'per item':>10}")
+    for name, size in sizes.items():
+        print(f"{name:10} {size / 2 ** 20:8.1f}MB {size / total:9.0f}B")
+    print(f"records use {sizes['records'] / sizes['dicts']:.0%} of the dict layout")
+
+    # The item index is one of several per-item structures the app keeps
+    everything = sum(listener_sizes.values())
+    print("\nall app indexes")
+    print(f"{'index':10} {'total':>10} {'per item':>10} {'share':>6}")
+    for name, size in listener_sizes.items():
+        print(f"{name:10} {size / 2 ** 20:8.1f}MB {size / total:9.0f}B {size / everything:6.0%}")
+    print(f"{'all':10} {everything / 2 ** 20:8.1f}MB {everything / total:9.0f}B")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
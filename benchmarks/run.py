@@ -0,0 +1,225 @@
+# benchmarks/run.py - Time the app's hot paths on a synthetic inventory
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.synthetic import generate_inventory
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_TERMS = ('eth', 'pipette', 'ethnaol', 'cold room ethanol', 'chemical', 'item_0001', 'zz-no-match')
+APP_EXPORT_FORMATS = ('json', 'ndjson', 'csv', 'parquet')
+# Slowdowns smaller than this are timer noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.0005
+
+
+def timed(fn, repeat=5, setup=None):
+    """Run fn repeat times; returns summary statistics in seconds"""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        'runs': repeat,
+        'min': min(samples),
+        'median': statistics.median(samples),
+        'mean': statistics.fmean(samples),
+        'max': max(samples),
+    }
+
+
+def bench_app(repeat):
+    """Time app.py helpers in-process; INVENTORY_DB and QR_CACHE_DIR must already be set"""
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    import app
+
+    results = {}
+    for term in SEARCH_TERMS:
+        results[f"search_items[{term}]"] = timed(lambda: app.search_items(term, limit=5), repeat,
+                                                 setup=app.search_index.clear_cache)
+    results["search_items[eth,all]"] = timed(lambda: app.search_items('eth'), repeat,
+                                             setup=app.search_index.clear_cache)
+    # Typeahead: each keystroke reuses the matches cached for the earlier words
+    results["search_items[typeahead]"] = timed(
+        lambda: [app.search_items("cold room ethanol"[:end], limit=5) for end in range(1, 18)], repeat,
+        setup=app.search_index.clear_cache)
+
+    results["aggregates.summary"] = timed(app.inventory_stats.summary, repeat)
+    results["aggregates.rebuild"] = timed(lambda: app.InventoryStats().rebuild(app.store), repeat)
+    results["aggregates.page_storages"] = timed(lambda: app.store.page_storages(0, 20, 'items'), repeat)
+    analytics = app.InventoryAnalytics()
+    analytics.rebuild(app.store)
+    results["analytics.build"] = timed(analytics.frame, 1)
+    results["analytics.reports"] = timed(lambda: (analytics.status_by_location(), analytics.category_by_type(),
+                                                  analytics.storage_density()), repeat)
+
+    facet_query = {'category': ['Chemical'], 'status': ['Free'], 'type': ['fridge', 'freezer']}
+    results["facets.filter_counts"] = timed(lambda: (app.facet_index.ids(app.facet_index.filter(facet_query), limit=200),
+                                                     app.facet_index.counts(facet_query)), repeat)
+
+    app_url = app.get_app_url()
+    counter = iter(range(10 ** 9))
+    results["generate_qr_code_safe[cold]"] = timed(
+        lambda: app.generate_qr_code_safe(f"{app_url}?storage=bench_{next(counter)}"), repeat)
+    results["generate_qr_code_safe[disk]"] = timed(
+        lambda: app.generate_qr_code_safe(app_url), repeat, setup=app.qr_cache.clear)
+    results["generate_qr_code_safe[warm]"] = timed(lambda: app.generate_qr_code_safe(app_url), repeat)
+
+    for fmt in APP_EXPORT_FORMATS:
+        try:
+            results[f"build_export[{fmt}]"] = timed(lambda: app.build_export(fmt), repeat)
+        except ImportError as e:
+            print(f"skipping {fmt} export: {e}", file=sys.stderr)
+    return results
+
+
+def bench_apptest(repeat, storage_id):
+    """Time full script runs of the dashboard, a storage page (list and grid) and a scanned page through AppTest"""
+    from streamlit.testing.v1 import AppTest
+
+    _patch_apptest_blocks()
+    script = os.path.join(ROOT, "app.py")
+    results = {}
+
+    results["apptest.main_dashboard[first]"] = timed(
+        lambda: AppTest.from_file(script, default_timeout=120).run(), 1)
+    at = AppTest.from_file(script, default_timeout=120).run()
+    _check(at, "main_dashboard")
+    results["apptest.main_dashboard[rerun]"] = timed(at.run, repeat)
+
+    at.session_state.current_storage = storage_id
+    at.run()
+    _check(at, "storage_view")
+    results["apptest.storage_view[rerun]"] = timed(at.run, repeat)
+    at.radio(key=f"item_view_{storage_id}").set_value("🧮 Grid").run()
+    _check(at, "storage_view[grid]")
+    results["apptest.storage_view[grid]"] = timed(at.run, repeat)
+
+    scan = AppTest.from_file(script, default_timeout=120)
+    scan.query_params = {'storage': [storage_id]}
+    scan.run()
+    _check(scan, "scan_view")
+    results["apptest.scan_view[rerun]"] = timed(scan.run, repeat)
+    return results
+
+
+def _check(at, view):
+    if at.exception:
+        raise RuntimeError(f"{view} raised: {[e.value for e in at.exception]}")
+
+
+def _patch_apptest_blocks():
+    # AppTest in Streamlit 1.28 asserts on block protos without a type (plain st.container)
+    import streamlit.testing.v1.element_tree as element_tree
+
+    if getattr(element_tree.Block, "_bench_patched", False):
+        return
+    original = element_tree.Block.__init__
+
+    def init(self, proto, root):
+        if proto is not None and proto.WhichOneof("type") is None:
+            proto = None
+        original(self, proto, root)
+
+    element_tree.Block.__init__ = init
+    element_tree.Block._bench_patched = True
+
+
+def environment(args):
+    """Versions and parameters recorded with every result file"""
+    import streamlit
+
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'streamlit': streamlit.__version__,
+        'storages': args.storages,
+        'items_per_storage': args.items,
+        'seed': args.seed,
+        'repeat': args.repeat,
+    }
+
+
+def compare(baseline, current, threshold=1.2):
+    """Print median timings side by side; returns the names that regressed beyond threshold"""
+    regressions = []
+    print(f"{'benchmark':48} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, stats in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:48} {'-':>10} {stats['median'] * 1000:9.2f}ms {'new':>7}")
+            continue
+        ratio = stats['median'] / before['median'] if before['median'] else float('inf')
+        slower = stats['median'] - before['median'] > MIN_REGRESSION_SECONDS
+        flag = " !" if ratio > threshold and slower else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:48} {before['median'] * 1000:9.2f}ms {stats['median'] * 1000:9.2f}ms {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    """Command-line entry point: python -m benchmarks.run"""
+    parser = argparse.ArgumentParser(description="Benchmark the lab inventory app on synthetic data")
+    parser.add_argument("--storages", type=int, default=200)
+    parser.add_argument("--items", type=int, default=50, help="items per storage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-apptest", action="store_true", help="only time helpers, not full reruns")
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="inventory_bench_") as workdir:
+        # The app reads these when its cached resources are first created
+        os.environ["INVENTORY_DB"] = os.path.join(workdir, "bench.db")
+        os.environ["QR_CACHE_DIR"] = os.path.join(workdir, "qr_cache")
+        os.environ["INVENTORY_SNAPSHOT_DIR"] = os.path.join(workdir, "snapshots")
+
+        from inventory.store import InventoryStore
+
+        store = InventoryStore(os.environ["INVENTORY_DB"])
+        start = time.perf_counter()
+        storage_ids = generate_inventory(store, args.storages, args.items, args.seed)
+        generated = time.perf_counter() - start
+        store.close()
+        print(f"generated {args.storages} storages x {args.items} items in {generated:.2f}s", file=sys.stderr)
+
+        results = {'generate_inventory': {'runs': 1, 'min': generated, 'median': generated,
+                                          'mean': generated, 'max': generated}}
+        results.update(bench_app(args.repeat))
+        if not args.skip_apptest:
+            results.update(bench_apptest(args.repeat, storage_ids[0]))
+
+    report = {'meta': environment(args), 'results': results}
+    with open(args.output, "w") as out:
+        json.dump(report, out, indent=2)
+    print(f"wrote {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
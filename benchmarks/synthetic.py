@@ -0,0 +1,73 @@
+# benchmarks/synthetic.py - Seeded generator for realistic lab inventories
+import random
+from datetime import date, timedelta
+
+from inventory.store import CATEGORIES, STATUS_OPTIONS, STORAGE_TYPES
+
+LOCATIONS = ['Lab Room 101', 'Lab Room 102', 'Lab Room 103', 'Prep Room', 'Cold Room', 'Instrument Bay',
+             'Store Room', 'Teaching Lab']
+
+# category -> (item names, quantity templates)
+ITEM_CATALOGUE = {
+    'Chemical': (['Ethanol', 'Methanol', 'Acetone', 'Sodium Chloride', 'Hydrochloric Acid', 'Tris Base',
+                  'Agarose', 'Glycerol', 'Sodium Hydroxide', 'EDTA', 'Isopropanol', 'Chloroform'],
+                 ['{n}00 ml', '{n} L', '{n}00g', '{n} kg', '{n}0 mg']),
+    'Glassware': (['Beaker 250 ml', 'Erlenmeyer Flask', 'Graduated Cylinder', 'Petri Dish', 'Volumetric Flask',
+                   'Test Tube', 'Funnel'], ['{n} pieces', '{n}0 pcs', '{n} boxes']),
+    'Instrument': (['pH Meter', 'Micropipette P200', 'Micropipette P1000', 'Balance', 'Spectrophotometer',
+                    'Thermometer'], ['{n}', '1 piece']),
+    'Equipment': (['Centrifuge', 'Vortex Mixer', 'Hot Plate', 'Water Bath', 'Magnetic Stirrer', 'Incubator'],
+                  ['1', '{n} units']),
+    'Consumable': (['Nitrile Gloves', 'Pipette Tips 200 ul', 'Pipette Tips 1000 ul', 'Falcon Tubes 50 ml',
+                    'Eppendorf Tubes', 'Parafilm', 'Filter Paper'], ['{n} boxes', '{n} packs', '{n} rolls', '{n}00 pcs']),
+    'Tool': (['Spatula', 'Forceps', 'Scissors', 'Tube Rack', 'Wash Bottle'], ['{n} pieces', '{n}']),
+    'Electronic': (['Timer', 'Power Supply', 'USB Microscope', 'Data Logger'], ['{n}', '{n} units']),
+    'Safety': (['Safety Goggles', 'Lab Coat', 'Face Shield', 'Spill Kit', 'Fire Blanket'], ['{n} pairs', '{n}', '{n} kits']),
+}
+
+# Relative frequencies, roughly what a working lab looks like
+STATUS_WEIGHTS = {'Free': 60, 'Occupied': 20, 'Ordered': 8, 'Maintenance': 7, 'Broken': 5}
+CATEGORY_WEIGHTS = {'Chemical': 30, 'Glassware': 15, 'Instrument': 8, 'Equipment': 6, 'Consumable': 25,
+                    'Tool': 7, 'Electronic': 4, 'Safety': 5}
+
+
+def generate_items(rng, storage_id, count, today):
+    """count random item rows for one storage, ready for InventoryStore.add_items()"""
+    categories = rng.choices(CATEGORIES, weights=[CATEGORY_WEIGHTS[c] for c in CATEGORIES], k=count)
+    statuses = rng.choices(STATUS_OPTIONS, weights=[STATUS_WEIGHTS[s] for s in STATUS_OPTIONS], k=count)
+    rows = []
+    for category, status in zip(categories, statuses):
+        names, quantities = ITEM_CATALOGUE[category]
+        expiry = ""
+        if category in ('Chemical', 'Consumable') and rng.random() < 0.7:
+            # Mostly future dates, with some already expired
+            expiry = (today + timedelta(days=rng.randint(-120, 900))).isoformat()
+        rows.append({
+            'storage_id': storage_id,
+            'name': rng.choice(names),
+            'quantity': rng.choice(quantities).format(n=rng.randint(1, 9)),
+            'category': category,
+            'status': status,
+            'expiry': expiry,
+            'notes': rng.choice(["", "", "", "Check before use", "Shared with group B", "Reorder soon"]),
+        })
+    return rows
+
+
+def generate_inventory(store, storages=50, items_per_storage=20, seed=0, today=None):
+    """Fill store with storages x items_per_storage seeded random items; returns the storage IDs"""
+    rng = random.Random(seed)
+    # Storage codes get their own stream, so the rest of the data doesn't depend on collisions
+    codes = random.Random(f"{seed}:codes")
+    today = today or date(2025, 1, 1)
+    storage_ids = []
+    for number in range(storages):
+        storage_type = rng.choice(STORAGE_TYPES)
+        name = f"{storage_type.title()} {chr(ord('A') + number % 26)}{number // 26 + 1}"
+        storage_ids.append(store.add_storage(name, storage_type, rng.choice(LOCATIONS),
+                                             rng.choice(["", f"{storage_type.title()} near the door"]), rng=codes))
+    rows = []
+    for storage_id in storage_ids:
+        rows.extend(generate_items(rng, storage_id, items_per_storage, today))
+    store.add_items(rows)
+    return storage_ids
@@ -0,0 +1,35 @@
+# inventory - Storage and helper modules for the Lab Inventory Management System
+#
+# Modules with a command line (inventory.export, inventory.labels) are imported
+# by their full path so `python -m` can run them cleanly.
+from inventory.analytics import InventoryAnalytics
+from inventory.items import ItemIndex
+from inventory.qr import QRCache, QRStaticFiles, render_qr_png, render_qr_svg, storage_url
+from inventory.records import ItemRecord
+from inventory.search import SearchIndex
+from inventory.stats import InventoryStats
+from inventory.store import (
+    CATEGORIES,
+    STATUS_OPTIONS,
+    STORAGE_TYPES,
+    ConflictError,
+    InventoryStore,
+)
+
+__all__ = [
+    'CATEGORIES',
+    'STATUS_OPTIONS',
+    'STORAGE_TYPES',
+    'ConflictError',
+    'InventoryAnalytics',
+    'InventoryStats',
+    'InventoryStore',
+    'ItemIndex',
+    'ItemRecord',
+    'QRCache',
+    'QRStaticFiles',
+    'render_qr_png',
+    'render_qr_svg',
+    'SearchIndex',
+    'storage_url',
+]
@@ -0,0 +1,6 @@
+# inventory/__main__.py - python -m inventory <command>
+import sys
+
+from inventory.cli import main
+
+sys.exit(main())
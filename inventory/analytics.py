@@ -0,0 +1,133 @@
+# inventory/analytics.py - Columnar item snapshot and group-by reports
+import threading
+
+from inventory.expiry import parse_expiry_series
+from inventory.store import CATEGORIES, STATUS_OPTIONS, STORAGE_TYPES
+
+# Snapshot columns read from the store; the low-cardinality ones become categoricals
+SNAPSHOT_FIELDS = ('storage_id', 'storage_name', 'storage_type', 'location', 'category', 'status', 'expiry')
+
+
+class InventoryAnalytics:
+    """Pandas snapshot of every item, rebuilt only after the data changes.
+
+    Store events merely mark the snapshot stale; the next query reads the
+    items once into a columnar DataFrame with categorical columns, and every
+    report computed from it is memoized until the following change. Reports
+    are vectorized group-bys, so reruns at 100k items cost a dictionary
+    lookup and a fresh snapshot costs one pass over the table.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._store = None
+        self._frame = None
+        self._storages = None
+        self._reports = {}
+        self.builds = 0
+
+    # Store listener interface
+    def rebuild(self, store):
+        with self._lock:
+            self._store = store
+            self._invalidate()
+
+    def apply(self, event):
+        with self._lock:
+            self._invalidate()
+
+    # Snapshot
+    def frame(self):
+        """Items as a DataFrame, one row per item"""
+        with self._lock:
+            if self._frame is None:
+                self._build()
+            return self._frame
+
+    def storages(self):
+        """Storages as a DataFrame indexed by storage ID"""
+        with self._lock:
+            if self._storages is None:
+                self._build()
+            return self._storages
+
+    # Reports
+    def status_by_location(self):
+        """Item counts, locations x statuses"""
+        return self._report('status_by_location', lambda: _crosstab(self.frame(), 'location', 'status'))
+
+    def category_by_type(self):
+        """Item counts, storage types x categories"""
+        return self._report('category_by_type', lambda: _crosstab(self.frame(), 'storage_type', 'category'))
+
+    def storage_density(self):
+        """Items per storage (including empty ones), densest first"""
+        return self._report('storage_density', self._storage_density)
+
+    def location_density(self):
+        """Storages, items and items per storage for each location"""
+        return self._report('location_density', self._location_density)
+
+    def expiry_by_month(self):
+        """Items with an expiry date, counted per month"""
+        return self._report('expiry_by_month', self._expiry_by_month)
+
+    # Internals
+    def _invalidate(self):
+        self._frame = None
+        self._storages = None
+        self._reports = {}
+
+    def _report(self, name, compute):
+        with self._lock:
+            if name not in self._reports:
+                self._reports[name] = compute()
+            return self._reports[name]
+
+    def _build(self):
+        import pandas as pd
+
+        frame = pd.DataFrame.from_records(self._store.item_columns(SNAPSHOT_FIELDS), columns=SNAPSHOT_FIELDS)
+        for field, known in (('storage_type', STORAGE_TYPES), ('category', CATEGORIES), ('status', STATUS_OPTIONS)):
+            frame[field] = _categorical(frame[field], known)
+        for field in ('storage_id', 'storage_name', 'location'):
+            frame[field] = frame[field].astype('category')
+        frame['expiry'] = parse_expiry_series(frame['expiry'])
+
+        storages = pd.DataFrame.from_dict(self._store.list_storages(), orient='index',
+                                          columns=['name', 'type', 'location'])
+        storages.index.name = 'storage_id'
+
+        self._frame = frame
+        self._storages = storages
+        self.builds += 1
+
+    def _storage_density(self):
+        storages = self.storages()
+        counts = self.frame()['storage_id'].value_counts()
+        density = storages.assign(items=counts.reindex(storages.index, fill_value=0).astype(int))
+        return density.sort_values('items', ascending=False, kind='stable')
+
+    def _location_density(self):
+        density = self._storage_density()
+        grouped = density.groupby('location', sort=True)
+        result = grouped.agg(storages=('name', 'size'), items=('items', 'sum'))
+        result['items_per_storage'] = (result['items'] / result['storages']).round(1)
+        return result.sort_values('items', ascending=False, kind='stable')
+
+    def _expiry_by_month(self):
+        expiry = self.frame()['expiry'].dropna()
+        return expiry.dt.to_period('M').value_counts().sort_index().rename('items')
+
+
+def _categorical(series, known):
+    """Categorical with the configured options first, then any stray values"""
+    import pandas as pd
+
+    extra = sorted(set(series.unique()) - set(known))
+    return pd.Categorical(series, categories=list(known) + extra)
+
+
+def _crosstab(frame, rows, columns):
+    counts = frame.groupby([rows, columns], observed=True).size()
+    return counts.unstack(columns, fill_value=0).sort_index()
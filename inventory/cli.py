@@ -0,0 +1,168 @@
+# inventory/cli.py - Command line for batch jobs: python -m inventory <command>
+import argparse
+import json
+import os
+import sys
+
+# Commands that hand their remaining arguments to an existing module CLI
+DELEGATED = {
+    'export': ("inventory.export", "export the inventory (see: export --help)"),
+    'labels': ("inventory.labels", "print QR label sheets (see: labels --help)"),
+    'events': ("inventory.eventlog", "snapshot, history, restore, prune (see: events --help)"),
+}
+
+
+def add_item(store, args):
+    from inventory.store import CATEGORIES, STATUS_OPTIONS
+
+    if not store.has_storage(args.storage_id):
+        return _fail(f"Unknown storage: {args.storage_id}")
+    if args.category not in CATEGORIES:
+        return _fail(f"Category must be one of: {', '.join(CATEGORIES)}")
+    if args.status not in STATUS_OPTIONS:
+        return _fail(f"Status must be one of: {', '.join(STATUS_OPTIONS)}")
+    try:
+        item_id = store.add_item(args.storage_id, args.name, args.quantity, args.category, args.status,
+                                 args.expiry, args.notes)
+    except ValueError as e:
+        return _fail(str(e))
+    print(item_id)
+    return 0
+
+
+def search(store, args):
+    from inventory.items import ItemIndex
+    from inventory.search import SearchIndex
+
+    index = store.subscribe(SearchIndex(store.subscribe(ItemIndex())))
+    results, total = index.search(args.query, args.limit)
+    for result in results:
+        item = result['item']
+        if args.json:
+            row = {'storage_id': result['storage_id'], 'storage_name': result['storage_name'],
+                   'score': round(result['score'], 3), **item}
+            sys.stdout.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            print(f"{item['id']}\t{item['name']}\t{item['quantity']}\t{item['status']}\t{result['storage_name']}")
+    print(f"{len(results)} of {total} matches", file=sys.stderr)
+    return 0 if total else 1
+
+
+def expiring(store, args):
+    from datetime import date, timedelta
+
+    from inventory.expiry import try_parse_expiry
+
+    today = date.today()
+    last = today + timedelta(days=args.days)
+    found = []
+    for _, storage_name, item in store.iter_items():
+        expires = try_parse_expiry(item['expiry'])
+        if expires is not None and expires <= last and (args.expired or expires >= today):
+            found.append((expires, item['id'], item['name'], storage_name))
+    for expires, item_id, name, storage_name in sorted(found):
+        print(f"{expires.isoformat()}\t{item_id}\t{name}\t{storage_name}")
+    print(f"{len(found)} items", file=sys.stderr)
+    return 0
+
+
+def qr(store, args):
+    from inventory.qr import RENDERERS, storage_url
+
+    if args.storage_id is None:
+        url = args.app_url
+    else:
+        # Legacy IDs still work, but the QR encodes the short code
+        storage_id = store.resolve_storage_id(args.storage_id)
+        if storage_id is None:
+            return _fail(f"Unknown storage: {args.storage_id}")
+        url = storage_url(args.app_url, storage_id)
+    fmt = args.format or ('svg' if args.output.endswith('.svg') else 'png')
+    data = RENDERERS[fmt](url, error_correction=args.error_correction, box_size=args.box_size)
+    if args.output == "-":
+        sys.stdout.buffer.write(data)
+    else:
+        with open(args.output, "wb") as out:
+            out.write(data)
+    return 0
+
+
+def shorten_ids(store, args):
+    renamed = store.shorten_storage_ids()
+    for old, new in renamed.items():
+        print(f"{old}\t{new}")
+    print(f"{len(renamed)} storages renamed; old IDs keep working as aliases", file=sys.stderr)
+    return 0
+
+
+def _fail(message):
+    print(message, file=sys.stderr)
+    return 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m inventory", description="Lab inventory command line")
+    parser.add_argument("--db", default=os.environ.get("INVENTORY_DB", "lab_inventory.db"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    new_item = commands.add_parser("add-item", help="add an item to a storage and print its ID")
+    new_item.add_argument("storage_id")
+    new_item.add_argument("name")
+    new_item.add_argument("quantity")
+    new_item.add_argument("--category", default="Chemical")
+    new_item.add_argument("--status", default="Free")
+    new_item.add_argument("--expiry", default="", help="expiry date, e.g. 2026-03-31")
+    new_item.add_argument("--notes", default="")
+    new_item.set_defaults(handler=add_item)
+
+    find = commands.add_parser("search", help="ranked, typo-tolerant item search")
+    find.add_argument("query")
+    find.add_argument("--limit", type=int, default=20)
+    find.add_argument("--json", action="store_true", help="print NDJSON rows instead of tab-separated lines")
+    find.set_defaults(handler=search)
+
+    expiry = commands.add_parser("expiring", help="list items expiring within a number of days")
+    expiry.add_argument("--days", type=int, default=30)
+    expiry.add_argument("--expired", action="store_true", help="include items already past their date")
+    expiry.set_defaults(handler=expiring)
+
+    code = commands.add_parser("qr", help="write the QR code of a storage, or of the dashboard")
+    code.add_argument("storage_id", nargs="?", help="omit for the central dashboard QR")
+    code.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    code.add_argument("--format", choices=("png", "svg"), default=None,
+                      help="png or svg (default: from the output extension, else png)")
+    code.add_argument("--error-correction", choices=("L", "M", "Q", "H"), default="M")
+    code.add_argument("--box-size", type=int, default=10)
+    code.add_argument("--app-url", default=os.environ.get("APP_URL"), required="APP_URL" not in os.environ)
+    code.set_defaults(handler=qr)
+
+    shorten = commands.add_parser("shorten-ids", help="give storages with legacy name-based IDs short codes")
+    shorten.set_defaults(handler=shorten_ids)
+
+    for name, (_, help_text) in DELEGATED.items():
+        commands.add_parser(name, help=help_text, add_help=False)
+    return parser
+
+
+def main(argv=None):
+    """Command-line entry point: python -m inventory"""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = build_parser()
+    # Delegated commands parse their own options; --db is passed through
+    for position, arg in enumerate(argv):
+        if arg in DELEGATED:
+            import importlib
+
+            module = importlib.import_module(DELEGATED[arg][0])
+            return module.main(argv[:position] + argv[position + 1:])
+        if not arg.startswith("-") and (position == 0 or argv[position - 1] != "--db"):
+            break
+    args = parser.parse_args(argv)
+
+    from inventory.store import InventoryStore
+
+    store = InventoryStore(args.db)
+    try:
+        return args.handler(store, args)
+    finally:
+        store.close()
@@ -0,0 +1,216 @@
+# inventory/eventlog.py - Compacted snapshots and replay of the store's event log
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+SNAPSHOT_PATTERN = "snapshot_{:012d}.json.gz"
+
+
+def empty_state():
+    """State of a database with no data, before the first event"""
+    return {'seq': 0, 'storages': {}, 'items': {}, 'thresholds': {}, 'aliases': {}}
+
+
+def write_snapshot(store, directory, keep=5):
+    """Write a compacted snapshot of the store; returns its path.
+
+    Older snapshots beyond the newest keep are deleted.
+    """
+    state = store.snapshot_state()
+    state['created'] = datetime.now().isoformat(timespec="seconds")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, SNAPSHOT_PATTERN.format(state['seq']))
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as out:
+        json.dump(state, out, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    for old in list_snapshots(directory)[:-keep]:
+        os.remove(old)
+    return path
+
+
+def list_snapshots(directory):
+    """Snapshot paths, oldest first"""
+    return sorted(glob.glob(os.path.join(directory, SNAPSHOT_PATTERN.replace("{:012d}", "[0-9]" * 12))))
+
+
+def snapshot_seq(path):
+    return int(os.path.basename(path).split("_")[1].split(".")[0])
+
+
+def load_snapshot(directory, until=None):
+    """Newest snapshot state at or before seq until, or the empty state if there is none"""
+    for path in reversed(list_snapshots(directory)):
+        if until is None or snapshot_seq(path) <= until:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+    return empty_state()
+
+
+def apply_event(state, seq, event):
+    """Apply one logged event to a snapshot state in place"""
+    op = event['op']
+    storages, items = state['storages'], state['items']
+    if op in ('add_storage', 'update_storage'):
+        storages[event['storage_id']] = dict(event['storage'])
+    elif op == 'delete_storage':
+        storages.pop(event['storage_id'], None)
+        for item_id in event['item_ids']:
+            items.pop(item_id, None)
+        aliases = state.setdefault('aliases', {})
+        for alias in [alias for alias, target in aliases.items() if target == event['storage_id']]:
+            del aliases[alias]
+    elif op == 'rename_storages':
+        renamed = event['renamed']
+        for old, new in renamed.items():
+            storages[new] = storages.pop(old)
+        for entry in items.values():
+            entry[1] = renamed.get(entry[1], entry[1])
+        aliases = state.setdefault('aliases', {})
+        for alias, target in aliases.items():
+            aliases[alias] = renamed.get(target, target)
+        aliases.update(renamed)
+    elif op == 'add_item':
+        items[event['item']['id']] = [event['item_pk'], event['storage_id'], event['item']]
+        storages[event['storage_id']]['last_updated'] = event['last_updated']
+    elif op == 'update_item':
+        pk = items[event['item']['id']][0]
+        items[event['item']['id']] = [pk, event['storage_id'], event['item']]
+        storages[event['storage_id']]['last_updated'] = event['last_updated']
+    elif op == 'delete_item':
+        items.pop(event['item_id'], None)
+        storages[event['storage_id']]['last_updated'] = event['last_updated']
+    elif op == 'set_threshold':
+        if event['quantity']:
+            state['thresholds'][event['name']] = event['quantity']
+        else:
+            state['thresholds'].pop(event['name'], None)
+    elif op == 'restore':
+        raise ValueError(f"Event {seq} restored an earlier state; replay from a snapshot taken after it")
+    state['seq'] = seq
+
+
+def replay(store, directory, until=None):
+    """Rebuild the state at seq until (default: latest) from the last snapshot plus the log tail"""
+    state = load_snapshot(directory, until)
+    for seq, _, event in store.iter_events(after=state['seq'], until=until):
+        if seq != state['seq'] + 1:
+            raise ValueError(f"Events {state['seq'] + 1}-{seq - 1} were pruned; no snapshot covers them")
+        apply_event(state, seq, event)
+    return state
+
+
+def restore(store, directory, until):
+    """Roll the store back to its state at seq until, then snapshot the result"""
+    state = replay(store, directory, until)
+    store.restore_state(state)
+    return write_snapshot(store, directory)
+
+
+class Snapshotter:
+    """Store listener that writes a snapshot every `every` events.
+
+    Keeps replay short: recovering any recent state means loading one
+    snapshot and applying at most `every` events. Snapshots are written by a
+    background thread reading through its own connection, so writers never
+    wait for one; a baseline is written on first use if the directory has
+    none. With prune, events older than the oldest kept snapshot are dropped
+    afterwards, which bounds the log to about keep * every events.
+    """
+
+    def __init__(self, directory, every=1000, keep=5, prune=True):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.prune = prune
+        self._store = None
+        self._last_seq = 0
+        self._worker = None
+        self._lock = threading.Lock()
+
+    # Store listener interface
+    def rebuild(self, store):
+        with self._lock:
+            self._store = store
+            latest = list_snapshots(self.directory)
+            self._last_seq = snapshot_seq(latest[-1]) if latest else -self.every
+            if store.last_event_seq() - self._last_seq >= self.every:
+                self._start()
+
+    def apply(self, event):
+        with self._lock:
+            if event['seq'] - self._last_seq >= self.every:
+                self._start()
+
+    def wait(self, timeout=None):
+        """Block until a running snapshot (and the pruning after it) has finished"""
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    # Internals
+    def _start(self):
+        # Callers hold self._lock; a running worker re-checks the backlog when it is done
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="inventory-snapshots", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            try:
+                seq = snapshot_seq(write_snapshot(self._store, self.directory, self.keep))
+                if self.prune:
+                    self._store.prune_events(snapshot_seq(list_snapshots(self.directory)[0]))
+            except BaseException:
+                with self._lock:
+                    self._worker = None
+                raise
+            with self._lock:
+                self._last_seq = seq
+                # Events that crossed the threshold while writing found this worker busy
+                if self._store.last_event_seq() - seq < self.every:
+                    self._worker = None
+                    return
+
+
+def main(argv=None):
+    """Command-line entry point: python -m inventory.eventlog"""
+    from inventory.store import InventoryStore
+
+    parser = argparse.ArgumentParser(description="Inspect and replay the lab inventory event log")
+    parser.add_argument("--db", default=os.environ.get("INVENTORY_DB", "lab_inventory.db"))
+    parser.add_argument("--snapshots", default=os.environ.get("INVENTORY_SNAPSHOT_DIR", "snapshots"))
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("snapshot", help="write a snapshot now")
+    history = commands.add_parser("history", help="print logged events as NDJSON")
+    history.add_argument("--after", type=int, default=0)
+    history.add_argument("--until", type=int)
+    rollback = commands.add_parser("restore", help="roll the database back to an earlier event")
+    rollback.add_argument("seq", type=int)
+    prune = commands.add_parser("prune", help="drop events already covered by the newest snapshot")
+    prune.add_argument("--keep", type=int, default=0, help="events to keep before that snapshot")
+    args = parser.parse_args(argv)
+
+    store = InventoryStore(args.db)
+    if args.command == "snapshot":
+        print(write_snapshot(store, args.snapshots))
+    elif args.command == "history":
+        for seq, ts, event in store.iter_events(args.after, args.until):
+            sys.stdout.write(json.dumps({'seq': seq, 'ts': ts, **event}, ensure_ascii=False) + "\n")
+    elif args.command == "restore":
+        print(restore(store, args.snapshots, args.seq))
+    elif args.command == "prune":
+        latest = list_snapshots(args.snapshots)
+        if not latest:
+            parser.error("no snapshot yet; run the snapshot command first")
+        print(store.prune_events(snapshot_seq(latest[-1]) - args.keep))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# inventory/expiry.py - Expiry date parsing and a sorted expiry index
+import bisect
+import calendar
+import functools
+import threading
+from datetime import date, datetime, timedelta
+
+# Accepted day-precision formats, tried in order after ISO
+DATE_FORMATS = ('%d/%m/%Y', '%d.%m.%Y', '%d-%m-%Y', '%d %b %Y', '%d %B %Y', '%b %d, %Y', '%B %d, %Y')
+# Month-precision formats; these expire on the last day of the month
+MONTH_FORMATS = ('%Y-%m', '%m/%Y', '%b %Y', '%B %Y')
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_expiry(text):
+    """Parse an expiry date; blank gives None, anything unreadable raises ValueError"""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    for fmt in MONTH_FORMATS:
+        try:
+            parsed = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        return date(parsed.year, parsed.month, calendar.monthrange(parsed.year, parsed.month)[1])
+    raise ValueError(f"Unrecognised expiry date: {text!r} (use YYYY-MM-DD)")
+
+
+def normalize_expiry(text):
+    """Expiry as stored: YYYY-MM-DD, or empty when there is none"""
+    parsed = parse_expiry(text)
+    return parsed.isoformat() if parsed else ""
+
+
+def try_parse_expiry(text):
+    """Like parse_expiry, but None for unreadable legacy values"""
+    try:
+        return parse_expiry(text)
+    except ValueError:
+        return None
+
+
+def parse_expiry_series(series):
+    """Parse a pandas Series of expiry strings to datetime64 (NaT when blank or unreadable).
+
+    Each distinct value is parsed once, with the same rules as parse_expiry().
+    """
+    import pandas as pd
+
+    values = series.fillna("").astype(str)
+    parsed = {value: try_parse_expiry(value) for value in values.unique()}
+    return pd.to_datetime(values.map(parsed), errors='coerce')
+
+
+class ExpiryIndex:
+    """Items ordered by expiry date, kept current by store events.
+
+    Entries are (date, item ID) pairs in a sorted list, so range queries and
+    "next to expire" lists are a binary search plus the matching slice.
+    Items without a readable date are left out. Matching IDs are resolved to
+    items through the shared ItemIndex.
+    """
+
+    def __init__(self, items):
+        self.items = items
+        self._lock = threading.RLock()
+        self._entries = []  # sorted (date, item_id)
+        self._dates = {}    # item_id -> date
+
+    # Store listener interface
+    def rebuild(self, store):
+        with self._lock:
+            self._dates = {}
+            for _, _, item in store.iter_item_records():
+                expires = try_parse_expiry(item['expiry'])
+                if expires is not None:
+                    self._dates[item['id']] = expires
+            self._entries = sorted((expires, item_id) for item_id, expires in self._dates.items())
+
+    def apply(self, event):
+        op = event['op']
+        with self._lock:
+            if op == 'delete_storage':
+                for item_id in event['item_ids']:
+                    self._remove(item_id)
+            elif op == 'add_item':
+                self._add(event['item'])
+            elif op == 'update_item':
+                self._remove(event['item']['id'])
+                self._add(event['item'])
+            elif op == 'delete_item':
+                self._remove(event['item_id'])
+
+    # Queries
+    def between(self, start=None, end=None, limit=None):
+        """Items expiring from start to end inclusive (open-ended when None), soonest first"""
+        with self._lock:
+            low, high = self._span(start, end)
+            if limit is not None:
+                high = min(high, low + limit)
+            return self._resolve(self._entries[low:high])
+
+    def count_between(self, start=None, end=None):
+        """Number of items expiring from start to end inclusive"""
+        with self._lock:
+            low, high = self._span(start, end)
+            return max(high - low, 0)
+
+    def expired(self, today=None, limit=None):
+        """Items whose expiry date has passed"""
+        today = today or date.today()
+        return self.between(end=today - timedelta(days=1), limit=limit)
+
+    def expiring_within(self, days, today=None, limit=None):
+        """Items expiring between today and the given number of days from now"""
+        today = today or date.today()
+        return self.between(today, today + timedelta(days=days), limit)
+
+    def next_to_expire(self, limit=10, today=None):
+        """The soonest upcoming expiries"""
+        return self.between(today or date.today(), limit=limit)
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Internals (callers hold self._lock)
+    def _span(self, start, end):
+        # (day,) sorts before every (day, item_id) entry on that day
+        low = 0 if start is None else bisect.bisect_left(self._entries, (start,))
+        high = len(self._entries) if end is None else bisect.bisect_left(self._entries, (end + timedelta(days=1),))
+        return low, high
+
+    def _resolve(self, entries):
+        results = []
+        for expires, item_id in entries:
+            found = self.items.get(item_id)
+            if found is not None:
+                results.append({'storage_id': found[0], 'item': found[1], 'expiry': expires})
+        return results
+
+    def _add(self, item):
+        expires = try_parse_expiry(item['expiry'])
+        if expires is None:
+            return
+        self._dates[item['id']] = expires
+        bisect.insort(self._entries, (expires, item['id']))
+
+    def _remove(self, item_id):
+        expires = self._dates.pop(item_id, None)
+        if expires is None:
+            return
+        position = bisect.bisect_left(self._entries, (expires, item_id))
+        if position < len(self._entries) and self._entries[position] == (expires, item_id):
+            del self._entries[position]
+
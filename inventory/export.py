@@ -0,0 +1,144 @@
+# inventory/export.py - Streaming inventory exports (NDJSON, CSV, Parquet, JSON)
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zlib
+from datetime import datetime
+
+from inventory.store import CATEGORIES, EXPORT_FIELDS, STATUS_OPTIONS, STORAGE_TYPES
+
+# format -> (MIME type, file extension)
+EXPORT_FORMATS = {
+    'ndjson': ("application/x-ndjson", "ndjson"),
+    'csv': ("text/csv", "csv"),
+    'parquet': ("application/vnd.apache.parquet", "parquet"),
+    'json': ("application/json", "json"),
+}
+
+CHUNK_SIZE = 1000
+
+
+def iter_ndjson(store, chunk_size=CHUNK_SIZE):
+    """One JSON object per item, one line each"""
+    for chunk in store.iter_item_chunks(chunk_size):
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk).encode("utf-8")
+
+
+def iter_csv(store, chunk_size=CHUNK_SIZE):
+    """Flat item table with storage details, header first"""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    for chunk in store.iter_item_chunks(chunk_size):
+        writer.writerows(chunk)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def iter_json(store):
+    """Full backup in the original nested layout, written one storage at a time"""
+    yield b'{"storages": {'
+    for position, storage_id in enumerate(store.list_storages()):
+        storage = store.get_storage(storage_id)
+        if storage is None:
+            continue
+        prefix = ", " if position else ""
+        yield f"{prefix}{json.dumps(storage_id)}: {json.dumps(storage, ensure_ascii=False)}".encode("utf-8")
+    lookups = json.dumps({'categories': CATEGORIES, 'status_options': STATUS_OPTIONS,
+                          'storage_types': STORAGE_TYPES}, ensure_ascii=False)
+    yield b"}, " + lookups[1:].encode("utf-8")
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_export(store, fmt, compress=False, chunk_size=CHUNK_SIZE):
+    """Yield the export as byte chunks (every format except Parquet)"""
+    if fmt == 'ndjson':
+        chunks = iter_ndjson(store, chunk_size)
+    elif fmt == 'csv':
+        chunks = iter_csv(store, chunk_size)
+    elif fmt == 'json':
+        chunks = iter_json(store)
+    else:
+        raise ValueError(f"{fmt} cannot be streamed as chunks; use write_export()")
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def write_parquet(store, out, compress=False, chunk_size=CHUNK_SIZE):
+    """Write items as Parquet, one row group per chunk"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow)") from e
+
+    schema = pa.schema([(field, pa.string()) for field in EXPORT_FIELDS])
+    with pq.ParquetWriter(out, schema, compression='gzip' if compress else 'snappy') as writer:
+        for chunk in store.iter_item_chunks(chunk_size):
+            columns = {field: [row[field] for row in chunk] for field in EXPORT_FIELDS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+
+
+def write_export(store, out, fmt='ndjson', compress=False, chunk_size=CHUNK_SIZE):
+    """Stream the inventory to the binary file-like out"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'parquet':
+        write_parquet(store, out, compress, chunk_size)
+        return
+    for chunk in iter_export(store, fmt, compress, chunk_size):
+        out.write(chunk)
+
+
+def export_filename(fmt, compress=False):
+    """Timestamped download name; Parquet compresses internally"""
+    extension = EXPORT_FORMATS[fmt][1]
+    suffix = ".gz" if compress and fmt != 'parquet' else ""
+    return f"lab_inventory_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}{suffix}"
+
+
+def export_mime(fmt, compress=False):
+    if compress and fmt != 'parquet':
+        return "application/gzip"
+    return EXPORT_FORMATS[fmt][0]
+
+
+def main(argv=None):
+    """Command-line entry point: python -m inventory.export"""
+    from inventory.store import InventoryStore
+
+    parser = argparse.ArgumentParser(description="Export the lab inventory")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output (Parquet: gzip column codec)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--db", default=os.environ.get("INVENTORY_DB", "lab_inventory.db"))
+    args = parser.parse_args(argv)
+
+    store = InventoryStore(args.db)
+    if args.output == "-":
+        if args.format == 'parquet':
+            parser.error("Parquet output needs a file, use -o")
+        write_export(store, sys.stdout.buffer, args.format, args.gzip, args.chunk_size)
+    else:
+        with open(args.output, "wb") as out:
+            write_export(store, out, args.format, args.gzip, args.chunk_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+# inventory/facets.py - Bitmap facets for filtering items by category, status, storage type and location
+import threading
+
+from inventory.records import CATEGORY_CODES, STATUS_CODES, STORAGE_TYPE_CODES
+
+# Facets read from the item itself and from the storage holding it
+ITEM_FACETS = ('category', 'status')
+STORAGE_FACETS = ('type', 'location')
+FACETS = ITEM_FACETS + STORAGE_FACETS
+
+
+class FacetIndex:
+    """One bitmap per facet value over all items, kept current by store events.
+
+    Every item owns a bit position (freed positions are reused). A bitmap is
+    a Python int with that bit set for each item having the value, so a
+    combined filter is a handful of C-level AND/OR operations and every
+    facet count is a popcount, whatever the inventory size. Storage facets
+    are moved for all of a storage's items at once through its own bitmap.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._bits = {}          # item ID -> bit position
+        self._ids = []           # bit position -> item ID (None when free)
+        self._free = []          # released bit positions
+        self._all = 0            # bitmap of every item
+        self._values = {}        # item ID -> (category code, status code, storage_id)
+        self._storages = {}      # storage_id -> (type code, location)
+        self._by_storage = {}    # storage_id -> bitmap of its items
+        self._bitmaps = {facet: {} for facet in FACETS}  # facet -> {value: bitmap}
+
+    # Store listener interface
+    def rebuild(self, store):
+        with self._lock:
+            self._reset()
+            for storage_id, storage in store.list_storages().items():
+                self._storages[storage_id] = (STORAGE_TYPE_CODES.code(storage['type']), storage['location'])
+                self._by_storage[storage_id] = 0
+            for _, storage_id, item in store.iter_item_records():
+                self._add(storage_id, item)
+
+    def apply(self, event):
+        op = event['op']
+        storage_id = event['storage_id']
+        with self._lock:
+            if op == 'add_storage':
+                storage = event['storage']
+                self._storages[storage_id] = (STORAGE_TYPE_CODES.code(storage['type']), storage['location'])
+                self._by_storage[storage_id] = 0
+            elif op == 'update_storage':
+                self._move_storage(storage_id, event['storage'])
+            elif op == 'delete_storage':
+                for item_id in event['item_ids']:
+                    self._remove(item_id)
+                self._storages.pop(storage_id, None)
+                self._by_storage.pop(storage_id, None)
+            elif op == 'add_item':
+                self._add(storage_id, event['item'])
+            elif op == 'update_item':
+                self._remove(event['item']['id'])
+                self._add(storage_id, event['item'])
+            elif op == 'delete_item':
+                self._remove(event['item_id'])
+
+    # Queries
+    def filter(self, selections, storage_id=None):
+        """Bitmap of items matching selections.
+
+        selections maps facet names to collections of accepted values; values
+        of one facet are alternatives (OR) and different facets must all
+        match (AND). Empty selections accept everything. storage_id limits
+        the result to one storage.
+        """
+        with self._lock:
+            return self._filter(selections, storage_id)
+
+    def counts(self, selections, storage_id=None):
+        """{facet: {value: items}} under the other facets' selections.
+
+        Each facet is counted as if its own selection were cleared, so the
+        numbers show what picking another value of that facet would give.
+        """
+        with self._lock:
+            counts = {}
+            for facet in FACETS:
+                others = {name: values for name, values in selections.items() if name != facet}
+                base = self._filter(others, storage_id)
+                counts[facet] = {value: bin(base & bitmap).count("1")
+                                 for value, bitmap in self._bitmaps[facet].items() if base & bitmap}
+            return counts
+
+    def ids(self, bitmap, offset=0, limit=None):
+        """Item IDs whose bits are set in bitmap, in bit order"""
+        with self._lock:
+            bits = bin(bitmap)[:1:-1]  # least significant bit first
+            ids = []
+            position = bits.find("1")
+            skipped = 0
+            while position != -1 and (limit is None or len(ids) < limit):
+                if skipped < offset:
+                    skipped += 1
+                else:
+                    ids.append(self._ids[position])
+                position = bits.find("1", position + 1)
+            return ids
+
+    def values(self, facet):
+        """Values of a facet that at least one item has, sorted"""
+        with self._lock:
+            return sorted(value for value, bitmap in self._bitmaps[facet].items() if bitmap)
+
+    def __len__(self):
+        return len(self._bits)
+
+    # Internals (callers hold self._lock)
+    def _filter(self, selections, storage_id):
+        result = self._all if storage_id is None else self._by_storage.get(storage_id, 0)
+        for facet, values in selections.items():
+            if not values:
+                continue
+            bitmaps = self._bitmaps[facet]
+            accepted = 0
+            for value in values:
+                accepted |= bitmaps.get(value, 0)
+            result &= accepted
+            if not result:
+                break
+        return result
+
+    def _add(self, storage_id, item):
+        item_id = item['id']
+        if self._free:
+            position = self._free.pop()
+            self._ids[position] = item_id
+        else:
+            position = len(self._ids)
+            self._ids.append(item_id)
+        bit = 1 << position
+        self._bits[item_id] = position
+        self._values[item_id] = (CATEGORY_CODES.code(item['category']), STATUS_CODES.code(item['status']), storage_id)
+        self._all |= bit
+        self._by_storage[storage_id] = self._by_storage.get(storage_id, 0) | bit
+        storage_type, location = self._storage_values(storage_id)
+        for facet, value in zip(FACETS, (item['category'], item['status'], storage_type, location)):
+            bitmaps = self._bitmaps[facet]
+            bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def _remove(self, item_id):
+        position = self._bits.pop(item_id, None)
+        if position is None:
+            return
+        category, status, storage_id = self._values.pop(item_id)
+        mask = ~(1 << position)
+        self._all &= mask
+        if storage_id in self._by_storage:
+            self._by_storage[storage_id] &= mask
+        storage_type, location = self._storage_values(storage_id)
+        for facet, value in zip(FACETS, (CATEGORY_CODES.value(category), STATUS_CODES.value(status),
+                                         storage_type, location)):
+            self._clear(facet, value, mask)
+        self._ids[position] = None
+        self._free.append(position)
+
+    def _storage_values(self, storage_id):
+        storage_type, location = self._storages.get(storage_id, (None, None))
+        return (None if storage_type is None else STORAGE_TYPE_CODES.value(storage_type)), location
+
+    def _move_storage(self, storage_id, storage):
+        old = self._storage_values(storage_id)
+        new = (storage['type'], storage['location'])
+        self._storages[storage_id] = (STORAGE_TYPE_CODES.code(storage['type']), storage['location'])
+        members = self._by_storage.setdefault(storage_id, 0)
+        if not members:
+            return
+        for facet, before, after in zip(STORAGE_FACETS, old, new):
+            if before != after:
+                self._clear(facet, before, ~members)
+                bitmaps = self._bitmaps[facet]
+                bitmaps[after] = bitmaps.get(after, 0) | members
+
+    def _clear(self, facet, value, mask):
+        bitmaps = self._bitmaps[facet]
+        remaining = bitmaps.get(value, 0) & mask
+        if remaining:
+            bitmaps[value] = remaining
+        else:
+            bitmaps.pop(value, None)
@@ -0,0 +1,147 @@
+# inventory/importer.py - Vectorized bulk import of items from CSV/Excel
+import io
+from collections import namedtuple
+from datetime import date, datetime
+
+from inventory.expiry import parse_expiry_series
+from inventory.store import CATEGORIES, STATUS_OPTIONS
+
+IMPORT_FIELDS = ('name', 'quantity', 'category', 'status', 'expiry', 'notes')
+REQUIRED_FIELDS = ('name', 'quantity')
+
+# Column names recognised automatically for each field (lowercase)
+FIELD_ALIASES = {
+    'name': ('name', 'item', 'item name', 'reagent', 'description'),
+    'quantity': ('quantity', 'qty', 'amount', 'stock'),
+    'category': ('category', 'type', 'class'),
+    'status': ('status', 'state'),
+    'expiry': ('expiry', 'expiry date', 'expiration', 'expiration date', 'expires', 'best before'),
+    'notes': ('notes', 'note', 'comments', 'comment', 'remarks'),
+}
+
+MIDNIGHT = " 00:00:00"
+
+ImportReport = namedtuple('ImportReport', 'rows errors total')
+
+
+def read_table(data, filename):
+    """Load an uploaded CSV or Excel (.xlsx) file into a DataFrame of strings"""
+    import pandas as pd
+
+    buf = io.BytesIO(data) if isinstance(data, bytes) else data
+    if filename.lower().endswith('.xlsx'):
+        try:
+            return pd.read_excel(buf, dtype=object)
+        except ImportError as e:
+            raise ImportError("Excel import needs openpyxl (pip install openpyxl)") from e
+    return pd.read_csv(buf, dtype=str, keep_default_na=False, skipinitialspace=True)
+
+
+def guess_mapping(columns):
+    """Match file columns to item fields by name"""
+    lowered = {str(column).strip().lower(): column for column in columns}
+    mapping = {}
+    for field in IMPORT_FIELDS:
+        mapping[field] = next((lowered[alias] for alias in FIELD_ALIASES[field] if alias in lowered), None)
+    return mapping
+
+
+def _text_column(df, column):
+    import pandas as pd
+
+    if column is None:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[column].fillna("").astype(str).str.strip()
+
+
+def _expiry_text(value):
+    """An expiry cell as text; Excel date cells arrive as datetime objects"""
+    import pandas as pd
+
+    if pd.isna(value):
+        return ""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    # Dates saved with a time part, e.g. CSVs written from a date column
+    return text[:-len(MIDNIGHT)] if text.endswith(MIDNIGHT) else text
+
+
+def _parse_dates(df, column):
+    """Parse an expiry column; returns (YYYY-MM-DD strings, mask of unparseable values)"""
+    import pandas as pd
+
+    if column is None:
+        raw = pd.Series("", index=df.index, dtype=object)
+    else:
+        raw = df[column].map(_expiry_text).astype(object)
+    present = raw.ne("")
+    formatted = parse_expiry_series(raw).dt.strftime("%Y-%m-%d").fillna("")
+    invalid = present & formatted.eq("")
+    return formatted, invalid
+
+
+def _lookup(raw, options, default):
+    """Case-insensitive match against the allowed options; blank falls back to default"""
+    canonical = raw.str.lower().map({option.lower(): option for option in options})
+    blank = raw.eq("")
+    if default is not None:
+        canonical = canonical.where(~blank, default)
+    return canonical, canonical.isna()
+
+
+def prepare_import(df, mapping, storage_id, default_category=None, default_status='Free'):
+    """Validate every row at once and split it into importable rows and errors.
+
+    Returns an ImportReport whose rows DataFrame holds normalised values ready
+    for InventoryStore.add_items() and whose errors DataFrame lists one line
+    per problem (spreadsheet row, field, value, message).
+    """
+    import pandas as pd
+
+    columns = {field: _text_column(df, mapping.get(field)) for field in IMPORT_FIELDS}
+    category, bad_category = _lookup(columns['category'], CATEGORIES, default_category)
+    status, bad_status = _lookup(columns['status'], STATUS_OPTIONS, default_status)
+    expiry, bad_expiry = _parse_dates(df, mapping.get('expiry'))
+
+    checks = [(columns[field].eq(""), field, "required") for field in REQUIRED_FIELDS]
+    checks += [
+        (bad_category, 'category', "unknown category"),
+        (bad_status, 'status', "unknown status"),
+        (bad_expiry, 'expiry', "not a date"),
+    ]
+
+    # Spreadsheet row numbers: the header is row 1
+    row_numbers = pd.Series(range(2, len(df) + 2), index=df.index)
+    problems = [
+        pd.DataFrame({
+            'row': row_numbers[mask],
+            'field': field,
+            'value': columns[field][mask],
+            'error': message,
+        })
+        for mask, field, message in checks if mask.any()
+    ]
+    errors = (pd.concat(problems).sort_values(['row', 'field'], kind="stable").reset_index(drop=True)
+              if problems else pd.DataFrame(columns=['row', 'field', 'value', 'error']))
+
+    invalid = pd.Series(False, index=df.index)
+    for mask, _, _ in checks:
+        invalid |= mask
+    rows = pd.DataFrame({
+        'storage_id': storage_id,
+        'name': columns['name'],
+        'quantity': columns['quantity'],
+        'category': category,
+        'status': status,
+        'expiry': expiry,
+        'notes': columns['notes'],
+    })[~invalid]
+    return ImportReport(rows.reset_index(drop=True), errors, len(df))
+
+
+def commit_import(store, report):
+    """Insert every valid row in one transaction; returns the new item IDs"""
+    return store.add_items(report.rows.to_dict('records'))
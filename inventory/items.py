@@ -0,0 +1,87 @@
+# inventory/items.py - In-memory item lookup by ID
+import bisect
+import threading
+
+from inventory.records import ItemRecord
+
+
+class ItemIndex:
+    """Maps item IDs to their items, globally and per storage.
+
+    Kept current by store events so views and search can resolve an item ID
+    in constant time without querying the database. Items are held as
+    compact ItemRecords, which read like item dicts.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._items = {}       # item_id -> ItemRecord
+        self._by_storage = {}  # storage_id -> ([pk, ...], [item_id, ...]), both sorted by pk
+
+    # Store listener interface
+    def rebuild(self, store):
+        with self._lock:
+            self._items = {}
+            self._by_storage = {storage_id: ([], []) for storage_id in store.storage_names()}
+            for pk, storage_id, item in store.iter_item_records():
+                self._add(pk, storage_id, item)
+
+    def apply(self, event):
+        op = event['op']
+        storage_id = event['storage_id']
+        with self._lock:
+            if op == 'add_storage':
+                self._by_storage[storage_id] = ([], [])
+            elif op == 'delete_storage':
+                for item_id in self._by_storage.pop(storage_id, ([], []))[1]:
+                    self._items.pop(item_id, None)
+            elif op == 'add_item':
+                self._add(event['item_pk'], storage_id, event['item'])
+            elif op == 'update_item':
+                previous = self._items[event['item']['id']]
+                self._remove(previous)
+                self._add(previous.pk, storage_id, event['item'])
+            elif op == 'delete_item':
+                previous = self._items.pop(event['item_id'], None)
+                if previous is not None:
+                    self._remove(previous)
+
+    # Queries
+    def get(self, item_id):
+        """Return (storage_id, item) for an item ID, or None"""
+        record = self._items.get(item_id)
+        if record is None:
+            return None
+        return record.storage_id, record
+
+    def sort_key(self, item_id):
+        """Creation order of an item"""
+        return self._items[item_id].pk
+
+    def storage_item_ids(self, storage_id):
+        """IDs of one storage's items in creation order"""
+        with self._lock:
+            return list(self._by_storage.get(storage_id, ([], []))[1])
+
+    def __contains__(self, item_id):
+        return item_id in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    # Internals (callers hold self._lock)
+    def _add(self, pk, storage_id, item):
+        record = ItemRecord(pk, storage_id, item)
+        self._items[record.id] = record
+        pks, item_ids = self._by_storage.setdefault(storage_id, ([], []))
+        # Moved items keep their pk, so they slot back into creation order
+        position = bisect.bisect(pks, pk)
+        pks.insert(position, pk)
+        item_ids.insert(position, record.id)
+
+    def _remove(self, record):
+        pks, item_ids = self._by_storage.get(record.storage_id, ([], []))
+        position = bisect.bisect_left(pks, record.pk)
+        if position < len(pks) and pks[position] == record.pk:
+            del pks[position]
+            del item_ids[position]
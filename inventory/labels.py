@@ -0,0 +1,240 @@
+# inventory/labels.py - Printable QR label sheets for every storage
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import zipfile
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from inventory.qr import render_qr_png, storage_url
+
+DPI = 300
+
+# All measurements in millimetres
+LabelLayout = namedtuple('LabelLayout', 'title page cols rows label origin pitch')
+
+LABEL_LAYOUTS = {
+    'a4': LabelLayout('A4 plain paper (2 × 5)', (210, 297), 2, 5, (95, 55), (10, 11), (95, 55)),
+    'avery-l7160': LabelLayout('Avery L7160 (3 × 7)', (210, 297), 3, 7, (63.5, 38.1), (7.2, 15.15), (66.04, 38.1)),
+    'avery-l7163': LabelLayout('Avery L7163 (2 × 7)', (210, 297), 2, 7, (99.1, 38.1), (4.65, 15.15), (101.6, 38.1)),
+    'avery-l7165': LabelLayout('Avery L7165 (2 × 4)', (210, 297), 2, 4, (99.1, 67.7), (4.65, 13.1), (101.6, 67.7)),
+}
+
+LABEL_FORMATS = ('pdf', 'zip')
+
+# Below this many labels a process pool costs more than it saves
+PARALLEL_THRESHOLD = 16
+
+
+def mm_to_px(mm):
+    return int(round(mm / 25.4 * DPI))
+
+
+def render_storage_qrs(urls, workers=None):
+    """Render PNG bytes for every URL, in parallel for large batches"""
+    urls = list(urls)
+    if len(urls) < PARALLEL_THRESHOLD or workers == 1:
+        return [render_qr_png(url) for url in urls]
+    # Forking the threaded app server could copy a held lock into the workers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        chunksize = max(1, len(urls) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(render_qr_png, urls, chunksize=chunksize))
+
+
+def _load_font(size_px):
+    from PIL import ImageFont
+
+    for name in ("DejaVuSans.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"):
+        try:
+            return ImageFont.truetype(name, size_px)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size_px)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def _fit_text(draw, text, font, max_width):
+    """Truncate text with an ellipsis so it fits max_width pixels"""
+    if draw.textlength(text, font=font) <= max_width:
+        return text
+    while text and draw.textlength(text + "…", font=font) > max_width:
+        text = text[:-1]
+    return text + "…"
+
+
+def draw_label(page, draw, box, qr_png, name, location, fonts):
+    """Draw one label (QR on the left, name and location on the right)"""
+    from PIL import Image
+
+    left, top, width, height = box
+    pad = mm_to_px(2.5)
+    qr_size = max(1, height - 2 * pad)
+    qr_img = Image.open(io.BytesIO(qr_png)).convert("1").resize((qr_size, qr_size), Image.NEAREST)
+    page.paste(qr_img, (left + pad, top + pad))
+
+    text_left = left + 2 * pad + qr_size
+    text_width = width - (text_left - left) - pad
+    if text_width <= 0:
+        return
+    title_font, body_font = fonts
+    draw.text((text_left, top + pad), _fit_text(draw, name, title_font, text_width),
+              fill=0, font=title_font)
+    draw.text((text_left, top + pad + int(title_font.size * 1.4)),
+              _fit_text(draw, location, body_font, text_width), fill=0, font=body_font)
+
+
+def render_sheets(labels, layout='a4'):
+    """Lay out (storage_id, name, location, qr_png) tuples into page images, one page at a time"""
+    from PIL import Image, ImageDraw
+
+    spec = LABEL_LAYOUTS[layout]
+    page_size = (mm_to_px(spec.page[0]), mm_to_px(spec.page[1]))
+    label_w, label_h = mm_to_px(spec.label[0]), mm_to_px(spec.label[1])
+    fonts = (_load_font(max(12, label_h // 7)), _load_font(max(10, label_h // 9)))
+    per_page = spec.cols * spec.rows
+
+    for start in range(0, len(labels), per_page):
+        page = Image.new("L", page_size, 255)
+        draw = ImageDraw.Draw(page)
+        for slot, (_, name, location, qr_png) in enumerate(labels[start:start + per_page]):
+            row, col = divmod(slot, spec.cols)
+            left = mm_to_px(spec.origin[0] + col * spec.pitch[0])
+            top = mm_to_px(spec.origin[1] + row * spec.pitch[1])
+            draw_label(page, draw, (left, top, label_w, label_h), qr_png, name, location, fonts)
+        yield page
+
+
+class PdfSheetWriter:
+    """Writes grayscale page images to a PDF as they are rendered.
+
+    Each page is compressed and written straight to out, so only one page
+    image is held at a time; out need not be seekable.
+    """
+
+    def __init__(self, out, resolution=DPI):
+        self.out = out
+        self.resolution = resolution
+        self._offset = 0
+        self._offsets = {}
+        self._pages = []
+        self._next_id = 3  # 1 is the catalog, 2 the page tree
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def add_page(self, image):
+        width, height = image.size
+        size = (width * 72 / self.resolution, height * 72 / self.resolution)
+        image_id, contents_id, page_id = self._next_id, self._next_id + 1, self._next_id + 2
+        self._next_id += 3
+
+        data = zlib.compress(image.convert("L").tobytes())
+        self._object(image_id, (f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                                f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode "
+                                f"/Length {len(data)} >>").encode(), data)
+        contents = f"q {size[0]:.2f} 0 0 {size[1]:.2f} 0 0 cm /Im0 Do Q".encode()
+        self._object(contents_id, f"<< /Length {len(contents)} >>".encode(), contents)
+        self._object(page_id, (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {size[0]:.2f} {size[1]:.2f}] "
+                               f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> "
+                               f"/Contents {contents_id} 0 R >>").encode())
+        self._pages.append(page_id)
+
+    def close(self):
+        """Write the page tree, catalog and cross-reference table"""
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._pages)
+        self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>".encode())
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref = self._offset
+        lines = [f"xref\n0 {self._next_id}\n", "0000000000 65535 f \n"]
+        lines += [f"{self._offsets[number]:010d} 00000 n \n" for number in range(1, self._next_id)]
+        lines.append(f"trailer\n<< /Size {self._next_id} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n")
+        self._write("".join(lines).encode())
+
+    def _object(self, number, header, stream=None):
+        self._offsets[number] = self._offset
+        self._write(f"{number} 0 obj\n".encode() + header)
+        if stream is not None:
+            self._write(b"\nstream\n")
+            self._write(stream)
+            self._write(b"\nendstream")
+        self._write(b"\nendobj\n")
+
+    def _write(self, data):
+        self.out.write(data)
+        self._offset += len(data)
+
+
+def build_labels(storages, app_url, workers=None):
+    """Render QR codes for a {storage_id: storage} mapping"""
+    entries = [(storage_id, storage['name'], storage['location']) for storage_id, storage in storages.items()]
+    pngs = render_storage_qrs([storage_url(app_url, storage_id) for storage_id, _, _ in entries], workers)
+    return [entry + (png,) for entry, png in zip(entries, pngs)]
+
+
+def write_label_sheets(storages, app_url, out, fmt='pdf', layout='a4', workers=None):
+    """Write every storage label to the binary file-like out as PDF or ZIP"""
+    if fmt not in LABEL_FORMATS:
+        raise ValueError(f"Unknown label format: {fmt}")
+    labels = build_labels(storages, app_url, workers)
+    pages = render_sheets(labels, layout)
+
+    if fmt == 'pdf':
+        if not labels:
+            raise ValueError("No storages to print")
+        writer = PdfSheetWriter(out)
+        for page in pages:
+            writer.add_page(page)
+        writer.close()
+        return len(labels)
+
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for number, page in enumerate(pages, start=1):
+            buf = io.BytesIO()
+            page.save(buf, format="PNG", dpi=(DPI, DPI))
+            archive.writestr(f"sheet_{number:03d}.png", buf.getvalue())
+        for storage_id, _, _, png in labels:
+            archive.writestr(f"qr/qr_{storage_id}.png", png)
+    return len(labels)
+
+
+def label_sheet_bytes(storages, app_url, fmt='pdf', layout='a4', workers=None):
+    """Label sheets as bytes, for download buttons"""
+    buf = io.BytesIO()
+    write_label_sheets(storages, app_url, buf, fmt, layout, workers)
+    return buf.getvalue()
+
+
+def main(argv=None):
+    """Command-line entry point: python -m inventory.labels"""
+    from inventory.store import InventoryStore
+
+    parser = argparse.ArgumentParser(description="Print QR label sheets for every storage")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=LABEL_FORMATS, default=None,
+                        help="pdf or zip (default: from the output extension, else pdf)")
+    parser.add_argument("--layout", choices=sorted(LABEL_LAYOUTS), default="a4")
+    parser.add_argument("--db", default=os.environ.get("INVENTORY_DB", "lab_inventory.db"))
+    parser.add_argument("--app-url", default=os.environ.get("APP_URL"), required="APP_URL" not in os.environ)
+    parser.add_argument("--workers", type=int, default=None, help="render processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ('zip' if args.output.endswith('.zip') else 'pdf')
+    storages = InventoryStore(args.db).storages()
+    if not storages:
+        print("No storages found", file=sys.stderr)
+        return 1
+
+    if args.output == "-":
+        count = write_label_sheets(storages, args.app_url, sys.stdout.buffer, fmt, args.layout, args.workers)
+    else:
+        with open(args.output, "wb") as out:
+            count = write_label_sheets(storages, args.app_url, out, fmt, args.layout, args.workers)
+    print(f"Wrote {count} labels ({LABEL_LAYOUTS[args.layout].title}, {fmt})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# inventory/profiling.py - Lightweight per-rerun timing for views and hot helpers
+import contextlib
+import cProfile
+import functools
+import io
+import math
+import pstats
+import threading
+import time
+from collections import defaultdict, deque
+
+RERUN = "rerun"
+
+
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_samples)) - 1, 0)
+    return sorted_samples[rank]
+
+
+class Profiler:
+    """Wall-time samples and call counts per instrumented name.
+
+    Each name keeps a rolling window of its most recent durations, so
+    percentiles reflect current behaviour rather than the whole process
+    lifetime. One rerun can also be captured with cProfile on request.
+    """
+
+    def __init__(self, window=200, enabled=True):
+        self.window = window
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._calls = defaultdict(int)
+        self._capture_armed = False
+        self.last_capture = None
+
+    # Recording
+    @contextlib.contextmanager
+    def timer(self, name):
+        """Time the enclosed block under name"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._samples[name].append(seconds)
+            self._calls[name] += 1
+
+    def instrument(self, name=None):
+        """Decorator that times every call of a function"""
+        def decorate(fn):
+            label = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(label, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    @contextlib.contextmanager
+    def rerun(self):
+        """Time a whole script run, under cProfile if a capture was requested"""
+        with self._lock:
+            capture, self._capture_armed = self._capture_armed, False
+        profile = cProfile.Profile() if capture else None
+        if profile is not None:
+            profile.enable()
+        try:
+            with self.timer(RERUN):
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                out = io.StringIO()
+                pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(40)
+                self.last_capture = out.getvalue()
+
+    def capture_next_rerun(self):
+        """Run the next rerun under cProfile"""
+        with self._lock:
+            self._capture_armed = True
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._calls.clear()
+        self.last_capture = None
+
+    # Reporting
+    def report(self):
+        """Per-name call counts and rolling percentiles (milliseconds), slowest p50 first"""
+        with self._lock:
+            snapshot = {name: sorted(samples) for name, samples in self._samples.items()}
+            calls = dict(self._calls)
+        rows = []
+        for name, samples in snapshot.items():
+            rows.append({
+                'name': name,
+                'calls': calls[name],
+                'p50_ms': percentile(samples, 0.50) * 1000,
+                'p90_ms': percentile(samples, 0.90) * 1000,
+                'p99_ms': percentile(samples, 0.99) * 1000,
+                'max_ms': samples[-1] * 1000,
+                'window': len(samples),
+            })
+        rows.sort(key=lambda row: row['p50_ms'], reverse=True)
+        return rows
@@ -0,0 +1,254 @@
+# inventory/qr.py - QR rendering and the shared PNG cache
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+ERROR_CORRECTION_LEVELS = ('L', 'M', 'Q', 'H')
+QR_FORMATS = {'png': "image/png", 'svg': "image/svg+xml"}
+
+
+def storage_url(app_url, storage_id):
+    """URL encoded in a storage's QR code"""
+    return f"{app_url}?storage={storage_id}"
+
+
+def _make_qr(url, version, error_correction, box_size, border):
+    # version=None picks the smallest symbol that fits url at the given level, so
+    # short storage codes give fewer, larger modules: quicker to render and to scan
+    import qrcode
+
+    levels = {
+        'L': qrcode.constants.ERROR_CORRECT_L,
+        'M': qrcode.constants.ERROR_CORRECT_M,
+        'Q': qrcode.constants.ERROR_CORRECT_Q,
+        'H': qrcode.constants.ERROR_CORRECT_H,
+    }
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=levels[error_correction],
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+    return qr
+
+
+def render_qr_png(url, version=None, error_correction='M', box_size=10, border=4):
+    """Render a QR code for url and return the PNG bytes"""
+    qr_img = _make_qr(url, version, error_correction, box_size, border).make_image(
+        fill_color="black", back_color="white")
+
+    buf = io.BytesIO()
+    qr_img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def render_qr_svg(url, version=None, error_correction='M', box_size=10, border=4):
+    """Render a QR code for url as a single-path SVG and return its bytes"""
+    from qrcode.image.svg import SvgPathFillImage
+
+    qr_img = _make_qr(url, version, error_correction, box_size, border).make_image(
+        image_factory=SvgPathFillImage)
+    return qr_img.to_string(encoding="utf-8")
+
+
+RENDERERS = {'png': render_qr_png, 'svg': render_qr_svg}
+
+
+def cache_key(url, version, error_correction, box_size, border, fmt='png'):
+    """Stable cache key for a URL and its render parameters"""
+    raw = f"{url}\x00{version}\x00{error_correction}\x00{box_size}\x00{border}"
+    if fmt != 'png':
+        raw += f"\x00{fmt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class QRCache:
+    """Thread-safe LRU cache of rendered QR images (PNG or SVG) with a disk tier.
+
+    The memory tier is bounded by max_bytes and evicts least recently used
+    entries. Every render is also written to cache_dir so the cache survives
+    restarts; the disk tier is pruned oldest-first past max_disk_bytes.
+    """
+
+    def __init__(self, cache_dir=".qr_cache", max_bytes=32 * 1024 * 1024,
+                 max_disk_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_size = sum(entry.stat().st_size for entry in os.scandir(cache_dir)
+                                  if _is_image(entry.name))
+        else:
+            self._disk_size = 0
+
+    def get(self, url, version=None, error_correction='M', box_size=10, border=4, fmt='png'):
+        """Return cached image bytes, rendering and storing them on a miss"""
+        key = cache_key(url, version, error_correction, box_size, border, fmt)
+
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._read_disk(key, fmt)
+        if data is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._remember(key, data)
+            return data
+
+        data = RENDERERS[fmt](url, version, error_correction, box_size, border)
+        with self._lock:
+            self.misses += 1
+            self._remember(key, data)
+        self._write_disk(key, data, fmt)
+        return data
+
+    def clear(self):
+        """Drop the memory tier (disk files are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Hit/miss counters and current memory usage"""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    # Internals (callers hold self._lock)
+    def _remember(self, key, data):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+        if len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def _path(self, key, fmt):
+        return os.path.join(self.cache_dir, f"{key}.{fmt}")
+
+    def _read_disk(self, key, fmt):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key, fmt), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data, fmt):
+        if not self.cache_dir:
+            return
+        path = self._path(key, fmt)
+        try:
+            # Another thread or process may have written the same key already
+            replaced = os.stat(path).st_size
+        except OSError:
+            replaced = 0
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_size += len(data) - replaced
+            over_limit = self._disk_size > self.max_disk_bytes
+        if over_limit:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        entries = sorted((entry for entry in os.scandir(self.cache_dir) if _is_image(entry.name)),
+                         key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in entries)
+        target = self.max_disk_bytes // 2
+        for entry in entries:
+            if total <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_size = total
+
+
+class QRStaticFiles:
+    """Publishes cached QR images as content-addressed files for static serving.
+
+    Each image is written once to directory under the hash of its bytes and
+    referenced by a URL carrying that hash as its v= argument, which Streamlit's
+    static file handler (Tornado) answers with a ten-year Cache-Control. A
+    rerun then sends only the short URL and browsers fetch each image once.
+    Only PNGs are published: Streamlit serves unknown types such as .svg as
+    text/plain with nosniff, which browsers refuse to show as an image.
+    """
+
+    def __init__(self, cache, directory, url_prefix="app/static/qr", max_urls=65536):
+        self.cache = cache
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.max_urls = max_urls
+        self._urls = {}  # (url, render parameters) -> public URL
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def url(self, url, **params):
+        """Public URL of the PNG QR image for url, publishing it on first use"""
+        key = (url, tuple(sorted(params.items())))
+        with self._lock:
+            public = self._urls.get(key)
+        if public is not None:
+            return public
+
+        data = self.cache.get(url, fmt='png', **params)
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        name = f"{digest}.png"
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        public = f"{self.url_prefix}/{name}?v={digest}"
+        with self._lock:
+            if len(self._urls) >= self.max_urls:
+                self._urls.clear()
+            self._urls[key] = public
+        return public
+
+
+def _is_image(filename):
+    return filename.rsplit(".", 1)[-1] in QR_FORMATS
@@ -0,0 +1,213 @@
+# inventory/quantity.py - Quantity parsing, unit normalisation and stock totals
+import functools
+import re
+import threading
+from collections import Counter, defaultdict, namedtuple
+
+Quantity = namedtuple('Quantity', 'value unit dimension')
+
+# Canonical unit -> (dimension, factor, spellings); values are stored in the canonical unit
+UNITS = {
+    'g': ('mass', 1.0, ('g', 'gm', 'gms', 'gram', 'grams', 'gr')),
+    'mg': ('mass', 0.001, ('mg', 'milligram', 'milligrams')),
+    'ug': ('mass', 1e-6, ('ug', 'µg', 'μg', 'mcg', 'microgram', 'micrograms')),
+    'kg': ('mass', 1000.0, ('kg', 'kgs', 'kilo', 'kilos', 'kilogram', 'kilograms')),
+    'ml': ('volume', 1.0, ('ml', 'millilitre', 'millilitres', 'milliliter', 'milliliters', 'cc')),
+    'ul': ('volume', 0.001, ('ul', 'µl', 'μl', 'microlitre', 'microlitres', 'microliter', 'microliters')),
+    'cl': ('volume', 10.0, ('cl',)),
+    'dl': ('volume', 100.0, ('dl',)),
+    'l': ('volume', 1000.0, ('l', 'lt', 'ltr', 'litre', 'litres', 'liter', 'liters')),
+    'pcs': ('count', 1.0, ('', 'pcs', 'pc', 'piece', 'pieces', 'unit', 'units', 'ea', 'each', 'nos', 'no', 'x')),
+    'bottle': ('count', 1.0, ('bottle', 'bottles', 'btl')),
+    'box': ('count', 1.0, ('box', 'boxes', 'bx')),
+    'pack': ('count', 1.0, ('pack', 'packs', 'pkt', 'packet', 'packets')),
+    'vial': ('count', 1.0, ('vial', 'vials')),
+    'tube': ('count', 1.0, ('tube', 'tubes')),
+    'plate': ('count', 1.0, ('plate', 'plates')),
+    'roll': ('count', 1.0, ('roll', 'rolls')),
+    'pair': ('count', 1.0, ('pair', 'pairs')),
+    'set': ('count', 1.0, ('set', 'sets')),
+    'kit': ('count', 1.0, ('kit', 'kits')),
+}
+
+# Every mass is totalled in grams and every volume in millilitres; counts keep their own unit
+BASE_UNITS = {'mass': 'g', 'volume': 'ml'}
+
+_SPELLINGS = {spelling: unit for unit, (_, _, spellings) in UNITS.items() for spelling in spellings}
+
+# "1,000" and "2,500.5": a comma before exactly three digits groups thousands
+_THOUSANDS = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?"
+_THOUSANDS_RE = re.compile(_THOUSANDS)
+
+# "500g", "1.5 L", "1,5 L", "10 pieces", "2 x 500 ml", "3x vials"
+_QUANTITY_RE = re.compile(
+    r"^\s*(?:(?P<count>\d+)\s*[x×*]\s*)?"
+    rf"(?P<value>{_THOUSANDS}|\d+(?:[.,]\d+)?|[.,]\d+)?\s*"
+    r"(?P<unit>[^\d\s.,][^\d]*?)?\.?\s*$",
+    re.IGNORECASE,
+)
+
+
+@functools.lru_cache(maxsize=16384)
+def parse_quantity(text):
+    """Split a quantity string into a Quantity in its base unit, or None if unreadable"""
+    match = _QUANTITY_RE.match(text or "")
+    if match is None or (match['value'] is None and match['count'] is None):
+        return None
+    unit = _SPELLINGS.get((match['unit'] or "").strip().lower())
+    if unit is None:
+        return None
+    dimension, factor, _ = UNITS[unit]
+    value = 1.0
+    if match['value'] is not None:
+        if _THOUSANDS_RE.fullmatch(match['value']):
+            value = float(match['value'].replace(",", ""))
+        else:
+            value = float(match['value'].replace(",", "."))
+    if match['count'] is not None:
+        value *= int(match['count'])
+    base = BASE_UNITS.get(dimension, unit)
+    return Quantity(value * factor, base, dimension)
+
+
+def parse_quantity_series(series):
+    """Parse a pandas Series of quantities into a DataFrame of amount/unit/dimension columns.
+
+    Each distinct string is parsed once; unreadable values give NaN and None.
+    """
+    import pandas as pd
+
+    values = series.fillna("").astype(str)
+    parsed = {value: parse_quantity(value) for value in values.unique()}
+    quantities = values.map(parsed)
+    return pd.DataFrame({
+        'amount': quantities.map(lambda quantity: quantity.value if quantity else float('nan')),
+        'unit': quantities.map(lambda quantity: quantity.unit if quantity else None),
+        'dimension': quantities.map(lambda quantity: quantity.dimension if quantity else None),
+    }, index=series.index)
+
+
+def format_quantity(value, unit):
+    """Human-readable amount, scaling grams and millilitres up or down"""
+    if unit == 'g':
+        scales = (('kg', 1000.0), ('g', 1.0), ('mg', 0.001))
+    elif unit == 'ml':
+        scales = (('L', 1000.0), ('ml', 1.0), ('µl', 0.001))
+    else:
+        return f"{value:g} {unit}"
+    for name, factor in scales:
+        if abs(value) >= factor or factor == scales[-1][1]:
+            return f"{value / factor:g} {name}"
+
+
+def name_key(name):
+    """Grouping key for item names: case and spacing are ignored"""
+    return " ".join(name.casefold().split())
+
+
+class StockTotals:
+    """Per-item-name stock totals across all storages, kept current by store events.
+
+    Each item's quantity is parsed once when it is added or changed, and its
+    amount is added to the running total for its name and base unit, so
+    totals and low-stock checks never reparse quantity strings.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._items = {}                     # item_id -> (name key, Quantity or None)
+        self._totals = defaultdict(Counter)  # name key -> {unit: amount}
+        self._names = {}                     # name key -> display name
+        self._counts = Counter()             # name key -> items with that name
+        self.unparsed = Counter()            # name key -> items with unreadable quantities
+
+    # Store listener interface
+    def rebuild(self, store):
+        with self._lock:
+            self._reset()
+            for _, _, item in store.iter_item_records():
+                self._add(item)
+
+    def apply(self, event):
+        op = event['op']
+        with self._lock:
+            if op == 'delete_storage':
+                for item_id in event['item_ids']:
+                    self._remove(item_id)
+            elif op == 'add_item':
+                self._add(event['item'])
+            elif op == 'update_item':
+                self._remove(event['item']['id'])
+                self._add(event['item'])
+            elif op == 'delete_item':
+                self._remove(event['item_id'])
+
+    # Queries
+    def total(self, name):
+        """{unit: amount} for an item name"""
+        with self._lock:
+            return dict(self._totals.get(name_key(name), {}))
+
+    def totals(self):
+        """Every item name with its per-unit totals, alphabetically"""
+        with self._lock:
+            return [{'name': self._names[key], 'totals': dict(self._totals.get(key, {})), 'unparsed': self.unparsed[key]}
+                    for key in sorted(self._names)]
+
+    def low_stock(self, thresholds):
+        """Names whose total is below its threshold.
+
+        thresholds maps item names to quantity strings such as "500 ml";
+        returns dicts with name, total, threshold and unit.
+        """
+        low = []
+        with self._lock:
+            for name, threshold in thresholds.items():
+                limit = parse_quantity(threshold)
+                if limit is None:
+                    continue
+                key = name_key(name)
+                total = self._totals.get(key, {}).get(limit.unit, 0.0)
+                if total < limit.value:
+                    low.append({'name': self._names.get(key, name), 'total': total,
+                                'threshold': limit.value, 'unit': limit.unit})
+        return low
+
+    def __len__(self):
+        return len(self._names)
+
+    # Internals (callers hold self._lock)
+    def _add(self, item):
+        key = name_key(item['name'])
+        quantity = parse_quantity(item['quantity'])
+        self._items[item['id']] = (key, quantity)
+        self._names[key] = item['name'].strip()
+        self._counts[key] += 1
+        if quantity is None:
+            self.unparsed[key] += 1
+        else:
+            self._totals[key][quantity.unit] += quantity.value
+
+    def _remove(self, item_id):
+        entry = self._items.pop(item_id, None)
+        if entry is None:
+            return
+        key, quantity = entry
+        if quantity is None:
+            self.unparsed[key] -= 1
+            if self.unparsed[key] <= 0:
+                del self.unparsed[key]
+        else:
+            totals = self._totals[key]
+            totals[quantity.unit] -= quantity.value
+            if abs(totals[quantity.unit]) < 1e-9:
+                del totals[quantity.unit]
+            if not totals:
+                del self._totals[key]
+        self._counts[key] -= 1
+        if self._counts[key] <= 0:
+            del self._counts[key]
+            self._names.pop(key, None)
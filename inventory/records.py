@@ -0,0 +1,90 @@
+# inventory/records.py - Compact in-memory item records with coded low-cardinality fields
+import sys
+import threading
+from collections.abc import Mapping
+
+from inventory.store import CATEGORIES, ITEM_FIELDS, STATUS_OPTIONS, STORAGE_TYPES
+
+
+class Codes:
+    """Small-integer codes for the values of one field.
+
+    The configured options get codes 0, 1, 2... in list order; any other
+    value met later (legacy or imported data) gets the next free code, so
+    every string round-trips. Codes are shared by all indexes in the process.
+    """
+
+    def __init__(self, values):
+        self.values = list(values)
+        self._codes = {value: code for code, value in enumerate(self.values)}
+        self._lock = threading.Lock()
+
+    def code(self, value):
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = self._codes[value] = len(self.values)
+                    self.values.append(value)
+        return code
+
+    def value(self, code):
+        return self.values[code]
+
+
+CATEGORY_CODES = Codes(CATEGORIES)
+STATUS_CODES = Codes(STATUS_OPTIONS)
+STORAGE_TYPE_CODES = Codes(STORAGE_TYPES)
+
+
+def _intern(value):
+    # Names, quantities and dates repeat across thousands of items
+    return sys.intern(value) if type(value) is str else value
+
+
+class ItemRecord(Mapping):
+    """Read-only item with the keys of an item dict, stored in slots.
+
+    Category and status are kept as codes and repeated strings are interned,
+    so a record costs a fraction of the dict it replaces. The record also
+    carries its primary key and storage ID for the indexes holding it.
+    """
+
+    __slots__ = ('pk', 'storage_id', 'id', 'name', 'quantity', '_category', '_status', 'expiry', 'notes',
+                 'version')
+    KEYS = ITEM_FIELDS + ('version',)
+
+    def __init__(self, pk, storage_id, item):
+        self.pk = pk
+        self.storage_id = _intern(storage_id)
+        self.id = item['id']
+        self.name = _intern(item['name'])
+        self.quantity = _intern(item['quantity'])
+        self._category = CATEGORY_CODES.code(item['category'])
+        self._status = STATUS_CODES.code(item['status'])
+        self.expiry = _intern(item['expiry'])
+        self.notes = item['notes']
+        self.version = item.get('version', 1)
+
+    @property
+    def category(self):
+        return CATEGORY_CODES.values[self._category]
+
+    @property
+    def status(self):
+        return STATUS_CODES.values[self._status]
+
+    def __getitem__(self, key):
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f"ItemRecord({dict(self)!r})"
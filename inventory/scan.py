@@ -0,0 +1,64 @@
+# inventory/scan.py - Cached read-only pages for QR-scanned storages
+import threading
+from collections import OrderedDict
+from datetime import date
+
+
+class ScanSummaries:
+    """Rendered scan pages per storage, dropped whenever that storage changes.
+
+    Every event that touches a storage also moves its last_updated stamp, so
+    dropping the entry on the event is the same as keying it on last_updated
+    without a database read per scan. Entries also expire at midnight because
+    expiry flags depend on the date. Least recently scanned pages are evicted
+    beyond maxsize.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._pages = OrderedDict()  # storage_id -> (day, page)
+        self._epochs = {}            # storage_id -> events seen, to spot changes during a build
+        self.builds = 0
+
+    # Store listener interface
+    def rebuild(self, store):
+        with self._lock:
+            self._pages.clear()
+            self._epochs.clear()
+
+    def apply(self, event):
+        storage_id = event['storage_id']
+        with self._lock:
+            self._pages.pop(storage_id, None)
+            self._epochs[storage_id] = self._epochs.get(storage_id, 0) + 1
+
+    # Queries
+    def get(self, store, storage_id, render):
+        """Cached page for a storage, built with render(storage_id, storage, today) on a miss.
+
+        Returns None if the storage does not exist.
+        """
+        today = date.today()
+        with self._lock:
+            entry = self._pages.get(storage_id)
+            if entry is not None and entry[0] == today:
+                self._pages.move_to_end(storage_id)
+                return entry[1]
+            epoch = self._epochs.get(storage_id, 0)
+        storage = store.get_storage(storage_id)
+        if storage is None:
+            return None
+        page = render(storage_id, storage, today)
+        with self._lock:
+            self.builds += 1
+            # A write that landed while rendering would otherwise be cached as stale
+            if self._epochs.get(storage_id, 0) == epoch:
+                self._pages[storage_id] = (today, page)
+                self._pages.move_to_end(storage_id)
+                while len(self._pages) > self.maxsize:
+                    self._pages.popitem(last=False)
+        return page
+
+    def __len__(self):
+        return len(self._pages)
@@ -0,0 +1,285 @@
+# inventory/search.py - Ranked, typo-tolerant search over items and their storages
+import bisect
+import re
+import threading
+from collections import Counter, OrderedDict
+
+# Searchable fields and how much a match in each counts towards an item's score
+ITEM_FIELD_WEIGHTS = {'name': 1.0, 'id': 0.9, 'category': 0.6, 'status': 0.5, 'notes': 0.4, 'quantity': 0.3}
+STORAGE_FIELD_WEIGHTS = {'name': 0.7, 'location': 0.6, 'type': 0.5}
+
+# How a query token matching a vocabulary term is scored
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.9
+SUBSTRING_SCORE = 0.75
+FUZZY_WEIGHT = 0.7
+# Minimum trigram similarity (Dice coefficient) for a misspelling to count
+MIN_SIMILARITY = 0.45
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercased words of text; underscores stay inside words so IDs remain whole"""
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def trigrams(text):
+    """Distinct 3-character substrings of text"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def word_trigrams(word):
+    """Trigrams of a word padded like pg_trgm, so prefixes and short words have some"""
+    return trigrams(f"  {word} ")
+
+
+class SearchIndex:
+    """Ranked search with typo tolerance over items and the storages holding them.
+
+    Every item and storage field is split into words. Misspellings are
+    resolved against the vocabulary of distinct words through a trigram
+    index, so fuzzy matching costs depend on the number of distinct words,
+    not items. Each query word must match some field of an item or its
+    storage; an item's score sums the best match per query word, weighted by
+    field. Item IDs are matched by prefix through a sorted list.
+
+    Per-word matches and whole query results are cached, so typeahead only
+    recomputes the word being typed. Any change clears both caches.
+    """
+
+    def __init__(self, items, cache_size=256):
+        self.items = items
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._item_terms = {}     # item ID -> {term: weight}
+        self._storage_terms = {}  # storage_id -> {term: weight}
+        self._postings = {}       # term -> {item ID: weight}
+        self._storage_postings = {}  # term -> {storage_id: weight}
+        self._term_grams = {}     # trigram -> set of terms
+        self._ids = []            # sorted (lowercased ID, item ID)
+        self._storage_names = {}  # storage_id -> name
+        self._clear_caches()
+
+    def _clear_caches(self):
+        self._token_cache = OrderedDict()  # query word -> {item ID: score}
+        self._query_cache = OrderedDict()  # normalised query -> ranked item IDs
+
+    # Store listener interface
+    def rebuild(self, store):
+        with self._lock:
+            self._reset()
+            for storage_id, storage in store.list_storages().items():
+                self._add_storage(storage_id, storage)
+            for _, _, item in store.iter_item_records():
+                self._add(item)
+                self._ids.append((item['id'].lower(), item['id']))
+            self._ids.sort()
+
+    def apply(self, event):
+        op = event['op']
+        storage_id = event['storage_id']
+        with self._lock:
+            self._clear_caches()
+            if op == 'add_storage':
+                self._add_storage(storage_id, event['storage'])
+            elif op == 'update_storage':
+                self._remove_storage(storage_id)
+                self._add_storage(storage_id, event['storage'])
+            elif op == 'delete_storage':
+                self._remove_storage(storage_id)
+                for item_id in event['item_ids']:
+                    self._remove(item_id)
+            elif op == 'add_item':
+                self._add(event['item'])
+                bisect.insort(self._ids, (event['item']['id'].lower(), event['item']['id']))
+            elif op == 'update_item':
+                self._remove(event['item']['id'])
+                self._add(event['item'])
+                bisect.insort(self._ids, (event['item']['id'].lower(), event['item']['id']))
+            elif op == 'delete_item':
+                self._remove(event['item_id'])
+
+    # Queries
+    def search(self, query, limit=None):
+        """Return (results, total) for items matching every word of query, best first.
+
+        Each result holds storage_id, storage_name, item and score.
+        """
+        words = tokenize(query)
+        if not words:
+            return [], 0
+
+        key = " ".join(words)
+        with self._lock:
+            ranked = self._query_cache.get(key)
+            if ranked is None:
+                ranked = self._rank(words)
+                self._remember(self._query_cache, key, ranked)
+            else:
+                self._query_cache.move_to_end(key)
+            # The item index may already have dropped an item this index is about to remove
+            chosen = ranked if limit is None else ranked[:limit]
+            results = []
+            for item_id, score in chosen:
+                found = self.items.get(item_id)
+                if found is None:
+                    continue
+                storage_id, item = found
+                results.append({
+                    'storage_id': storage_id,
+                    'storage_name': self._storage_names.get(storage_id, storage_id),
+                    'item': item,
+                    'score': score,
+                })
+        return results, len(ranked)
+
+    def clear_cache(self):
+        """Drop cached word matches and query results"""
+        with self._lock:
+            self._clear_caches()
+
+    def __len__(self):
+        return len(self._item_terms)
+
+    # Internals (callers hold self._lock)
+    def _rank(self, words):
+        scores = None
+        for word in dict.fromkeys(words):
+            matches = self._token_cache.get(word)
+            if matches is None:
+                matches = self._match_word(word)
+                self._remember(self._token_cache, word, matches)
+            else:
+                self._token_cache.move_to_end(word)
+            if scores is None:
+                scores = dict(matches)
+            else:
+                scores = {item_id: score + matches[item_id] for item_id, score in scores.items()
+                          if item_id in matches}
+            if not scores:
+                return []
+        order = self.items.sort_key
+        known = [(item_id, score) for item_id, score in scores.items() if item_id in self.items]
+        return sorted(known, key=lambda entry: (-entry[1], order(entry[0])))
+
+    def _match_word(self, word):
+        """{item ID: best score} for one query word"""
+        best = {}
+        for term, term_score in self._match_terms(word).items():
+            for item_id, weight in self._postings.get(term, {}).items():
+                score = term_score * weight
+                if score > best.get(item_id, 0.0):
+                    best[item_id] = score
+            for storage_id, weight in self._storage_postings.get(term, {}).items():
+                score = term_score * weight
+                for item_id in self.items.storage_item_ids(storage_id):
+                    if score > best.get(item_id, 0.0):
+                        best[item_id] = score
+        # IDs are too many and too alike for the trigram vocabulary
+        weight = ITEM_FIELD_WEIGHTS['id']
+        start = bisect.bisect_left(self._ids, (word,))
+        for position in range(start, len(self._ids)):
+            lowered, item_id = self._ids[position]
+            if not lowered.startswith(word):
+                break
+            score = (EXACT_SCORE if lowered == word else PREFIX_SCORE) * weight
+            if score > best.get(item_id, 0.0):
+                best[item_id] = score
+        return best
+
+    def _match_terms(self, word):
+        """{vocabulary term: match score} for one query word"""
+        grams = word_trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._term_grams.get(gram, ()))
+        matches = {}
+        for term, count in shared.items():
+            if term == word:
+                matches[term] = EXACT_SCORE
+            elif term.startswith(word):
+                matches[term] = PREFIX_SCORE
+            elif len(word) >= 3 and word in term:
+                matches[term] = SUBSTRING_SCORE
+            else:
+                similarity = 2 * count / (len(grams) + len(word_trigrams(term)))
+                if similarity >= MIN_SIMILARITY:
+                    matches[term] = FUZZY_WEIGHT * similarity
+        return matches
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _add(self, item):
+        item_id = item['id']
+        terms = {}
+        for field, weight in ITEM_FIELD_WEIGHTS.items():
+            if field == 'id':
+                continue
+            for term in tokenize(item.get(field, '')):
+                if weight > terms.get(term, 0.0):
+                    terms[term] = weight
+        self._item_terms[item_id] = terms
+        for term, weight in terms.items():
+            self._add_term(term)
+            self._postings.setdefault(term, {})[item_id] = weight
+
+    def _remove(self, item_id):
+        terms = self._item_terms.pop(item_id, None)
+        if terms is None:
+            return
+        entry = (item_id.lower(), item_id)
+        position = bisect.bisect_left(self._ids, entry)
+        if position < len(self._ids) and self._ids[position] == entry:
+            del self._ids[position]
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(item_id, None)
+                if not posting:
+                    del self._postings[term]
+            self._drop_term(term)
+
+    def _add_storage(self, storage_id, storage):
+        self._storage_names[storage_id] = storage['name']
+        terms = {}
+        for field, weight in STORAGE_FIELD_WEIGHTS.items():
+            for term in tokenize(storage.get(field, '')):
+                if weight > terms.get(term, 0.0):
+                    terms[term] = weight
+        self._storage_terms[storage_id] = terms
+        for term, weight in terms.items():
+            self._add_term(term)
+            self._storage_postings.setdefault(term, {})[storage_id] = weight
+
+    def _remove_storage(self, storage_id):
+        self._storage_names.pop(storage_id, None)
+        for term in self._storage_terms.pop(storage_id, {}):
+            posting = self._storage_postings.get(term)
+            if posting is not None:
+                posting.pop(storage_id, None)
+                if not posting:
+                    del self._storage_postings[term]
+            self._drop_term(term)
+
+    def _add_term(self, term):
+        if term in self._postings or term in self._storage_postings:
+            return
+        for gram in word_trigrams(term):
+            self._term_grams.setdefault(gram, set()).add(term)
+
+    def _drop_term(self, term):
+        if term in self._postings or term in self._storage_postings:
+            return
+        for gram in word_trigrams(term):
+            bucket = self._term_grams.get(gram)
+            if bucket is not None:
+                bucket.discard(term)
+                if not bucket:
+                    del self._term_grams[gram]
@@ -0,0 +1,161 @@
+# inventory/stats.py - Materialized counters for dashboard metrics
+import threading
+from collections import Counter
+
+
+class StorageStats:
+    """Counters for a single storage"""
+
+    __slots__ = ('type', 'location', 'items', 'status', 'category')
+
+    def __init__(self, storage_type, location):
+        self.type = storage_type
+        self.location = location
+        self.items = 0
+        self.status = Counter()
+        self.category = Counter()
+
+
+class InventoryStats:
+    """Item counts by status, category and storage type, kept current by store events.
+
+    Every add, update and delete adjusts the affected counters, so reading the
+    dashboard metrics costs the same regardless of inventory size. check()
+    recomputes everything from the store and repairs any drift.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._storages = {}               # storage_id -> StorageStats
+        self.total_items = 0
+        self.status = Counter()           # items by status
+        self.category = Counter()         # items by category
+        self.items_by_type = Counter()    # items by storage type
+        self.storages_by_type = Counter()
+
+    # Store listener interface
+    def rebuild(self, store):
+        with self._lock:
+            self._reset()
+            for storage_id, storage in store.list_storages().items():
+                self._add_storage(storage_id, storage)
+            for _, storage_id, item in store.iter_item_records():
+                self._add_item(storage_id, item)
+
+    def apply(self, event):
+        op = event['op']
+        storage_id = event['storage_id']
+        with self._lock:
+            if op == 'add_storage':
+                self._add_storage(storage_id, event['storage'])
+            elif op == 'update_storage':
+                self._retype_storage(storage_id, event['storage'])
+            elif op == 'delete_storage':
+                self._delete_storage(storage_id)
+            elif op == 'add_item':
+                self._add_item(storage_id, event['item'])
+            elif op == 'update_item':
+                self._remove_item(storage_id, event['previous'])
+                self._add_item(storage_id, event['item'])
+            elif op == 'delete_item':
+                self._remove_item(storage_id, event['previous'])
+
+    # Queries
+    @property
+    def total_storages(self):
+        return len(self._storages)
+
+    def summary(self):
+        """Consistent copy of the global counters"""
+        with self._lock:
+            return {
+                'total_storages': len(self._storages),
+                'total_items': self.total_items,
+                'status': dict(self.status),
+                'category': dict(self.category),
+                'items_by_type': dict(self.items_by_type),
+                'storages_by_type': dict(self.storages_by_type),
+            }
+
+    def storage(self, storage_id):
+        """Counters for one storage, or None if it is unknown"""
+        with self._lock:
+            stats = self._storages.get(storage_id)
+            if stats is None:
+                return None
+            return {
+                'items': stats.items,
+                'status': dict(stats.status),
+                'category': dict(stats.category),
+            }
+
+    def check(self, store):
+        """Recompute from scratch; return the names of counters that had drifted"""
+        fresh = InventoryStats()
+        fresh.rebuild(store)
+        with self._lock:
+            drifted = [name for name, value in fresh.summary().items() if self.summary()[name] != value]
+            drifted += [f"storage:{storage_id}" for storage_id in set(fresh._storages) | set(self._storages)
+                        if fresh.storage(storage_id) != self.storage(storage_id)]
+            if drifted:
+                self.rebuild(store)
+        return drifted
+
+    # Internals (callers hold self._lock)
+    def _add_storage(self, storage_id, storage):
+        self._storages[storage_id] = StorageStats(storage['type'], storage['location'])
+        self.storages_by_type[storage['type']] += 1
+
+    def _retype_storage(self, storage_id, storage):
+        stats = self._storages[storage_id]
+        if stats.type != storage['type']:
+            self.storages_by_type[stats.type] -= 1
+            self.items_by_type[stats.type] -= stats.items
+            self.storages_by_type[storage['type']] += 1
+            self.items_by_type[storage['type']] += stats.items
+            _drop_zeros(self.storages_by_type, self.items_by_type)
+            stats.type = storage['type']
+        stats.location = storage['location']
+
+    def _delete_storage(self, storage_id):
+        stats = self._storages.pop(storage_id, None)
+        if stats is None:
+            return
+        self.storages_by_type[stats.type] -= 1
+        self.items_by_type[stats.type] -= stats.items
+        self.total_items -= stats.items
+        self.status.subtract(stats.status)
+        self.category.subtract(stats.category)
+        _drop_zeros(self.storages_by_type, self.items_by_type, self.status, self.category)
+
+    def _add_item(self, storage_id, item):
+        stats = self._storages[storage_id]
+        stats.items += 1
+        stats.status[item['status']] += 1
+        stats.category[item['category']] += 1
+        self.total_items += 1
+        self.status[item['status']] += 1
+        self.category[item['category']] += 1
+        self.items_by_type[stats.type] += 1
+
+    def _remove_item(self, storage_id, item):
+        stats = self._storages.get(storage_id)
+        if stats is None:
+            return
+        stats.items -= 1
+        stats.status[item['status']] -= 1
+        stats.category[item['category']] -= 1
+        self.total_items -= 1
+        self.status[item['status']] -= 1
+        self.category[item['category']] -= 1
+        self.items_by_type[stats.type] -= 1
+        _drop_zeros(stats.status, stats.category, self.status, self.category, self.items_by_type)
+
+
+def _drop_zeros(*counters):
+    for counter in counters:
+        for key in [key for key, count in counter.items() if count <= 0]:
+            del counter[key]
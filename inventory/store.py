@@ -0,0 +1,934 @@
+# inventory/store.py - Shared SQLite storage backend for the lab inventory
+import contextlib
+import json
+import queue
+import re
+import secrets
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+from inventory.expiry import normalize_expiry
+
+CATEGORIES = ['Chemical', 'Glassware', 'Instrument', 'Equipment', 'Consumable', 'Tool', 'Electronic', 'Safety']
+STATUS_OPTIONS = ['Free', 'Occupied', 'Ordered', 'Maintenance', 'Broken']
+STORAGE_TYPES = ['drawer', 'cupboard', 'almirah', 'shelf', 'cabinet', 'rack', 'fridge', 'freezer']
+
+STORAGE_FIELDS = ('name', 'type', 'location', 'description', 'last_updated')
+ITEM_FIELDS = ('id', 'name', 'quantity', 'category', 'status', 'expiry', 'notes')
+EXPORT_FIELDS = ('storage_id', 'storage_name', 'storage_type', 'location') + ITEM_FIELDS
+# Export fields that come from the storages table
+EXPORT_COLUMNS = {
+    'storage_id': "items.storage_id",
+    'storage_name': "storages.name",
+    'storage_type': "storages.type",
+    'location': "storages.location",
+}
+
+# Dashboard sort keys -> ORDER BY clauses for page_storages()
+STORAGE_SORTS = {
+    'created': "storages.rowid",
+    'name': "storages.name COLLATE NOCASE, storages.rowid",
+    'location': "storages.location COLLATE NOCASE, storages.name COLLATE NOCASE",
+    'type': "storages.type, storages.name COLLATE NOCASE",
+    'last_updated': "storages.last_updated DESC, storages.rowid",
+    'items': "item_count DESC, storages.rowid",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS storages (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    location TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    last_updated TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS items (
+    pk INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    storage_id TEXT NOT NULL REFERENCES storages(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    quantity TEXT NOT NULL,
+    category TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL,
+    expiry TEXT NOT NULL DEFAULT '',
+    notes TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts TEXT NOT NULL,
+    op TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS storage_aliases (
+    alias TEXT PRIMARY KEY,
+    storage_id TEXT NOT NULL REFERENCES storages(id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS stock_thresholds (
+    name TEXT PRIMARY KEY COLLATE NOCASE,
+    quantity TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_storage ON items(storage_id, pk);
+CREATE INDEX IF NOT EXISTS idx_items_status ON items(status);
+CREATE INDEX IF NOT EXISTS idx_items_category ON items(category);
+CREATE INDEX IF NOT EXISTS idx_storages_type ON storages(type);
+CREATE INDEX IF NOT EXISTS idx_storages_location ON storages(location);
+CREATE INDEX IF NOT EXISTS idx_storages_name ON storages(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_storage_aliases_storage ON storage_aliases(storage_id);
+"""
+
+# Item IDs are derived from the AUTOINCREMENT key, so they are never reused
+ITEM_ID_FORMAT = "item_{:06d}"
+
+# Storage IDs are short random codes in Crockford's base32 (no i, l, o or u),
+# which keeps storage URLs and their QR codes small
+STORAGE_CODE_ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+STORAGE_CODE_LENGTH = 6
+STORAGE_CODE_RE = re.compile(f"[{STORAGE_CODE_ALPHABET}]{{{STORAGE_CODE_LENGTH}}}")
+
+# sync() replays other processes' events through the listeners, except for
+# ops that change data wholesale and tails too long to be worth replaying
+REBUILD_OPS = ('restore', 'rename_storages')
+UNINDEXED_OPS = ('set_threshold',)
+REPLAY_LIMIT = 10000
+
+
+class ConflictError(Exception):
+    """A compare-and-swap write found a newer version than the caller expected.
+
+    current holds the stored record (storage or item dict) as it is now.
+    """
+
+    def __init__(self, record_id, expected, current):
+        super().__init__(f"{record_id} changed: expected version {expected}, found {current['version']}")
+        self.record_id = record_id
+        self.expected = expected
+        self.current = current
+
+
+def now_stamp():
+    """Timestamp format used for last_updated"""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def make_storage_code(rng=None):
+    """Random short storage code; uniqueness is checked when it is inserted.
+
+    Codes come from the secrets module unless a random.Random is given.
+    """
+    choice = secrets.choice if rng is None else rng.choice
+    return "".join(choice(STORAGE_CODE_ALPHABET) for _ in range(STORAGE_CODE_LENGTH))
+
+
+def is_storage_code(storage_id):
+    """True for IDs in the short code format, False for legacy name-based IDs"""
+    return STORAGE_CODE_RE.fullmatch(storage_id) is not None
+
+
+class InventoryStore:
+    """Process-wide inventory store backed by SQLite in WAL mode.
+
+    Connections are pooled and shared between threads; every write runs in
+    its own transaction so concurrent readers never block writers. In-memory
+    indexes register with subscribe() and receive a change event after each
+    committed write. Each commit also bumps a generation counter in the
+    database, so sync() can spot writes made by other processes. Every change
+    is appended to the events table in the same transaction, giving a full
+    history that inventory.eventlog can snapshot and replay.
+    """
+
+    def __init__(self, path="lab_inventory.db", pool_size=8, timeout=30.0):
+        if path == ":memory:":
+            # Private in-memory databases are per connection, so share one by URI
+            self._target = f"file:inventory_{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self._uri = True
+        else:
+            self._target = path
+            self._uri = False
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+        self._pool_size = pool_size
+        self._created = 0
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._pinned = threading.local()  # .conn: connection this thread's reads go to
+        self._listeners = []
+
+        with self.connection() as conn:
+            _migrate_versions(conn)
+            conn.executescript(SCHEMA)
+            _migrate_item_ids(conn)
+        with self.connection() as conn:
+            self._generation = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+            self._seen_seq = _last_event_seq(conn)
+
+    # Connection pool
+    def _connect(self):
+        conn = sqlite3.connect(self._target, uri=self._uri, timeout=self.timeout,
+                               check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+        if not self._uri:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a pooled connection (or the one pinned by _reading_from)"""
+        pinned = getattr(self._pinned, 'conn', None)
+        if pinned is not None:
+            yield pinned
+            return
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self._pool_size
+                if create:
+                    self._created += 1
+            conn = self._connect() if create else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Run a block of statements as one write transaction"""
+        with self._exclusive("IMMEDIATE") as conn:
+            changes = conn.total_changes
+            yield conn
+            # A block that wrote nothing leaves the generation, and every cache keyed on it, alone
+            if conn.total_changes != changes:
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            generation = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+            last_seq = _last_event_seq(conn)
+        self._generation, self._seen_seq = generation, last_seq
+
+    @contextlib.contextmanager
+    def _exclusive(self, mode):
+        """Open a transaction holding the in-process write lock, with listeners caught up to it first"""
+        with self._write_lock, self.connection() as conn:
+            conn.execute(f"BEGIN {mode}")
+            try:
+                generation = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+                if generation != self._generation:
+                    self._catch_up(conn, generation)
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @contextlib.contextmanager
+    def _reading_from(self, conn):
+        """Send this thread's reads to conn, so index rebuilds see its snapshot"""
+        self._pinned.conn = conn
+        try:
+            yield
+        finally:
+            self._pinned.conn = None
+
+    def _catch_up(self, conn, generation):
+        """Bring listeners up to date with writes made by other processes.
+
+        Their events are replayed through apply(); listeners are only rebuilt
+        when the log can't tell the whole story: events were pruned, the tail
+        holds a restore or rename, or it is too long to be worth replaying.
+        """
+        rows = conn.execute(
+            "SELECT seq, op, payload FROM events WHERE seq > ? ORDER BY seq LIMIT ?",
+            (self._seen_seq, REPLAY_LIMIT + 1),
+        ).fetchall()
+        replay = (len(rows) <= REPLAY_LIMIT
+                  and all(row['seq'] == self._seen_seq + offset for offset, row in enumerate(rows, start=1))
+                  and not any(row['op'] in REBUILD_OPS for row in rows))
+        if replay:
+            for row in rows:
+                if row['op'] in UNINDEXED_OPS:
+                    continue
+                event = json.loads(row['payload'])
+                event['seq'] = row['seq']
+                self._publish(event)
+        else:
+            # Rebuilt from conn's snapshot, so no later write is counted twice
+            with self._reading_from(conn):
+                for listener in self._listeners:
+                    listener.rebuild(self)
+        self._generation, self._seen_seq = generation, _last_event_seq(conn)
+
+    # Change notification
+    def subscribe(self, listener):
+        """Register an index with rebuild(store) and apply(event) methods.
+
+        The index is built from a read snapshot, so other processes can keep
+        writing meanwhile; their changes reach it through sync().
+        """
+        with self._exclusive("DEFERRED") as conn, self._reading_from(conn):
+            listener.rebuild(self)
+            self._listeners.append(listener)
+        return listener
+
+    def sync(self):
+        """Catch listeners up if another process has written; returns True if it did"""
+        with self._write_lock:
+            if self._read_generation() == self._generation:
+                return False
+            with self._exclusive("DEFERRED"):
+                pass
+        return True
+
+    def _rebuild_listeners(self):
+        with self._exclusive("DEFERRED") as conn, self._reading_from(conn):
+            for listener in self._listeners:
+                listener.rebuild(self)
+
+    @property
+    def generation(self):
+        """Database-wide change counter, bumped by every committed write"""
+        return self._read_generation()
+
+    def _read_generation(self):
+        with self.connection() as conn:
+            return conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def _publish(self, event):
+        for listener in self._listeners:
+            listener.apply(event)
+
+    def close(self):
+        """Close every pooled connection"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        self._created = 0
+
+    # Reads
+    def storage_count(self):
+        with self.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM storages").fetchone()[0]
+
+    def has_storage(self, storage_id):
+        with self.connection() as conn:
+            return conn.execute("SELECT 1 FROM storages WHERE id = ?", (storage_id,)).fetchone() is not None
+
+    def resolve_storage_id(self, storage_id):
+        """Current ID for a storage ID or a legacy alias of one, or None if neither exists"""
+        with self.connection() as conn:
+            if conn.execute("SELECT 1 FROM storages WHERE id = ?", (storage_id,)).fetchone():
+                return storage_id
+            row = conn.execute("SELECT storage_id FROM storage_aliases WHERE alias = ?", (storage_id,)).fetchone()
+        return row['storage_id'] if row else None
+
+    def storages(self):
+        """All storages with their items, in creation order"""
+        with self.connection() as conn:
+            storage_rows = conn.execute("SELECT * FROM storages ORDER BY rowid").fetchall()
+            item_rows = conn.execute("SELECT * FROM items ORDER BY storage_id, pk").fetchall()
+
+        result = {row['id']: _storage_from_row(row) for row in storage_rows}
+        for row in item_rows:
+            storage = result.get(row['storage_id'])
+            if storage is not None:
+                storage['items'].append(_item_from_row(row))
+        return result
+
+    def list_storages(self):
+        """All storages without their items, in creation order"""
+        with self.connection() as conn:
+            rows = conn.execute("SELECT * FROM storages ORDER BY rowid").fetchall()
+        return {row['id']: {field: row[field] for field in STORAGE_FIELDS} for row in rows}
+
+    def page_storages(self, offset=0, limit=20, sort='created', storage_type=None, location=None):
+        """One page of storages (without items) plus the total matching count.
+
+        Each storage carries an item_count; filtering and sorting happen in SQL
+        so only the requested page is read.
+        """
+        where, params = [], []
+        if storage_type:
+            where.append("type = ?")
+            params.append(storage_type)
+        if location:
+            where.append("location = ?")
+            params.append(location)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        order_sql = STORAGE_SORTS[sort]
+
+        with self.connection() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM storages {where_sql}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT storages.*, (SELECT COUNT(*) FROM items WHERE items.storage_id = storages.id) AS item_count "
+                f"FROM storages {where_sql} ORDER BY {order_sql} LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+
+        page = {}
+        for row in rows:
+            storage = {field: row[field] for field in STORAGE_FIELDS}
+            storage['item_count'] = row['item_count']
+            page[row['id']] = storage
+        return page, total
+
+    def preview_items(self, storage_ids, limit=5):
+        """First few items of each given storage, keyed by storage ID"""
+        previews = {storage_id: [] for storage_id in storage_ids}
+        if not previews:
+            return previews
+        placeholders = ", ".join("?" for _ in previews)
+        with self.connection() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM (SELECT items.*, ROW_NUMBER() OVER (PARTITION BY storage_id ORDER BY pk) AS position "
+                f"FROM items WHERE storage_id IN ({placeholders})) WHERE position <= ? ORDER BY storage_id, pk",
+                list(previews) + [limit],
+            ).fetchall()
+        for row in rows:
+            previews[row['storage_id']].append(_item_from_row(row))
+        return previews
+
+    def locations(self):
+        """Distinct storage locations, sorted"""
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT location FROM storages ORDER BY location")]
+
+    def get_storage(self, storage_id):
+        """A single storage with its items, or None"""
+        with self.connection() as conn:
+            row = conn.execute("SELECT * FROM storages WHERE id = ?", (storage_id,)).fetchone()
+            if row is None:
+                return None
+            items = conn.execute("SELECT * FROM items WHERE storage_id = ? ORDER BY pk",
+                                 (storage_id,)).fetchall()
+        storage = _storage_from_row(row)
+        storage['items'] = [_item_from_row(item) for item in items]
+        return storage
+
+    def get_item(self, item_id):
+        """Return (storage_id, item) for an item ID"""
+        with self.connection() as conn:
+            row = self._item_row(conn, item_id)
+        return row['storage_id'], _item_from_row(row)
+
+    def iter_items(self):
+        """Yield (storage_id, storage_name, item) for every item"""
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT items.*, storages.name AS storage_name FROM items "
+                "JOIN storages ON storages.id = items.storage_id ORDER BY storages.rowid, items.pk"
+            ).fetchall()
+        for row in rows:
+            yield row['storage_id'], row['storage_name'], _item_from_row(row)
+
+    def iter_item_chunks(self, chunk_size=1000):
+        """Yield lists of flat item rows (with storage details), chunk_size at a time.
+
+        Uses keyset pagination on the item key so the pooled connection is
+        returned between chunks and memory stays bounded.
+        """
+        last_pk = 0
+        while True:
+            with self.connection() as conn:
+                rows = conn.execute(
+                    "SELECT items.*, storages.name AS storage_name, storages.type AS storage_type, "
+                    "storages.location AS location FROM items "
+                    "JOIN storages ON storages.id = items.storage_id "
+                    "WHERE items.pk > ? ORDER BY items.pk LIMIT ?",
+                    (last_pk, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_pk = rows[-1]['pk']
+            yield [{field: row[field] for field in EXPORT_FIELDS} for row in rows]
+
+    def item_columns(self, fields=EXPORT_FIELDS):
+        """Every item as a tuple of the given export fields, in creation order"""
+        columns = ", ".join(EXPORT_COLUMNS.get(field, f"items.{field}") for field in fields)
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None  # plain tuples are much cheaper than Row objects here
+            return cursor.execute(
+                f"SELECT {columns} FROM items JOIN storages ON storages.id = items.storage_id ORDER BY items.pk"
+            ).fetchall()
+
+    def storage_names(self):
+        """Map of storage ID to name"""
+        with self.connection() as conn:
+            return {row['id']: row['name'] for row in conn.execute("SELECT id, name FROM storages ORDER BY rowid")}
+
+    def iter_item_records(self):
+        """Yield (pk, storage_id, item) for every item, for index rebuilds"""
+        with self.connection() as conn:
+            rows = conn.execute("SELECT * FROM items ORDER BY pk").fetchall()
+        for row in rows:
+            yield row['pk'], row['storage_id'], _item_from_row(row)
+
+    def export_dict(self):
+        """Inventory in the original session-state layout"""
+        return {
+            'storages': self.storages(),
+            'categories': list(CATEGORIES),
+            'status_options': list(STATUS_OPTIONS),
+            'storage_types': list(STORAGE_TYPES),
+        }
+
+    def stock_thresholds(self):
+        """Low-stock thresholds as {item name: quantity string}"""
+        with self.connection() as conn:
+            return {row['name']: row['quantity']
+                    for row in conn.execute("SELECT name, quantity FROM stock_thresholds ORDER BY name")}
+
+    # Event log
+    def last_event_seq(self):
+        """Sequence number of the newest logged event (0 before the first one)"""
+        with self.connection() as conn:
+            return _last_event_seq(conn)
+
+    def iter_events(self, after=0, until=None, chunk_size=1000):
+        """Yield (seq, ts, event) for logged events with after < seq <= until, oldest first"""
+        until = until if until is not None else -1
+        while True:
+            with self.connection() as conn:
+                rows = conn.execute(
+                    "SELECT seq, ts, payload FROM events WHERE seq > ? AND (? < 0 OR seq <= ?) ORDER BY seq LIMIT ?",
+                    (after, until, until, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row['seq'], row['ts'], json.loads(row['payload'])
+            after = rows[-1]['seq']
+
+    def snapshot_state(self):
+        """Consistent copy of all data plus the event sequence number it reflects"""
+        with self.connection() as conn:
+            conn.execute("BEGIN")
+            try:
+                seq = _last_event_seq(conn)
+                storages = {row['id']: {**{field: row[field] for field in STORAGE_FIELDS}, 'version': row['version']}
+                            for row in conn.execute("SELECT * FROM storages ORDER BY rowid")}
+                items = {row['id']: [row['pk'], row['storage_id'], _item_from_row(row)]
+                         for row in conn.execute("SELECT * FROM items ORDER BY pk")}
+                thresholds = {row['name']: row['quantity']
+                              for row in conn.execute("SELECT name, quantity FROM stock_thresholds")}
+                aliases = {row['alias']: row['storage_id']
+                           for row in conn.execute("SELECT alias, storage_id FROM storage_aliases")}
+            finally:
+                conn.execute("COMMIT")
+        return {'seq': seq, 'storages': storages, 'items': items, 'thresholds': thresholds, 'aliases': aliases}
+
+    # Writes
+    def add_storage(self, name, storage_type, location, description="", rng=None):
+        """Insert a storage and return its ID, a new short code.
+
+        rng (a random.Random) makes the code reproducible, for synthetic data.
+        """
+        storage = {'name': name, 'type': storage_type, 'location': location,
+                   'description': description, 'last_updated': now_stamp(), 'version': 1}
+        with self._write_lock:
+            with self.transaction() as conn:
+                storage_id = self._new_storage_code(conn, rng)
+                conn.execute(
+                    "INSERT INTO storages (id, name, type, location, description, last_updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (storage_id, name, storage_type, location, description, storage['last_updated']),
+                )
+                event = self._log(conn, {'op': 'add_storage', 'storage_id': storage_id, 'storage': storage})
+            self._publish(event)
+        return storage_id
+
+    def update_storage(self, storage_id, name, storage_type, location, description="", expected_version=None):
+        """Update a storage's details and return its new version.
+
+        With expected_version the write only succeeds if nobody has changed
+        the storage since that version was read; otherwise ConflictError.
+        """
+        storage = {'name': name, 'type': storage_type, 'location': location,
+                   'description': description, 'last_updated': now_stamp()}
+        with self._write_lock:
+            with self.transaction() as conn:
+                row = conn.execute("SELECT * FROM storages WHERE id = ?", (storage_id,)).fetchone()
+                if row is None:
+                    raise KeyError(storage_id)
+                _check_version(storage_id, row, expected_version, _storage_from_row)
+                storage['version'] = row['version'] + 1
+                conn.execute(
+                    "UPDATE storages SET name = ?, type = ?, location = ?, description = ?, last_updated = ?, "
+                    "version = ? WHERE id = ?",
+                    (name, storage_type, location, description, storage['last_updated'], storage['version'],
+                     storage_id),
+                )
+                event = self._log(conn, {'op': 'update_storage', 'storage_id': storage_id, 'storage': storage})
+            self._publish(event)
+        return storage['version']
+
+    def delete_storage(self, storage_id):
+        """Delete a storage and its items, returning the storage name"""
+        with self._write_lock:
+            with self.transaction() as conn:
+                row = conn.execute("SELECT name FROM storages WHERE id = ?", (storage_id,)).fetchone()
+                if row is None:
+                    raise KeyError(storage_id)
+                item_ids = [item_id for (item_id,) in conn.execute("SELECT id FROM items WHERE storage_id = ?",
+                                                                   (storage_id,))]
+                conn.execute("DELETE FROM storages WHERE id = ?", (storage_id,))
+                event = self._log(conn, {'op': 'delete_storage', 'storage_id': storage_id, 'item_ids': item_ids})
+            self._publish(event)
+        return row['name']
+
+    def add_item(self, storage_id, name, quantity, category, status, expiry="", notes=""):
+        """Append an item to a storage and return its ID.
+
+        Expiry is stored as YYYY-MM-DD; an unreadable date raises ValueError.
+        """
+        expiry = normalize_expiry(expiry)
+        with self._write_lock:
+            with self.transaction() as conn:
+                cursor = conn.execute(
+                    "INSERT INTO items (id, storage_id, name, quantity, category, status, expiry, notes) "
+                    "VALUES ('', ?, ?, ?, ?, ?, ?, ?)",
+                    (storage_id, name, quantity, category, status, expiry, notes),
+                )
+                item_id = ITEM_ID_FORMAT.format(cursor.lastrowid)
+                conn.execute("UPDATE items SET id = ? WHERE pk = ?", (item_id, cursor.lastrowid))
+                last_updated = self._touch(conn, storage_id)
+                item = {'id': item_id, 'name': name, 'quantity': quantity, 'category': category,
+                        'status': status, 'expiry': expiry, 'notes': notes, 'version': 1}
+                event = self._log(conn, {'op': 'add_item', 'storage_id': storage_id, 'item_pk': cursor.lastrowid,
+                                         'item': item, 'last_updated': last_updated})
+            self._publish(event)
+        return item_id
+
+    def add_items(self, rows):
+        """Insert many items (dicts with storage_id and item fields) in one transaction.
+
+        Returns the new item IDs. Each affected storage's last_updated is
+        bumped once. Expiry dates are normalised as in add_item().
+        """
+        rows = list(rows)
+        if not rows:
+            return []
+        with self._write_lock:
+            with self.transaction() as conn:
+                # BEGIN IMMEDIATE keeps other writers out, so the next keys are known in advance
+                last_pk = conn.execute(
+                    "SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'items'), 0), "
+                    "COALESCE((SELECT MAX(pk) FROM items), 0))"
+                ).fetchone()[0]
+                records = []
+                for offset, row in enumerate(rows, start=1):
+                    pk = last_pk + offset
+                    item = {'id': ITEM_ID_FORMAT.format(pk)}
+                    item.update({field: row.get(field, '') for field in ITEM_FIELDS[1:]})
+                    item['expiry'] = normalize_expiry(item['expiry'])
+                    item['version'] = 1
+                    records.append((pk, row['storage_id'], item))
+                conn.executemany(
+                    "INSERT INTO items (pk, id, storage_id, name, quantity, category, status, expiry, notes) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(pk, item['id'], storage_id) + tuple(item[field] for field in ITEM_FIELDS[1:])
+                     for pk, storage_id, item in records],
+                )
+                touched = {storage_id: self._touch(conn, storage_id)
+                           for storage_id in dict.fromkeys(storage_id for _, storage_id, _ in records)}
+                events = self._log_many(conn, [{'op': 'add_item', 'storage_id': storage_id, 'item_pk': pk,
+                                                'item': item, 'last_updated': touched[storage_id]}
+                                               for pk, storage_id, item in records])
+            for event in events:
+                self._publish(event)
+        return [item['id'] for _, _, item in records]
+
+    def update_item(self, item_id, name, quantity, category, status, expiry="", notes="", expected_version=None):
+        """Update an item by ID, returning its storage ID.
+
+        With expected_version the write is a compare-and-swap: ConflictError
+        if the item has changed since that version was read.
+        """
+        expiry = normalize_expiry(expiry)
+        with self._write_lock:
+            with self.transaction() as conn:
+                row = self._item_row(conn, item_id)
+                _check_version(item_id, row, expected_version, _item_from_row)
+                storage_id = row['storage_id']
+                conn.execute(
+                    "UPDATE items SET name = ?, quantity = ?, category = ?, status = ?, expiry = ?, notes = ?, "
+                    "version = version + 1 WHERE pk = ?",
+                    (name, quantity, category, status, expiry, notes, row['pk']),
+                )
+                last_updated = self._touch(conn, storage_id)
+                item = {'id': row['id'], 'name': name, 'quantity': quantity, 'category': category,
+                        'status': status, 'expiry': expiry, 'notes': notes, 'version': row['version'] + 1}
+                event = self._log(conn, {'op': 'update_item', 'storage_id': storage_id, 'item': item,
+                                         'previous': _item_from_row(row), 'last_updated': last_updated})
+            self._publish(event)
+        return storage_id
+
+    def delete_item(self, item_id, expected_version=None):
+        """Delete an item by ID, returning its name (ConflictError as in update_item)"""
+        with self._write_lock:
+            with self.transaction() as conn:
+                row = self._item_row(conn, item_id)
+                _check_version(item_id, row, expected_version, _item_from_row)
+                storage_id = row['storage_id']
+                conn.execute("DELETE FROM items WHERE pk = ?", (row['pk'],))
+                last_updated = self._touch(conn, storage_id)
+                event = self._log(conn, {'op': 'delete_item', 'storage_id': storage_id, 'item_id': item_id,
+                                         'previous': _item_from_row(row), 'last_updated': last_updated})
+            self._publish(event)
+        return row['name']
+
+    def update_items(self, item_ids, status=None, category=None, storage_id=None, expected_versions=None):
+        """Set the status, category and/or storage of many items in one transaction.
+
+        Arguments left as None are unchanged. Each affected storage's
+        last_updated is bumped once. A move is logged as a delete_item from
+        the old storage plus an add_item to the new one, keeping the item ID.
+        expected_versions ({item ID: version}) makes the batch all-or-nothing
+        against concurrent edits (ConflictError). Returns the changed item IDs.
+        """
+        if not item_ids or (status is None and category is None and storage_id is None):
+            return []
+        with self._write_lock:
+            with self.transaction() as conn:
+                if storage_id is not None and not conn.execute(
+                        "SELECT 1 FROM storages WHERE id = ?", (storage_id,)).fetchone():
+                    raise KeyError(storage_id)
+                changes = []
+                for item_id in dict.fromkeys(item_ids):
+                    row = self._item_row(conn, item_id)
+                    _check_version(item_id, row, (expected_versions or {}).get(item_id), _item_from_row)
+                    previous = _item_from_row(row)
+                    item = dict(previous, status=status or previous['status'],
+                                category=category or previous['category'])
+                    target = storage_id or row['storage_id']
+                    if item != previous or target != row['storage_id']:
+                        item['version'] = previous['version'] + 1
+                        changes.append((row, previous, item, target))
+                if not changes:
+                    return []
+                conn.executemany(
+                    "UPDATE items SET storage_id = ?, status = ?, category = ?, version = version + 1 WHERE pk = ?",
+                    [(target, item['status'], item['category'], row['pk']) for row, _, item, target in changes],
+                )
+                affected = dict.fromkeys(sid for row, _, _, target in changes for sid in (row['storage_id'], target))
+                touched = {sid: self._touch(conn, sid) for sid in affected}
+                events = []
+                for row, previous, item, target in changes:
+                    if target == row['storage_id']:
+                        events.append({'op': 'update_item', 'storage_id': target, 'item': item,
+                                       'previous': previous, 'last_updated': touched[target]})
+                    else:
+                        events.append({'op': 'delete_item', 'storage_id': row['storage_id'], 'item_id': item['id'],
+                                       'previous': previous, 'last_updated': touched[row['storage_id']],
+                                       'moved_to': target})
+                        events.append({'op': 'add_item', 'storage_id': target, 'item_pk': row['pk'], 'item': item,
+                                       'last_updated': touched[target], 'moved_from': row['storage_id']})
+                self._log_many(conn, events)
+            for event in events:
+                self._publish(event)
+        return [item['id'] for _, _, item, _ in changes]
+
+    def delete_items(self, item_ids, expected_versions=None):
+        """Delete many items in one transaction (ConflictError as in update_items).
+
+        Each affected storage's last_updated is bumped once. Returns the
+        deleted item IDs.
+        """
+        if not item_ids:
+            return []
+        with self._write_lock:
+            with self.transaction() as conn:
+                rows = []
+                for item_id in dict.fromkeys(item_ids):
+                    row = self._item_row(conn, item_id)
+                    _check_version(item_id, row, (expected_versions or {}).get(item_id), _item_from_row)
+                    rows.append(row)
+                if not rows:
+                    return []
+                conn.executemany("DELETE FROM items WHERE pk = ?", [(row['pk'],) for row in rows])
+                touched = {storage_id: self._touch(conn, storage_id)
+                           for storage_id in dict.fromkeys(row['storage_id'] for row in rows)}
+                events = self._log_many(conn, [{'op': 'delete_item', 'storage_id': row['storage_id'],
+                                                'item_id': row['id'], 'previous': _item_from_row(row),
+                                                'last_updated': touched[row['storage_id']]} for row in rows])
+            for event in events:
+                self._publish(event)
+        return [row['id'] for row in rows]
+
+    def set_stock_threshold(self, name, quantity):
+        """Set the low-stock threshold for an item name; a blank quantity removes it"""
+        with self._write_lock:
+            with self.transaction() as conn:
+                if quantity:
+                    conn.execute("INSERT OR REPLACE INTO stock_thresholds (name, quantity) VALUES (?, ?)",
+                                 (name.strip(), quantity))
+                else:
+                    conn.execute("DELETE FROM stock_thresholds WHERE name = ?", (name.strip(),))
+                # Logged for history and replay only; indexes don't track thresholds
+                self._log(conn, {'op': 'set_threshold', 'name': name.strip(), 'quantity': quantity})
+
+    def restore_state(self, state):
+        """Replace all data with a snapshot_state()-style dict and rebuild listeners.
+
+        The event log itself is kept; new events continue after state['seq'].
+        """
+        with self._write_lock:
+            with self.transaction() as conn:
+                conn.execute("DELETE FROM items")
+                conn.execute("DELETE FROM storage_aliases")
+                conn.execute("DELETE FROM storages")
+                conn.execute("DELETE FROM stock_thresholds")
+                conn.executemany(
+                    "INSERT INTO storages (id, name, type, location, description, last_updated, version) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(storage_id,) + tuple(storage[field] for field in STORAGE_FIELDS) + (storage.get('version', 1),)
+                     for storage_id, storage in state['storages'].items()],
+                )
+                conn.executemany(
+                    "INSERT INTO items (pk, id, storage_id, name, quantity, category, status, expiry, notes, version) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(pk, item['id'], storage_id) + tuple(item[field] for field in ITEM_FIELDS[1:])
+                     + (item.get('version', 1),)
+                     for pk, storage_id, item in sorted(state['items'].values(), key=lambda record: record[0])],
+                )
+                conn.executemany("INSERT INTO stock_thresholds (name, quantity) VALUES (?, ?)",
+                                 state.get('thresholds', {}).items())
+                conn.executemany("INSERT INTO storage_aliases (alias, storage_id) VALUES (?, ?)",
+                                 state.get('aliases', {}).items())
+                self._log(conn, {'op': 'restore', 'restored_seq': state['seq']})
+            self._rebuild_listeners()
+
+    def shorten_storage_ids(self):
+        """Give every storage with a legacy name-based ID a short code.
+
+        The old IDs stay valid as aliases (see resolve_storage_id), so printed
+        QR codes keep working. Returns {old ID: new code}; listeners are
+        rebuilt rather than sent an event.
+        """
+        with self._write_lock:
+            with self.transaction() as conn:
+                # Items point at the old IDs until they are updated below
+                conn.execute("PRAGMA defer_foreign_keys = ON")
+                renamed = {}
+                for (storage_id,) in conn.execute("SELECT id FROM storages ORDER BY rowid").fetchall():
+                    if is_storage_code(storage_id):
+                        continue
+                    code = self._new_storage_code(conn)
+                    conn.execute("UPDATE storages SET id = ? WHERE id = ?", (code, storage_id))
+                    conn.execute("UPDATE items SET storage_id = ? WHERE storage_id = ?", (code, storage_id))
+                    conn.execute("UPDATE storage_aliases SET storage_id = ? WHERE storage_id = ?", (code, storage_id))
+                    conn.execute("INSERT INTO storage_aliases (alias, storage_id) VALUES (?, ?)", (storage_id, code))
+                    renamed[storage_id] = code
+                if renamed:
+                    self._log(conn, {'op': 'rename_storages', 'renamed': renamed})
+            if renamed:
+                self._rebuild_listeners()
+        return renamed
+
+    def prune_events(self, until):
+        """Drop logged events up to and including seq until (after a snapshot covers them)"""
+        with self._write_lock:
+            with self.transaction() as conn:
+                return conn.execute("DELETE FROM events WHERE seq <= ?", (until,)).rowcount
+
+    # Helpers
+    def _item_row(self, conn, item_id):
+        row = conn.execute("SELECT * FROM items WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            raise KeyError(item_id)
+        return row
+
+    def _log(self, conn, event):
+        """Append an event to the log inside the caller's transaction and return it"""
+        self._log_many(conn, [event])
+        return event
+
+    def _log_many(self, conn, events):
+        stamp = now_stamp()
+        conn.executemany(
+            "INSERT INTO events (ts, op, payload) VALUES (?, ?, ?)",
+            [(stamp, event['op'], json.dumps(event, ensure_ascii=False, separators=(",", ":"))) for event in events],
+        )
+        # The write transaction keeps the new sequence numbers contiguous
+        last_seq = conn.execute("SELECT MAX(seq) FROM events").fetchone()[0]
+        for seq, event in enumerate(events, start=last_seq - len(events) + 1):
+            event['seq'] = seq
+        return events
+
+    def _new_storage_code(self, conn, rng=None):
+        # Callers hold the write transaction, so a code found free stays free
+        while True:
+            code = make_storage_code(rng)
+            taken = conn.execute(
+                "SELECT 1 FROM storages WHERE id = ? UNION ALL SELECT 1 FROM storage_aliases WHERE alias = ?",
+                (code, code),
+            ).fetchone()
+            if not taken:
+                return code
+
+    def _touch(self, conn, storage_id):
+        last_updated = now_stamp()
+        conn.execute("UPDATE storages SET last_updated = ? WHERE id = ?", (last_updated, storage_id))
+        return last_updated
+
+
+def _check_version(record_id, row, expected_version, to_record):
+    if expected_version is not None and row['version'] != expected_version:
+        raise ConflictError(record_id, expected_version, to_record(row))
+
+
+def _storage_from_row(row):
+    storage = {field: row[field] for field in STORAGE_FIELDS}
+    storage['version'] = row['version']
+    storage['items'] = []
+    return storage
+
+
+def _last_event_seq(conn):
+    # AUTOINCREMENT keeps the high-water mark even after the log is pruned
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'events'").fetchone()
+    return row[0] if row else 0
+
+
+def _item_from_row(row):
+    item = {field: row[field] for field in ITEM_FIELDS}
+    item['version'] = row['version']
+    return item
+
+
+def _migrate_versions(conn):
+    """Add the version columns to databases created before optimistic locking"""
+    for table in ('storages', 'items'):
+        columns = [row['name'] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if columns and 'version' not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+def _migrate_item_ids(conn):
+    """Give unique IDs to items created with the old per-storage numbering"""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_items_id'").fetchone():
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "UPDATE items SET id = printf('item_%06d', pk) "
+            "WHERE id IN (SELECT id FROM items GROUP BY id HAVING COUNT(*) > 1)"
+        )
+        conn.execute("CREATE UNIQUE INDEX idx_items_id ON items(id)")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
@@ -0,0 +1,78 @@
+# tests/test_facets.py - Facet bitmaps against a brute-force count over the store
+import random
+from collections import Counter
+
+import pytest
+
+from benchmarks.synthetic import generate_inventory
+from inventory.facets import FACETS, FacetIndex
+from inventory.store import InventoryStore
+
+SELECTIONS = [
+    {},
+    {'category': ['Chemical']},
+    {'category': ['Chemical', 'Consumable'], 'status': ['Free']},
+    {'status': ['Broken', 'Maintenance'], 'type': ['fridge', 'freezer']},
+    {'location': ['Cold Room', 'Prep Room'], 'category': ['Glassware'], 'status': ['Free', 'Occupied']},
+]
+
+
+@pytest.fixture
+def store():
+    store = InventoryStore(":memory:")
+    yield store
+    store.close()
+
+
+def facet_rows(store):
+    storages = store.list_storages()
+    rows = {}
+    for storage_id, _, item in store.iter_items():
+        storage = storages[storage_id]
+        rows[item['id']] = (storage_id, {'category': item['category'], 'status': item['status'],
+                                         'type': storage['type'], 'location': storage['location']})
+    return rows
+
+
+def matches(values, selections):
+    return all(values[facet] in accepted for facet, accepted in selections.items() if accepted)
+
+
+def brute_force_counts(rows, selections):
+    counts = {}
+    for facet in FACETS:
+        others = {name: accepted for name, accepted in selections.items() if name != facet}
+        counts[facet] = dict(Counter(values[facet] for _, values in rows.values() if matches(values, others)))
+    return counts
+
+
+def check(store, index):
+    rows = facet_rows(store)
+    storage_id = next(iter(store.list_storages()))
+    for selections in SELECTIONS:
+        assert set(index.ids(index.filter(selections))) == {
+            item_id for item_id, (_, values) in rows.items() if matches(values, selections)}
+        assert set(index.ids(index.filter(selections, storage_id))) == {
+            item_id for item_id, (sid, values) in rows.items() if sid == storage_id and matches(values, selections)}
+        assert index.counts(selections) == brute_force_counts(rows, selections)
+
+
+def test_counts_match_brute_force_after_mixed_changes(store):
+    storage_ids = generate_inventory(store, storages=12, items_per_storage=25, seed=4)
+    index = store.subscribe(FacetIndex())
+    check(store, index)
+
+    rng = random.Random(4)
+    item_ids = [item['id'] for _, _, item in store.iter_items()]
+    store.update_items(rng.sample(item_ids, 30), status='Broken')
+    store.update_items(rng.sample(item_ids, 20), storage_id=storage_ids[0])
+    store.delete_items(rng.sample(item_ids, 15))
+    store.update_storage(storage_ids[1], "Cold store", "freezer", "Cold Room")
+    store.delete_storage(storage_ids[2])
+    store.add_item(storage_ids[3], "Ethanol", "1 L", "Chemical", "Free")
+    check(store, index)
+
+    rebuilt = FacetIndex()
+    rebuilt.rebuild(store)
+    for selections in SELECTIONS:
+        assert index.counts(selections) == rebuilt.counts(selections)
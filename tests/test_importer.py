@@ -0,0 +1,26 @@
+# tests/test_importer.py - Excel round trip through the bulk importer
+import io
+from datetime import date, datetime
+
+import pytest
+
+from inventory.importer import guess_mapping, prepare_import, read_table
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+
+def test_excel_date_cells_round_trip():
+    sheet = pd.DataFrame({
+        'Name': ['Ethanol', 'Acetone', 'Agarose', 'Tris Base', 'Glycerol'],
+        'Qty': ['1 L', '500 ml', '100g', '1 kg', '250 ml'],
+        'Expiry': [datetime(2026, 12, 31), date(2027, 1, 5), None, '2026-03-01 00:00:00', 'soon'],
+    })
+    buf = io.BytesIO()
+    sheet.to_excel(buf, index=False)
+
+    table = read_table(buf.getvalue(), "reagents.xlsx")
+    report = prepare_import(table, guess_mapping(table.columns), "k7m2qz", default_category='Chemical')
+
+    assert report.rows['expiry'].tolist() == ['2026-12-31', '2027-01-05', '', '2026-03-01']
+    assert report.errors[['row', 'field', 'value']].values.tolist() == [[6, 'expiry', 'soon']]
@@ -0,0 +1,91 @@
+# tests/test_listeners.py - Indexes kept current by events agree with a full rebuild
+import random
+
+import pytest
+
+from benchmarks.synthetic import generate_inventory
+from inventory.analytics import InventoryAnalytics
+from inventory.expiry import ExpiryIndex
+from inventory.facets import FacetIndex
+from inventory.items import ItemIndex
+from inventory.quantity import StockTotals
+from inventory.search import SearchIndex
+from inventory.stats import InventoryStats
+from inventory.store import InventoryStore
+
+QUERIES = ["ethanol", "tips box", "acteone", "fridge", "item_0001"]
+
+
+def subscribe_all(store):
+    items = store.subscribe(ItemIndex())
+    return {
+        'items': items,
+        'search': store.subscribe(SearchIndex(items)),
+        'facets': store.subscribe(FacetIndex()),
+        'stats': store.subscribe(InventoryStats()),
+        'analytics': store.subscribe(InventoryAnalytics()),
+        'expiry': store.subscribe(ExpiryIndex(items)),
+        'stock': store.subscribe(StockTotals()),
+    }
+
+
+def view(listeners, storage_ids):
+    """Everything the app reads from the listeners, in comparable form"""
+    items, search, stats = listeners['items'], listeners['search'], listeners['stats']
+    return {
+        'items': {item_id: (items.get(item_id)[0], dict(items.get(item_id)[1]))
+                  for storage_id in storage_ids for item_id in items.storage_item_ids(storage_id)},
+        'order': {storage_id: items.storage_item_ids(storage_id) for storage_id in storage_ids},
+        'search': {query: [(result['item']['id'], round(result['score'], 9))
+                           for result in search.search(query)[0]] for query in QUERIES},
+        'facets': listeners['facets'].counts({}),
+        'summary': stats.summary(),
+        'storage_stats': {storage_id: stats.storage(storage_id) for storage_id in storage_ids},
+        'analytics': listeners['analytics'].status_by_location().to_dict(),
+        'expiry': [(entry['expiry'], entry['item']['id']) for entry in listeners['expiry'].between()],
+        # Running sums pick up float rounding that a fresh total doesn't
+        'stock': [dict(row, totals={unit: round(amount, 6) for unit, amount in row['totals'].items()})
+                  for row in listeners['stock'].totals()],
+    }
+
+
+def mixed_changes(store, storage_ids):
+    rng = random.Random(7)
+    item_ids = [item['id'] for _, _, item in store.iter_items()]
+    store.add_item(storage_ids[0], "Ethanol", "2 x 500 ml", "Chemical", "Free", expiry="2026-05-31")
+    store.update_item(item_ids[0], "Acetone", "1,000 ml", "Chemical", "Occupied", expiry="2027-01")
+    store.update_items(rng.sample(item_ids[1:], 25), status='Maintenance', category='Equipment')
+    store.update_items(rng.sample(item_ids[1:], 25), storage_id=storage_ids[1])
+    store.delete_item(item_ids[-1])
+    store.delete_items(rng.sample(item_ids[1:-1], 10))
+    store.update_storage(storage_ids[2], "Fridge Z", "fridge", "Cold Room")
+    store.delete_storage(storage_ids[3])
+    store.add_items([{'storage_id': storage_ids[4], 'name': "Pipette Tips 200 ul", 'quantity': "3 boxes",
+                      'category': 'Consumable', 'status': 'Ordered'}])
+    store.set_stock_threshold("Ethanol", "5 L")
+
+
+def fresh_view(store, storage_ids):
+    reader = InventoryStore(store.path)
+    try:
+        return view(subscribe_all(reader), storage_ids)
+    finally:
+        reader.close()
+
+
+@pytest.mark.parametrize("writer", ["same store", "other process"])
+def test_incremental_listeners_match_a_full_rebuild(tmp_path, writer):
+    path = str(tmp_path / "inventory.db")
+    store = InventoryStore(path)
+    storage_ids = generate_inventory(store, storages=8, items_per_storage=30, seed=7)
+    listeners = subscribe_all(store)
+    rebuilds = []
+    for listener in listeners.values():
+        listener.rebuild = lambda store, rebuild=listener.rebuild: rebuilds.append(1) or rebuild(store)
+
+    other = InventoryStore(path) if writer == "other process" else store
+    mixed_changes(other, storage_ids)
+    store.sync()
+
+    assert not rebuilds
+    assert view(listeners, storage_ids) == fresh_view(store, storage_ids)
@@ -0,0 +1,34 @@
+# tests/test_quantity.py - Quantity parsing and unit normalisation
+import pytest
+
+from inventory.quantity import Quantity, format_quantity, parse_quantity
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1,000 ml", Quantity(1000.0, 'ml', 'volume')),
+    ("1,5 L", Quantity(1500.0, 'ml', 'volume')),
+    ("2 x 500 ml", Quantity(1000.0, 'ml', 'volume')),
+    ("12,500.5 g", Quantity(12500.5, 'g', 'mass')),
+    ("500g", Quantity(500.0, 'g', 'mass')),
+    ("1.5 kg", Quantity(1500.0, 'g', 'mass')),
+    ("250 µl", Quantity(0.25, 'ml', 'volume')),
+    ("10 pieces", Quantity(10.0, 'pcs', 'count')),
+    ("3x vials", Quantity(3.0, 'vial', 'count')),
+    ("4", Quantity(4.0, 'pcs', 'count')),
+])
+def test_parse_quantity(text, expected):
+    quantity = parse_quantity(text)
+    assert (quantity.unit, quantity.dimension) == (expected.unit, expected.dimension)
+    assert quantity.value == pytest.approx(expected.value)
+
+
+@pytest.mark.parametrize("text", ["", "some", "500 furlongs", "1.2.3 ml"])
+def test_unreadable_quantities_give_none(text):
+    assert parse_quantity(text) is None
+
+
+def test_format_quantity_scales_base_units():
+    assert format_quantity(1500.0, 'ml') == "1.5 L"
+    assert format_quantity(0.25, 'ml') == "250 µl"
+    assert format_quantity(750.0, 'g') == "750 g"
+    assert format_quantity(3.0, 'vial') == "3 vial"
@@ -0,0 +1,93 @@
+# tests/test_search.py - Ranking and typo tolerance of the search index
+import pytest
+
+from benchmarks.synthetic import generate_inventory
+from inventory.items import ItemIndex
+from inventory.search import SearchIndex, trigrams, word_trigrams
+from inventory.store import InventoryStore
+
+
+@pytest.fixture
+def store():
+    store = InventoryStore(":memory:")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def index(store):
+    return store.subscribe(SearchIndex(store.subscribe(ItemIndex())))
+
+
+def names(results):
+    return [result['item']['name'] for result in results]
+
+
+def test_name_matches_rank_above_other_fields(store, index):
+    shelf = store.add_storage("Shelf A", "shelf", "Prep Room")
+    store.add_item(shelf, "Wash Bottle", "2", "Tool", "Free", notes="for ethanol")
+    store.add_item(shelf, "Ethanol", "1 L", "Chemical", "Free")
+
+    results, total = index.search("ethanol")
+
+    assert total == 2
+    assert names(results) == ["Ethanol", "Wash Bottle"]
+    assert results[0]['score'] > results[1]['score']
+    assert results[0]['storage_name'] == "Shelf A"
+
+
+def test_misspelt_and_partial_words_still_match(store, index):
+    shelf = store.add_storage("Shelf A", "shelf", "Prep Room")
+    store.add_item(shelf, "Acetone", "500 ml", "Chemical", "Free")
+    store.add_item(shelf, "Agarose", "100g", "Chemical", "Free")
+
+    assert names(index.search("acteone")[0]) == ["Acetone"]
+    assert names(index.search("aceton")[0]) == ["Acetone"]
+    assert names(index.search("agar")[0]) == ["Agarose"]
+    assert index.search("xylene") == ([], 0)
+
+
+def test_every_query_word_must_match_the_item_or_its_storage(store, index):
+    fridge = store.add_storage("Fridge A", "fridge", "Cold Room")
+    shelf = store.add_storage("Shelf A", "shelf", "Prep Room")
+    store.add_item(fridge, "Ethanol", "1 L", "Chemical", "Free")
+    store.add_item(shelf, "Ethanol", "1 L", "Chemical", "Free")
+
+    results, total = index.search("ethanol cold")
+
+    assert total == 1
+    assert results[0]['storage_id'] == fridge
+
+
+def test_results_follow_updates_and_deletes(store, index):
+    shelf = store.add_storage("Shelf A", "shelf", "Prep Room")
+    item_id = store.add_item(shelf, "Methanol", "1 L", "Chemical", "Free")
+    assert names(index.search("methanol")[0]) == ["Methanol"]
+
+    store.update_item(item_id, "Isopropanol", "1 L", "Chemical", "Free")
+    assert index.search("methanol") == ([], 0)
+    assert names(index.search("isopropanol")[0]) == ["Isopropanol"]
+
+    store.delete_item(item_id)
+    assert index.search("isopropanol") == ([], 0)
+
+
+def test_trigrams_pad_words_like_pg_trgm():
+    assert trigrams("abc") == {"abc"}
+    assert trigrams("ab") == set()
+    assert word_trigrams("ab") == {"  a", " ab", "ab "}
+
+
+def test_incremental_index_matches_a_rebuild(store, index):
+    storage_ids = generate_inventory(store, storages=6, items_per_storage=30, seed=5)
+    item_ids = [item['id'] for _, _, item in store.iter_items()]
+    store.update_items(item_ids[:40], storage_id=storage_ids[0], status='Broken')
+    store.update_item(item_ids[50], "Sodium Acetate", "500g", "Chemical", "Free")
+    store.delete_items(item_ids[60:80])
+    store.update_storage(storage_ids[1], "Cryo Freezer", "freezer", "Cold Room")
+    store.delete_storage(storage_ids[2])
+
+    rebuilt = SearchIndex(index.items)
+    rebuilt.rebuild(store)
+    for query in ["ethanol", "etanol", "sodium acet", "pipete tips", "cryo", "broken glassware", "item_0000"]:
+        assert index.search(query) == rebuilt.search(query), query